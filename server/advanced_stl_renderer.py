@@ -4,55 +4,52 @@ Zaawansowany renderer STL używający Open3D do tworzenia prawdziwych screenshot
 """
 
 import argparse
+import json
 import sys
 import os
 import numpy as np
 
-def optimize_image(image_path, quality=75, max_size=(300, 300)):
-    """Optymalizuje obraz przez kompresję i zmniejszenie rozmiaru"""
-    try:
-        from PIL import Image
-        
-        # Wczytaj obraz
-        with Image.open(image_path) as img:
-            # Konwertuj do RGB jeśli potrzebne
-            if img.mode in ('RGBA', 'LA', 'P'):
-                # Utwórz białe tło dla przezroczystości
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                if img.mode == 'P':
-                    img = img.convert('RGBA')
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # Zmień rozmiar jeśli za duży
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Zapisz jako JPEG z kompresją
-            if image_path.endswith('.png'):
-                jpeg_path = image_path.replace('.png', '.jpg')
-                img.save(jpeg_path, 'JPEG', quality=quality, optimize=True)
-                # Usuń oryginalny PNG
-                os.remove(image_path)
-                # Zmień nazwę z powrotem na PNG dla kompatybilności
-                os.rename(jpeg_path, image_path)
-            else:
-                img.save(image_path, 'JPEG', quality=quality, optimize=True)
-                
-        print(f"Image optimized: {image_path}")
-        return True
-        
-    except ImportError:
-        print("PIL/Pillow not available for image optimization", file=sys.stderr)
-        return False
-    except Exception as e:
-        print(f"Error optimizing image: {e}", file=sys.stderr)
-        return False
+from stl_mesh import read_stl, read_stl_triangle_count, compute_stl_stats, is_ascii_stl, MAX_FULL_LOAD_TRIANGLES
+from mesh_rasterizer import render_mesh
+from mesh_decimate import decimate_mesh, decimate_stl_file, DEFAULT_MAX_TRIANGLES
+from image_encode import (save_image, save_image_set, image_format, parse_sizes, render_size,
+                          DEFAULT_IMAGE_QUALITY)
+from artifact_cache import cached_file, converter_version
+
+# Moduły, od których zależy wygląd miniaturki (ich zmiana unieważnia artefakty)
+ADVANCED_RENDERER_SOURCES = ('advanced_stl_renderer.py', 'mesh_rasterizer.py', 'mesh_decimate.py',
+                             'stl_mesh.py', 'image_encode.py')
+
+# Tło i widok izometryczny jak w rendererach Open3D/VTK
+RENDER_BACKGROUND = (0.95, 0.95, 0.95)
+ISO_VIEW = (30, 45)
+
+# Nazwane widoki dla trybu wielu widoków: (elewacja, azymut) w stopniach
+VIEW_PRESETS = {
+    'iso': ISO_VIEW,
+    'front': (0, -90),
+    'back': (0, 90),
+    'right': (0, 0),
+    'left': (0, 180),
+    'top': (90, -90),
+    'bottom': (-90, -90),
+}
+
+def save_render(pixels, output_path, width, height, fmt=None, quality=DEFAULT_IMAGE_QUALITY, sizes=None):
+    """
+    Zapisuje render jako jeden obraz (width, height) albo, przy podanym sizes,
+    jako zestaw zmniejszonych wariantów z manifestem srcset
+    """
+    if sizes:
+        save_image_set(pixels, output_path, sizes, fmt, quality, primary_size=(width, height))
+    else:
+        save_image(pixels, output_path, fmt, quality, (width, height))
 
-def render_stl_with_open3d(input_path, output_path, width=300, height=300):
+def render_stl_with_open3d(input_path, output_path, width=300, height=300,
+                           max_triangles=DEFAULT_MAX_TRIANGLES, fmt=None, quality=DEFAULT_IMAGE_QUALITY,
+                           sizes=None):
     """Renderuje plik STL używając Open3D"""
+    render_width, render_height = render_size(sizes) if sizes else (width, height)
     try:
         import open3d as o3d
         
@@ -71,7 +68,7 @@ def render_stl_with_open3d(input_path, output_path, width=300, height=300):
         
         # Utwórz visualizer
         vis = o3d.visualization.Visualizer()
-        vis.create_window(width=width, height=height, visible=False)
+        vis.create_window(width=render_width, height=render_height, visible=False)
         
         # Dodaj mesh do sceny
         vis.add_geometry(mesh)
@@ -95,24 +92,30 @@ def render_stl_with_open3d(input_path, output_path, width=300, height=300):
         vis.poll_events()
         vis.update_renderer()
         
-        # Zrób screenshot
-        vis.capture_screen_image(output_path)
+        # Zrób screenshot do bufora w pamięci (bez pośredniego pliku)
+        buffer = np.asarray(vis.capture_screen_float_buffer(do_render=True))
         vis.destroy_window()
+        pixels = np.round(np.clip(buffer, 0.0, 1.0) * 255).astype(np.uint8)
         
-        # Optymalizuj rozmiar obrazu
-        optimize_image(output_path)
+        # Zakoduj i zapisz jednym atomowym zapisem
+        save_render(pixels, output_path, width, height, fmt, quality, sizes)
         
         return True
         
     except ImportError:
         print("Open3D not available, trying alternative method", file=sys.stderr)
-        return render_stl_with_vtk(input_path, output_path, width, height)
+        return render_stl_with_vtk(input_path, output_path, width, height, max_triangles,
+                                   fmt, quality, sizes)
     except Exception as e:
         print(f"Error rendering with Open3D: {e}", file=sys.stderr)
-        return render_stl_with_vtk(input_path, output_path, width, height)
+        return render_stl_with_vtk(input_path, output_path, width, height, max_triangles,
+                                   fmt, quality, sizes)
 
-def render_stl_with_vtk(input_path, output_path, width=300, height=300):
+def render_stl_with_vtk(input_path, output_path, width=300, height=300,
+                        max_triangles=DEFAULT_MAX_TRIANGLES, fmt=None, quality=DEFAULT_IMAGE_QUALITY,
+                        sizes=None):
     """Renderuje plik STL używając VTK"""
+    render_width, render_height = render_size(sizes) if sizes else (width, height)
     try:
         import vtk
         
@@ -147,7 +150,7 @@ def render_stl_with_vtk(input_path, output_path, width=300, height=300):
         # Utwórz okno renderowania
         render_window = vtk.vtkRenderWindow()
         render_window.AddRenderer(renderer)
-        render_window.SetSize(width, height)
+        render_window.SetSize(render_width, render_height)
         render_window.SetOffScreenRendering(1)  # Renderowanie bez wyświetlania okna
         
         # Renderuj
@@ -158,114 +161,263 @@ def render_stl_with_vtk(input_path, output_path, width=300, height=300):
         window_to_image.SetInput(render_window)
         window_to_image.Update()
         
-        writer = vtk.vtkPNGWriter()
-        writer.SetFileName(output_path)
-        writer.SetInputConnection(window_to_image.GetOutputPort())
-        writer.Write()
+        # Piksele bezpośrednio z bufora VTK (wiersze od dołu obrazu)
+        from vtk.util.numpy_support import vtk_to_numpy
+        image = window_to_image.GetOutput()
+        image_width, image_height, _ = image.GetDimensions()
+        pixels = vtk_to_numpy(image.GetPointData().GetScalars())
+        pixels = np.ascontiguousarray(pixels.reshape(image_height, image_width, -1)[::-1])
         
-        # Optymalizuj rozmiar obrazu
-        optimize_image(output_path)
+        # Zakoduj i zapisz jednym atomowym zapisem
+        save_render(pixels, output_path, width, height, fmt, quality, sizes)
         
         return True
         
     except ImportError:
         print("VTK not available, using fallback method", file=sys.stderr)
-        return render_stl_fallback(input_path, output_path, width, height)
+        return render_stl_fallback(input_path, output_path, width, height, max_triangles,
+                                   fmt=fmt, quality=quality, sizes=sizes)
     except Exception as e:
         print(f"Error rendering with VTK: {e}", file=sys.stderr)
-        return render_stl_fallback(input_path, output_path, width, height)
+        return render_stl_fallback(input_path, output_path, width, height, max_triangles,
+                                   fmt=fmt, quality=quality, sizes=sizes)
 
-def render_stl_fallback(input_path, output_path, width=300, height=300):
-    """Fallback renderer używający matplotlib z lepszą geometrią"""
+def load_stl_for_render(input_path, max_triangles=DEFAULT_MAX_TRIANGLES, stats=None):
+    """Wczytuje siatkę STL dla renderera NumPy i ogranicza liczbę trójkątów do budżetu"""
+    if max_triangles and not is_ascii_stl(input_path) and \
+            read_stl_triangle_count(input_path) > MAX_FULL_LOAD_TRIANGLES:
+        # Bardzo duże pliki decymowane porcjami z mapy pamięci
+        return decimate_stl_file(input_path, min(max_triangles, MAX_FULL_LOAD_TRIANGLES), stats)
+    
+    # Cała tablica trójkątów wczytywana jednym odczytem
+    # (duże pliki próbkowane z mapy pamięci)
+    triangles, _ = read_stl(input_path, MAX_FULL_LOAD_TRIANGLES)
+    vertices = triangles.reshape(-1, 3)
+    faces = np.arange(len(vertices)).reshape(-1, 3)
+    
+    # Ogranicz liczbę trójkątów (decymacja przy okazji spawa "zupę" trójkątów)
+    if max_triangles and len(faces) > max_triangles:
+        vertices, faces = decimate_mesh(vertices, faces, max_triangles)
+        print(f"Decimated mesh from {len(triangles)} to {len(faces)} triangles", file=sys.stderr)
+    
+    return vertices, faces
+
+def render_stl_fallback(input_path, output_path, width=300, height=300,
+                        max_triangles=DEFAULT_MAX_TRIANGLES, stats=None, fmt=None,
+                        quality=DEFAULT_IMAGE_QUALITY, sizes=None):
+    """Fallback renderer używający programowego z-bufora NumPy (bez OpenGL)"""
+    render_width, render_height = render_size(sizes) if sizes else (width, height)
     try:
-        import matplotlib.pyplot as plt
-        from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-        import struct
-        
-        # Proste parsowanie pliku STL
-        vertices = []
-        faces = []
-        
-        with open(input_path, 'rb') as f:
-            # Sprawdź czy to binary STL
-            header = f.read(80)
-            triangle_count = struct.unpack('<I', f.read(4))[0]
-            
-            for i in range(triangle_count):
-                # Pomiń normalną (12 bajtów)
-                f.read(12)
-                
-                # Wczytaj 3 wierzchołki (9 float'ów * 4 bajty)
-                triangle_vertices = []
-                for j in range(3):
-                    x, y, z = struct.unpack('<fff', f.read(12))
-                    vertex_idx = len(vertices)
-                    vertices.append([x, y, z])
-                    triangle_vertices.append(vertex_idx)
-                
-                faces.append(triangle_vertices)
-                f.read(2)  # Pomiń attribute byte count
-        
-        if not vertices:
+        vertices, faces = load_stl_for_render(input_path, max_triangles, stats)
+        
+        if len(faces) == 0:
             print("No vertices found in STL", file=sys.stderr)
             return False
         
-        # Utwórz figurę
-        fig = plt.figure(figsize=(width/100, height/100), dpi=100)
-        ax = fig.add_subplot(111, projection='3d')
+        # Izometryczny widok w kolorach jak w Open3D/VTK
+        pixels = render_mesh(vertices, faces, render_width, render_height,
+                             elevation=ISO_VIEW[0], azimuth=ISO_VIEW[1],
+                             background=RENDER_BACKGROUND)
         
-        # Przygotuj trójkąty
-        triangles = []
-        for face in faces:
-            triangle = [vertices[i] for i in face]
-            triangles.append(triangle)
+        # Zakoduj i zapisz jednym atomowym zapisem
+        save_render(pixels, output_path, width, height, fmt, quality, sizes)
         
-        # Renderuj z lepszymi kolorami
-        poly3d = Poly3DCollection(triangles, alpha=0.9, facecolor='lightsteelblue', 
-                                 edgecolor='navy', linewidth=0.1)
-        ax.add_collection3d(poly3d)
-        
-        # Ustaw granice
-        all_vertices = np.array(vertices)
-        ax.set_xlim(all_vertices[:, 0].min(), all_vertices[:, 0].max())
-        ax.set_ylim(all_vertices[:, 1].min(), all_vertices[:, 1].max())
-        ax.set_zlim(all_vertices[:, 2].min(), all_vertices[:, 2].max())
-        
-        # Izometryczny widok
-        ax.view_init(elev=30, azim=45)
-        ax.set_axis_off()
+        return True
         
-        # Zapisz
-        plt.savefig(output_path, dpi=150, bbox_inches='tight', 
-                   pad_inches=0, facecolor='white')
-        plt.close()
+    except Exception as e:
+        print(f"Fallback rendering failed: {e}", file=sys.stderr)
+        return False
+
+def parse_views(spec):
+    """
+    Parsuje listę widoków rozdzieloną przecinkami. Każdy element to nazwa
+    z VIEW_PRESETS, para "elewacja:azymut" albo "nazwa=elewacja:azymut".
+    Zwraca listę (nazwa, elewacja, azymut).
+    """
+    views = []
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        
+        name, _, angles = item.rpartition('=')
+        if not name and ':' not in angles:
+            if angles not in VIEW_PRESETS:
+                raise ValueError(f"Unknown view '{angles}', expected one of "
+                                 f"{', '.join(VIEW_PRESETS)} or elevation:azimuth")
+            views.append((angles, *VIEW_PRESETS[angles]))
+            continue
+        
+        elevation, _, azimuth = angles.partition(':')
+        elevation, azimuth = float(elevation), float(azimuth)
+        if not name:
+            name = f"e{elevation:g}_a{azimuth:g}".replace('-', 'm').replace('.', 'p')
+        views.append((name, elevation, azimuth))
+    
+    if not views:
+        raise ValueError("No views given")
+    
+    return views
+
+def render_stl_views(input_path, output_path, views, width=300, height=300, columns=None,
+                     max_triangles=DEFAULT_MAX_TRIANGLES, stats=None, fmt=None,
+                     quality=DEFAULT_IMAGE_QUALITY):
+    """
+    Renderuje kilka widoków z jednego wczytania siatki. Zapisuje arkusz
+    (sprite sheet) pod output_path, osobny obraz każdego widoku obok niego
+    (w tym samym formacie) oraz plik .views.json z położeniem kafelków w arkuszu.
+    """
+    try:
+        vertices, faces = load_stl_for_render(input_path, max_triangles, stats)
         
-        # Optymalizuj rozmiar obrazu
-        optimize_image(output_path)
+        if len(faces) == 0:
+            print("No vertices found in STL", file=sys.stderr)
+            return False
         
+        columns = max(1, min(columns or len(views), len(views)))
+        rows = -(-len(views) // columns)
+        background = np.round(np.array(RENDER_BACKGROUND) * 255).astype(np.uint8)
+        sheet = np.empty((rows * height, columns * width, 3), dtype=np.uint8)
+        sheet[:] = background
+        
+        root = os.path.splitext(output_path)[0]
+        fmt = image_format(output_path, fmt)
+        extension = {'JPEG': '.jpg', 'WEBP': '.webp'}.get(fmt, '.png')
+        layout = {
+            'sheet': os.path.basename(output_path),
+            'tile_width': width,
+            'tile_height': height,
+            'columns': columns,
+            'rows': rows,
+            'views': [],
+        }
+        
+        for index, (name, elevation, azimuth) in enumerate(views):
+            pixels = render_mesh(vertices, faces, width, height,
+                                 elevation=elevation, azimuth=azimuth,
+                                 background=RENDER_BACKGROUND)
+            
+            x, y = (index % columns) * width, (index // columns) * height
+            sheet[y:y + height, x:x + width] = pixels
+            
+            view_path = f"{root}_{name}{extension}"
+            save_image(pixels, view_path, fmt, quality)
+            layout['views'].append({
+                'name': name,
+                'elevation': elevation,
+                'azimuth': azimuth,
+                'x': x,
+                'y': y,
+                'file': os.path.basename(view_path),
+            })
+        
+        save_image(sheet, output_path, fmt, quality)
+        with open(f"{root}.views.json", 'w') as f:
+            json.dump(layout, f, indent=2)
+        
+        print(f"Rendered {len(views)} views: {output_path}")
         return True
         
     except Exception as e:
-        print(f"Fallback rendering failed: {e}", file=sys.stderr)
+        print(f"Multi-view rendering failed: {e}", file=sys.stderr)
+        return False
+
+def render_stl_thumbnail(input_path, output_path, width=300, height=300,
+                         max_triangles=DEFAULT_MAX_TRIANGLES, views=None, columns=None,
+                         fmt=None, quality=DEFAULT_IMAGE_QUALITY, sizes=None):
+    """
+    Renderuje miniaturkę (lub arkusz widoków przy podanym views) najlepszą
+    dostępną metodą. Format obrazu z fmt albo z rozszerzenia output_path;
+    z listą sizes render w największym rozmiarze daje zestaw wariantów srcset.
+    Zwraca True przy powodzeniu.
+    """
+    if not os.path.exists(input_path):
+        print(f"Input file does not exist: {input_path}", file=sys.stderr)
         return False
+    
+    # Statystyki z mapy pamięci - Open3D i VTK zawsze wczytują i renderują całą
+    # siatkę, więc pliki ponad budżet od razu trafiają do renderera z decymacją
+    try:
+        stats = None if is_ascii_stl(input_path) else compute_stl_stats(input_path)
+    except Exception as e:
+        print(f"Error computing STL statistics: {e}", file=sys.stderr)
+        return False
+    limit = min(MAX_FULL_LOAD_TRIANGLES, max_triangles or MAX_FULL_LOAD_TRIANGLES)
+    
+    if views:
+        # Wiele widoków zawsze z renderera NumPy - siatka wczytywana raz dla wszystkich
+        return render_stl_views(input_path, output_path, views, width, height,
+                                columns, max_triangles, stats, fmt, quality)
+    
+    if stats is not None and stats['triangle_count'] > limit:
+        print(f"Large STL ({stats['triangle_count']} triangles), skipping full mesh load "
+              f"and decimating to {limit}", file=sys.stderr)
+        return render_stl_fallback(input_path, output_path, width, height, limit, stats, fmt, quality,
+                                   sizes)
+    
+    # Spróbuj renderować używając najlepszej dostępnej metody
+    return render_stl_with_open3d(input_path, output_path, width, height, max_triangles, fmt, quality,
+                                  sizes)
 
 def main():
     parser = argparse.ArgumentParser(description='Advanced STL thumbnail renderer')
     parser.add_argument('input', help='Input STL file path')
-    parser.add_argument('output', help='Output PNG file path')
+    parser.add_argument('output', help='Output PNG file path (sprite sheet with --views)')
     parser.add_argument('--width', type=int, default=300, help='Thumbnail width')
     parser.add_argument('--height', type=int, default=300, help='Thumbnail height')
+    parser.add_argument('--max-triangles', type=int, default=DEFAULT_MAX_TRIANGLES,
+                        help='Decimate meshes above this triangle count before rendering (0 disables)')
+    parser.add_argument('--views',
+                        help='Render several views from one mesh load into a sprite sheet, '
+                             'e.g. "iso,front,top,right" or "name=elevation:azimuth"')
+    parser.add_argument('--columns', type=int, help='Sprite sheet columns (default: one row)')
+    parser.add_argument('--format', choices=['png', 'jpeg', 'webp'],
+                        help='Image format (default: from output file extension, PNG otherwise)')
+    parser.add_argument('--quality', type=int, default=DEFAULT_IMAGE_QUALITY,
+                        help='JPEG/WebP quality')
+    parser.add_argument('--sizes',
+                        help='Also write downsampled WebP + PNG/JPEG variants and a .srcset.json '
+                             'manifest, e.g. "150,600x600" (rendered once at the largest size; '
+                             'not used with --views)')
     
     args = parser.parse_args()
     
-    if not os.path.exists(args.input):
-        print(f"Input file does not exist: {args.input}", file=sys.stderr)
-        sys.exit(1)
+    views = None
+    if args.views:
+        try:
+            views = parse_views(args.views)
+        except ValueError as e:
+            print(f"Invalid --views: {e}", file=sys.stderr)
+            sys.exit(1)
     
-    # Spróbuj renderować używając najlepszej dostępnej metody
-    success = render_stl_with_open3d(args.input, args.output, args.width, args.height)
+    sizes = None
+    if args.sizes:
+        try:
+            sizes = parse_sizes(args.sizes, args.width, args.height)
+        except ValueError as e:
+            print(f"Invalid --sizes: {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    if views or sizes:
+        # Zestawy plików (arkusz widoków, warianty srcset) nie trafiają do magazynu artefaktów
+        success = render_stl_thumbnail(args.input, args.output, args.width, args.height,
+                                       args.max_triangles, views, args.columns,
+                                       args.format, args.quality, sizes)
+    elif not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        success = False
+    else:
+        # Miniaturka z magazynu artefaktów, jeśli ten sam model był już renderowany
+        success = cached_file(
+            args.input, args.output, 'advanced_stl_renderer',
+            converter_version(*ADVANCED_RENDERER_SOURCES),
+            lambda output_path: render_stl_thumbnail(args.input, output_path, args.width,
+                                                     args.height, args.max_triangles,
+                                                     fmt=args.format, quality=args.quality),
+            {'width': args.width, 'height': args.height, 'max_triangles': args.max_triangles,
+             'format': image_format(args.output, args.format), 'quality': args.quality})
     
     sys.exit(0 if success else 1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
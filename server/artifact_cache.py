@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Wspólny magazyn wyników konwersji adresowany treścią
+Klucz artefaktu to SHA-256 z zawartości pliku wejściowego, nazwy i wersji
+konwertera (skrót jego plików źródłowych) oraz opcji konwersji. Ponowne
+wyświetlenie lub ponowne przesłanie tego samego rysunku kończy się
+odczytem z magazynu zamiast pełnej konwersji.
+
+Katalog magazynu: zmienna ARTIFACT_CACHE_DIR (pusta wartość wyłącza magazyn),
+domyślnie uploads/artifact-cache w katalogu głównym aplikacji (niezależnie od
+katalogu roboczego). Limit rozmiaru: ARTIFACT_CACHE_MAX_BYTES - worker i
+batch_thumbnails przycinają magazyn do niego przez prune_to_limit().
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import contextmanager
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Domyślny katalog magazynu w uploads/ katalogu głównego aplikacji (jak ./uploads w routes.ts),
+# a nie katalogu roboczego - skrypty uruchamiane z server/ nie tworzą magazynu w źródłach
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(SERVER_DIR), 'uploads', 'artifact-cache')
+
+# Domyślny limit rozmiaru magazynu przy automatycznym przycinaniu (2 GiB)
+DEFAULT_MAX_BYTES = 2 << 30
+
+# Rozmiar bloku przy liczeniu skrótu plików
+HASH_BLOCK_SIZE = 1 << 20
+
+# Skróty już policzone w tym procesie: (ścieżka, rozmiar, mtime) -> sha256
+_digest_memo = {}
+
+
+def cache_dir():
+    """Katalog magazynu albo None, jeśli magazyn jest wyłączony"""
+    directory = os.environ.get('ARTIFACT_CACHE_DIR', DEFAULT_CACHE_DIR)
+    return os.path.abspath(directory) if directory else None
+
+
+def file_digest(path):
+    """SHA-256 zawartości pliku (heksadecymalnie)"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+                digest.update(block)
+        _digest_memo[memo_key] = digest.hexdigest()
+    return _digest_memo[memo_key]
+
+
+def converter_version(*source_names):
+    """
+    Wersja konwertera jako skrót jego plików źródłowych (nazwy względem server/).
+    Każda zmiana kodu konwertera unieważnia jego wcześniejsze artefakty.
+    """
+    digest = hashlib.sha256()
+    for name in source_names:
+        digest.update(name.encode('utf-8'))
+        digest.update(file_digest(os.path.join(SERVER_DIR, name)).encode('ascii'))
+    return digest.hexdigest()[:16]
+
+
+def artifact_key(input_path, converter, version, options=None):
+    """Klucz artefaktu: SHA-256 z treści wejścia, konwertera, jego wersji i opcji"""
+    payload = json.dumps({
+        'input': file_digest(input_path),
+        'converter': converter,
+        'version': version,
+        'options': options or {},
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def artifact_path(key, extension):
+    """Ścieżka artefaktu w magazynie (podkatalogi po dwóch pierwszych znakach klucza)"""
+    return os.path.join(cache_dir(), key[:2], key + extension)
+
+
+def get_artifact(key, extension):
+    """Ścieżka istniejącego artefaktu albo None"""
+    if cache_dir() is None:
+        return None
+    path = artifact_path(key, extension)
+    return path if os.path.exists(path) else None
+
+
+@contextmanager
+def atomic_open(target_path, mode='wb', encoding=None):
+    """
+    Plik do zapisu strumieniowego: treść trafia do pliku tymczasowego w katalogu
+    docelowym, a os.replace podmienia cel dopiero po udanym zamknięciu
+    """
+    directory = os.path.dirname(os.path.abspath(target_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_copy(source_path, target_path):
+    """Kopiuje plik przez plik tymczasowy w katalogu docelowym i os.replace"""
+    with atomic_open(target_path) as target, open(source_path, 'rb') as source:
+        shutil.copyfileobj(source, target, HASH_BLOCK_SIZE)
+
+
+def atomic_write(target_path, data):
+    """Zapisuje bajty przez plik tymczasowy w katalogu docelowym i os.replace"""
+    with atomic_open(target_path) as f:
+        f.write(data)
+
+
+def put_artifact(key, extension, data=None, source_path=None):
+    """Zapisuje atomowo artefakt z bajtów albo z pliku; zwraca jego ścieżkę lub None"""
+    if cache_dir() is None:
+        return None
+    path = artifact_path(key, extension)
+    try:
+        if source_path is not None:
+            atomic_copy(source_path, path)
+        else:
+            atomic_write(path, data)
+    except OSError as e:
+        # Magazyn jest tylko przyspieszeniem - błąd zapisu nie przerywa konwersji
+        print(f"Could not store artifact {path}: {e}", file=sys.stderr)
+        return None
+    return path
+
+
+def cached_file(input_path, output_path, converter, version, produce, options=None, extension=None):
+    """
+    Zapewnia plik output_path dla danego wejścia. Istniejący artefakt jest
+    kopiowany na miejsce; w przeciwnym razie produce(output_path) tworzy plik,
+    który trafia do magazynu, jeśli produce zwróci wartość różną od False.
+    Zwraca True dla trafienia w magazynie albo wynik produce.
+    """
+    extension = extension or os.path.splitext(output_path)[1]
+    try:
+        key = artifact_key(input_path, converter, version, options)
+        cached = get_artifact(key, extension)
+    except OSError as e:
+        print(f"Artifact cache unavailable: {e}", file=sys.stderr)
+        return produce(output_path)
+
+    if cached is not None:
+        try:
+            atomic_copy(cached, output_path)
+            return True
+        except OSError as e:
+            print(f"Could not copy artifact {cached}: {e}", file=sys.stderr)
+
+    result = produce(output_path)
+    if result is not False and os.path.exists(output_path):
+        put_artifact(key, extension, source_path=output_path)
+    return result
+
+
+def cached_text(input_path, converter, version, produce, options=None, extension='.txt',
+                is_valid=None):
+    """
+    Tekstowy wynik konwersji (SVG, JSON) z magazynu albo z produce().
+    Wynik trafia do magazynu tylko wtedy, gdy is_valid(wynik) jest prawdziwe,
+    np. żeby nie utrwalać SVG z komunikatem błędu.
+    """
+    try:
+        key = artifact_key(input_path, converter, version, options)
+        cached = get_artifact(key, extension)
+        if cached is not None:
+            with open(cached, 'r', encoding='utf-8') as f:
+                return f.read()
+    except OSError as e:
+        print(f"Artifact cache unavailable: {e}", file=sys.stderr)
+        return produce()
+
+    text = produce()
+    if text and (is_valid is None or is_valid(text)):
+        put_artifact(key, extension, data=text.encode('utf-8'))
+    return text
+
+
+def cached_stream(input_path, output, converter, version, produce, options=None, extension='.txt'):
+    """
+    Jak cached_file, ale wynikiem może być też strumień tekstowy (np. stdout).
+    produce(cel) zapisuje wynik strumieniowo do ścieżki albo strumienia i zwraca
+    False przy błędzie. Dla strumienia wynik powstaje w pliku tymczasowym
+    magazynu i jest przepisywany blokami - cały dokument nigdy nie leży w pamięci.
+    """
+    if isinstance(output, str):
+        return cached_file(input_path, output, converter, version, produce, options, extension)
+
+    try:
+        key = artifact_key(input_path, converter, version, options)
+        cached = get_artifact(key, extension)
+    except OSError as e:
+        print(f"Artifact cache unavailable: {e}", file=sys.stderr)
+        return produce(output)
+
+    if cached is None:
+        if cache_dir() is None:
+            return produce(output)
+        # Wynik do pliku tymczasowego, który po udanej konwersji trafia do magazynu
+        fd, tmp_path = tempfile.mkstemp(suffix=extension)
+        os.close(fd)
+        try:
+            result = produce(tmp_path)
+            if result is not False:
+                put_artifact(key, extension, source_path=tmp_path)
+            copy_to_stream(tmp_path, output)
+            return result
+        finally:
+            os.remove(tmp_path)
+
+    copy_to_stream(cached, output)
+    return True
+
+
+def copy_to_stream(path, output):
+    """Przepisuje plik tekstowy UTF-8 blokami do strumienia tekstowego"""
+    with open(path, 'r', encoding='utf-8') as f:
+        shutil.copyfileobj(f, output, HASH_BLOCK_SIZE)
+    output.flush()
+
+
+def prune_artifacts(max_bytes):
+    """Usuwa najdawniej używane artefakty, aż magazyn zmieści się w max_bytes"""
+    directory = cache_dir()
+    if directory is None or not os.path.isdir(directory):
+        return 0, 0
+
+    entries = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            # Pliki tymczasowe trwających zapisów (atomic_open) nie są usuwane
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+
+    return removed, total
+
+
+def max_cache_bytes():
+    """Limit rozmiaru magazynu z ARTIFACT_CACHE_MAX_BYTES (domyślnie DEFAULT_MAX_BYTES)"""
+    try:
+        return int(os.environ.get('ARTIFACT_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def prune_to_limit():
+    """Przycina magazyn do limitu; błędy są tylko zgłaszane (magazyn jest opcjonalny)"""
+    try:
+        return prune_artifacts(max_cache_bytes())
+    except OSError as e:
+        print(f"Artifact cache prune failed: {e}", file=sys.stderr)
+        return 0, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed conversion artifact cache')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    key_parser = subparsers.add_parser('key', help='Print the SHA-256 of an input file')
+    key_parser.add_argument('input', help='Input file path')
+
+    prune_parser = subparsers.add_parser('prune', help='Remove least recently used artifacts')
+    prune_parser.add_argument('--max-bytes', type=int, default=None,
+                              help='Target cache size in bytes (default: ARTIFACT_CACHE_MAX_BYTES)')
+
+    args = parser.parse_args()
+
+    if args.command == 'key':
+        print(file_digest(args.input))
+    else:
+        max_bytes = args.max_bytes if args.max_bytes is not None else max_cache_bytes()
+        removed, total = prune_artifacts(max_bytes)
+        print(f"Removed {removed} artifacts, cache size {total} bytes")
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Wsadowe generowanie miniaturek STL, DXF i STEP
+Przyjmuje katalog z modelami albo manifest JSON z listą zadań, rozdziela je
+na pulę procesów (domyślnie tyle, ile rdzeni), pomija aktualne miniaturki
+i zapisuje wynik każdego pliku jako linię JSON z czasem wykonania.
+
+Manifest to lista obiektów:
+
+    [{"input": "uploads/abc.stl", "output": "uploads/thumbnails/model_12.png",
+      "params": {"width": 400, "height": 400}}]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from artifact_cache import prune_to_limit
+
+# Parametry miniaturek jak w DEFAULT_OPTIONS z thumbnail-generator.ts
+DEFAULT_PARAMS = {
+    'width': 300,
+    'height': 300,
+    'quality': 85,
+    'background': '#f8f9fa',
+}
+
+# Typ zadania po rozszerzeniu pliku (jak generateThumbnail w thumbnail-generator.ts)
+FILE_TYPES = {
+    '.stl': 'stl',
+    '.dxf': 'dxf',
+    '.step': 'step',
+    '.stp': 'step',
+}
+
+# Pliki źródłowe konwerterów - miniaturka starsza od nich jest nieaktualna
+CONVERTER_SOURCES = {
+    'stl': ['advanced_stl_renderer.py', 'generate_stl_thumbnail.py', 'mesh_rasterizer.py',
+            'mesh_decimate.py', 'mesh_index.py', 'stl_mesh.py', 'image_encode.py'],
+    'dxf': ['dxf_matplotlib_converter.py', 'dxf_document.py', 'dxf_extents.py'],
+    'step': ['generate_step_thumbnail.py', 'image_encode.py'],
+}
+
+# Plik stanu w katalogu miniaturek: parametry, z którymi powstała każda z nich
+STATE_FILENAME = '.batch_thumbnails.json'
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def collect_directory_jobs(input_dir, output_dir=None, recursive=False, params=None):
+    """Zadania dla wszystkich obsługiwanych plików w katalogu"""
+    output_dir = output_dir or input_dir
+    jobs = []
+
+    for root, dirs, files in os.walk(input_dir):
+        if not recursive:
+            dirs[:] = []
+        dirs.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() not in FILE_TYPES:
+                continue
+            relative = os.path.relpath(os.path.join(root, name), input_dir)
+            jobs.append({
+                'input': os.path.join(root, name),
+                'output': os.path.join(output_dir, os.path.splitext(relative)[0] + '.png'),
+                'params': dict(params or {}),
+            })
+
+    return jobs
+
+
+def load_manifest_jobs(manifest_path, params=None):
+    """Zadania z manifestu JSON; ścieżki względne liczone od katalogu manifestu"""
+    with open(manifest_path, 'r') as f:
+        entries = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for entry in entries:
+        jobs.append({
+            'input': os.path.join(base_dir, entry['input']),
+            'output': os.path.join(base_dir, entry['output']),
+            'params': {**(params or {}), **entry.get('params', {})},
+            'type': entry.get('type'),
+        })
+    return jobs
+
+
+def job_type(job):
+    """Typ zadania z pola "type" albo z rozszerzenia pliku wejściowego"""
+    return job.get('type') or FILE_TYPES.get(os.path.splitext(job['input'])[1].lower())
+
+
+def load_state(output_dir):
+    try:
+        with open(os.path.join(output_dir, STATE_FILENAME), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_state(output_dir, state):
+    """Zapisuje atomowo plik stanu katalogu miniaturek"""
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, os.path.join(output_dir, STATE_FILENAME))
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_up_to_date(job, params, state):
+    """
+    Miniaturka jest aktualna, gdy jest nowsza od pliku wejściowego i od kodu
+    konwertera oraz powstała z tymi samymi parametrami. Miniaturki bez wpisu
+    w pliku stanu (utworzone przez aplikację) mają parametry domyślne.
+    """
+    try:
+        output_mtime = os.stat(job['output']).st_mtime_ns
+    except OSError:
+        return False
+
+    sources = [job['input']] + [os.path.join(SERVER_DIR, name)
+                                for name in CONVERTER_SOURCES[job_type(job)]]
+    for source in sources:
+        try:
+            if os.stat(source).st_mtime_ns > output_mtime:
+                return False
+        except OSError:
+            continue
+
+    previous = state.get(os.path.basename(job['output']), {}).get('params', DEFAULT_PARAMS)
+    return previous == params
+
+
+def _render_stl(job, params):
+    from advanced_stl_renderer import render_stl_thumbnail
+    from generate_stl_thumbnail import generate_stl_thumbnail
+
+    if render_stl_thumbnail(job['input'], job['output'], params['width'], params['height'],
+                            quality=params['quality']):
+        return True
+    # Ten sam fallback co w generateSTLThumbnail
+    return generate_stl_thumbnail(job['input'], job['output'], params['width'], params['height'],
+                                  params['quality'], params['background'])
+
+
+def _render_dxf(job, params):
+    from dxf_matplotlib_converter import convert_dxf_to_svg_matplotlib
+
+    # SVG z konwertera matplotlib, potem PNG przez ImageMagick jak w generateDXFThumbnail
+    fd, svg_path = tempfile.mkstemp(dir=os.path.dirname(job['output']), suffix='.svg')
+    os.close(fd)
+    try:
+        convert_dxf_to_svg_matplotlib(job['input'], svg_path)
+        try:
+            result = subprocess.run(
+                ['convert', svg_path,
+                 '-resize', f"{params['width']}x{params['height']}",
+                 '-background', params['background'],
+                 '-quality', str(params['quality']),
+                 job['output']],
+                capture_output=True, text=True)
+        except FileNotFoundError:
+            raise RuntimeError("ImageMagick 'convert' is required for DXF thumbnails")
+        if result.returncode != 0:
+            print(f"DXF thumbnail conversion failed: {result.stderr}", file=sys.stderr)
+            return False
+        return True
+    finally:
+        if os.path.exists(svg_path):
+            os.remove(svg_path)
+
+
+def _render_step(job, params):
+    from generate_step_thumbnail import generate_step_thumbnail
+
+    return generate_step_thumbnail(job['input'], job['output'], params['width'], params['height'],
+                                   params['quality'], params['background'])
+
+
+RENDERERS = {
+    'stl': _render_stl,
+    'dxf': _render_dxf,
+    'step': _render_step,
+}
+
+
+def run_job(job):
+    """Wykonuje jedno zadanie w procesie puli i zwraca wynik dla logu"""
+    started = time.perf_counter()
+    params = {**DEFAULT_PARAMS, **job.get('params', {})}
+    result = {'input': job['input'], 'output': job['output'], 'type': job_type(job)}
+
+    try:
+        os.makedirs(os.path.dirname(job['output']) or '.', exist_ok=True)
+        # Komunikaty konwerterów na stderr - stdout jest zarezerwowany dla logu
+        with contextlib.redirect_stdout(sys.stderr):
+            success = RENDERERS[result['type']](job, params)
+        if success and os.path.exists(job['output']):
+            result['status'] = 'ok'
+        else:
+            result['status'] = 'failed'
+            result['error'] = 'Converter did not produce an output file'
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def run_batch(jobs, workers=None, force=False, log=sys.stdout):
+    """
+    Uruchamia zadania w puli procesów. Każdy wynik trafia od razu do logu
+    jako linia JSON. Zwraca słownik z liczbą zadań według statusu.
+    """
+    summary = {'ok': 0, 'skipped': 0, 'failed': 0}
+    states = {}
+    submitted = []
+
+    def emit(result):
+        summary[result['status']] += 1
+        log.write(json.dumps(result) + '\n')
+        log.flush()
+
+    for job in jobs:
+        kind = job_type(job)
+        if kind not in RENDERERS:
+            emit({'input': job['input'], 'output': job['output'], 'type': kind,
+                  'status': 'failed', 'error': 'Unsupported file type', 'elapsed_ms': 0.0})
+            continue
+
+        params = {**DEFAULT_PARAMS, **job.get('params', {})}
+        output_dir = os.path.dirname(os.path.abspath(job['output']))
+        state = states.setdefault(output_dir, load_state(output_dir))
+        if not force and is_up_to_date({**job, 'type': kind}, params, state):
+            emit({'input': job['input'], 'output': job['output'], 'type': kind,
+                  'status': 'skipped', 'elapsed_ms': 0.0})
+            continue
+
+        submitted.append({**job, 'type': kind, 'params': params})
+
+    if submitted:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            futures = {pool.submit(run_job, job): job for job in submitted}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # Proces puli zakończył się bez wyniku (np. brak pamięci)
+                    result = {'input': job['input'], 'output': job['output'], 'type': job['type'],
+                              'status': 'failed', 'error': str(e), 'elapsed_ms': 0.0}
+                emit(result)
+
+                if result['status'] == 'ok':
+                    output_dir = os.path.dirname(os.path.abspath(job['output']))
+                    states[output_dir][os.path.basename(job['output'])] = {'params': job['params']}
+
+    for output_dir, state in states.items():
+        if state:
+            try:
+                save_state(output_dir, state)
+            except OSError as e:
+                print(f"Could not write batch state in {output_dir}: {e}", file=sys.stderr)
+
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Regenerate STL/DXF/STEP thumbnails in parallel')
+    parser.add_argument('input', help='Directory with model files or JSON manifest of jobs')
+    parser.add_argument('--output-dir', help='Thumbnail directory for directory input (default: same)')
+    parser.add_argument('--recursive', action='store_true', help='Scan subdirectories of input directory')
+    parser.add_argument('--width', type=int, help='Thumbnail width')
+    parser.add_argument('--height', type=int, help='Thumbnail height')
+    parser.add_argument('--quality', type=int, help='Image quality')
+    parser.add_argument('--background', help='Background color')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes')
+    parser.add_argument('--force', action='store_true', help='Regenerate even up-to-date thumbnails')
+    parser.add_argument('--log', help='Write JSON-lines result log to this file instead of stdout')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    # Parametry z linii poleceń nadpisują domyślne; parametry z manifestu mają pierwszeństwo
+    params = {name: getattr(args, name) for name in DEFAULT_PARAMS if getattr(args, name) is not None}
+
+    try:
+        if os.path.isdir(args.input):
+            jobs = collect_directory_jobs(args.input, args.output_dir, args.recursive, params)
+        else:
+            jobs = load_manifest_jobs(args.input, params)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error reading jobs from {args.input}: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    started = time.perf_counter()
+    log = open(args.log, 'w') if args.log else sys.stdout
+    try:
+        summary = run_batch(jobs, args.jobs, args.force, log)
+    finally:
+        if args.log:
+            log.close()
+
+    prune_to_limit()
+
+    print(f"Processed {len(jobs)} files in {time.perf_counter() - started:.1f} s: "
+          f"{summary['ok']} generated, {summary['skipped']} up to date, {summary['failed']} failed",
+          file=sys.stderr)
+
+    sys.exit(1 if summary['failed'] else 0)
+
+if __name__ == '__main__':
+    main()
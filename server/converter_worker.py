@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Stale działający proces konwerterów (worker)
+Wczytuje numpy, matplotlib, ezdxf i moduły konwerterów raz, a każde zadanie
+wykonuje w procesie potomnym utworzonym przez fork() z "rozgrzanego" rodzica,
+więc koszt zadania nie obejmuje importów. Zadania przyjmowane są jako linie JSON
+ze stdin albo z gniazda Unix (--socket):
+
+    {"id": 1, "op": "stl_thumbnail", "args": {"input": "a.stl", "output": "a.png"}}
+
+Na każde zadanie odpowiada jedna linia JSON:
+
+    {"id": 1, "ok": true, "result": true, "elapsed_ms": 41.7}
+"""
+
+import argparse
+import importlib
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+import traceback
+
+from artifact_cache import prune_to_limit
+
+# Moduły wczytywane w procesie rodzica przed pierwszym zadaniem
+PRELOAD_MODULES = [
+    'numpy',
+    'PIL.Image',
+    'ezdxf',
+    'matplotlib.figure',
+    'matplotlib.patches',
+    'matplotlib.font_manager',
+    'matplotlib.backends.backend_svg',
+    'stl_mesh',
+    'mesh_index',
+    'mesh_decimate',
+    'mesh_rasterizer',
+    'mesh_analysis',
+    'mesh_obb',
+    'mesh_components',
+    'generate_glb',
+    'generate_lods',
+    'generate_stl_thumbnail',
+    'advanced_stl_renderer',
+    'dxf_document',
+    'dxf_extents',
+    'dxf_svg_writer',
+    'enhanced_dxf_converter',
+    'dxf_matplotlib_converter',
+    'dxf_converter',
+]
+
+# Co ile sekund (po zakończeniu zadania) magazyn artefaktów jest przycinany do limitu
+PRUNE_INTERVAL_SECONDS = 600
+
+# Maksymalny rozmiar odpowiedzi zadania przekazywanej przez potok (SVG bywa duży)
+MAX_RESULT_BYTES = 64 << 20
+
+
+def preload_modules(names=PRELOAD_MODULES):
+    """Importuje moduły w rodzicu; brakujące zależności wyłączają tylko swoje operacje"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+    loaded = {}
+    for name in names:
+        try:
+            loaded[name] = importlib.import_module(name)
+        except (ImportError, SystemExit) as e:
+            # Brak ezdxf/matplotlib wychodzi dopiero przy konwersji w procesie zadania
+            print(f"Worker: module {name} unavailable: {e}", file=sys.stderr)
+    return loaded
+
+
+def _module(name):
+    module = sys.modules.get(name)
+    if module is None:
+        raise RuntimeError(f"Module {name} is not available in this worker")
+    return module
+
+
+def op_stl_thumbnail(args):
+    """Miniaturka STL jak generate_stl_thumbnail.py"""
+    module = _module('generate_stl_thumbnail')
+    return module.generate_stl_thumbnail(
+        args['input'], args['output'],
+        args.get('width', 300), args.get('height', 300),
+        args.get('quality', 85), args.get('background', '#f8f9fa'),
+        args.get('max_triangles', module.DEFAULT_MAX_TRIANGLES),
+        args.get('sizes'),
+    )
+
+
+def op_stl_render(args):
+    """Miniaturka lub arkusz widoków jak advanced_stl_renderer.py"""
+    module = _module('advanced_stl_renderer')
+    views = args.get('views')
+    if isinstance(views, str):
+        views = module.parse_views(views)
+    return module.render_stl_thumbnail(
+        args['input'], args['output'],
+        args.get('width', 300), args.get('height', 300),
+        args.get('max_triangles', module.DEFAULT_MAX_TRIANGLES),
+        views, args.get('columns'),
+        args.get('format'), args.get('quality', module.DEFAULT_IMAGE_QUALITY),
+        args.get('sizes'),
+    )
+
+
+# Konwertery DXF -> SVG w kolejności używanej przez routes.ts
+DXF_SVG_CONVERTERS = {
+    'enhanced': ('enhanced_dxf_converter', 'convert_dxf_to_svg_enhanced'),
+    'matplotlib': ('dxf_matplotlib_converter', 'convert_dxf_to_svg_matplotlib'),
+    'basic': ('dxf_converter', 'convert_dxf_to_svg'),
+}
+
+
+def op_dxf_svg(args):
+    """
+    Konwersja DXF do SVG wybranym konwerterem. Bez "output" zwraca treść SVG,
+    inaczej zapisuje plik i zwraca jego ścieżkę.
+    """
+    module_name, function_name = DXF_SVG_CONVERTERS[args.get('converter', 'enhanced')]
+    svg = getattr(_module(module_name), function_name)(args['input'], args.get('output'))
+    return args['output'] if args.get('output') else svg
+
+
+def op_dxf_info(args):
+    """Informacje o pliku DXF (tryb "info" konwerterów)"""
+    module_name, _ = DXF_SVG_CONVERTERS[args.get('converter', 'enhanced')]
+    return _module(module_name).parse_dxf_file(args['input'])
+
+
+def op_dxf_json(args):
+    """Eksport DXF do JSON (tryb "json" konwertera rozszerzonego)"""
+    result = _module('enhanced_dxf_converter').export_dxf_to_json(args['input'], args.get('output'))
+    return args['output'] if args.get('output') else json.loads(result)
+
+
+def op_mesh_info(args):
+    """Objętość, pole, wymiary i szczelność siatki STL jak mesh_analysis.py"""
+    module = _module('mesh_analysis')
+    return module.analyze_stl_file(args['input'], args.get('tolerance', module.DEFAULT_WELD_TOLERANCE))
+
+
+def op_mesh_obb(args):
+    """Minimalny prostopadłościan zorientowany (wymiar surówki) siatki STL jak mesh_obb.py"""
+    module = _module('mesh_obb')
+    box = module.stl_bounding_box(args['input'], args.get('tolerance', module.DEFAULT_WELD_TOLERANCE))
+    return module.box_info(box)
+
+
+def op_mesh_components(args):
+    """Rozłączne powłoki siatki STL ze statystykami jak mesh_components.py"""
+    module = _module('mesh_components')
+    return module.analyze_components(args['input'], args.get('tolerance', module.DEFAULT_WELD_TOLERANCE),
+                                     args.get('output_dir'))
+
+
+def op_glb_export(args):
+    """Eksport STL/STEP do GLB jak generate_glb.py"""
+    module = _module('generate_glb')
+    return module.generate_glb(args['input'], args['output'],
+                               args.get('crease_angle', module.DEFAULT_CREASE_ANGLE), args.get('tolerance'))
+
+
+def op_lod_chain(args):
+    """Łańcuch poziomów szczegółowości GLB z manifestem jak generate_lods.py"""
+    module = _module('generate_lods')
+    ratios = args.get('levels', module.DEFAULT_LOD_RATIOS)
+    if isinstance(ratios, str):
+        ratios = module.parse_ratios(ratios)
+    return module.generate_lods(args['input'], args.get('output_dir'), ratios,
+                                args.get('crease_angle', module.DEFAULT_CREASE_ANGLE), args.get('tolerance'))
+
+
+OPERATIONS = {
+    'stl_thumbnail': op_stl_thumbnail,
+    'stl_render': op_stl_render,
+    'mesh_info': op_mesh_info,
+    'mesh_obb': op_mesh_obb,
+    'mesh_components': op_mesh_components,
+    'glb_export': op_glb_export,
+    'lod_chain': op_lod_chain,
+    'dxf_svg': op_dxf_svg,
+    'dxf_info': op_dxf_info,
+    'dxf_json': op_dxf_json,
+}
+
+
+def run_job(request):
+    """Wykonuje zadanie w bieżącym procesie i zwraca słownik odpowiedzi"""
+    started = time.perf_counter()
+    response = {'id': request.get('id')}
+    try:
+        operation = OPERATIONS.get(request.get('op'))
+        if operation is None:
+            raise ValueError(f"Unknown operation: {request.get('op')}")
+        result = operation(request.get('args') or {})
+        # Funkcje konwerterów sygnalizują błąd wartością False
+        response['ok'] = result is not False
+        response['result'] = result
+    except Exception as e:
+        traceback.print_exc(file=sys.stderr)
+        response['ok'] = False
+        response['error'] = str(e)
+    response['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return response
+
+
+class ClientConnection:
+    """Połączenie przez gniazdo Unix; zamykane po odesłaniu odpowiedzi na wszystkie zadania"""
+
+    def __init__(self, connection, worker):
+        self.connection = connection
+        self.worker = worker
+        self.buffer = bytearray()
+        self.eof = False
+
+    def reply(self, response):
+        try:
+            self.connection.setblocking(True)
+            self.connection.sendall((json.dumps(response) + '\n').encode('utf-8'))
+            self.connection.setblocking(False)
+        except OSError:
+            pass
+        self.close_if_done()
+
+    def read(self):
+        try:
+            data = self.connection.recv(1 << 16)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+
+        if data:
+            self.buffer.extend(data)
+            *lines, rest = bytes(self.buffer).split(b'\n')
+            self.buffer = bytearray(rest)
+        else:
+            self.worker.selector.unregister(self.connection)
+            lines = [bytes(self.buffer)]
+
+        for line in lines:
+            self.worker.handle_line(line.decode('utf-8', errors='replace'), self.reply)
+
+        if not data:
+            self.eof = True
+            self.close_if_done()
+
+    def close_if_done(self):
+        if self.eof and self.connection.fileno() >= 0 and not self.worker.has_jobs_for(self.reply):
+            self.connection.close()
+
+
+class Worker:
+    """Pętla zdarzeń rodzica: przyjmuje żądania, uruchamia fork() i odsyła odpowiedzi"""
+
+    def __init__(self, max_jobs):
+        self.max_jobs = max_jobs
+        # poll() zamiast epoll, bo epoll odrzuca zwykłe pliki (stdin przekierowany z pliku)
+        self.selector = getattr(selectors, 'PollSelector', selectors.SelectSelector)()
+        self.pending = []    # (request, reply) czekające na wolne miejsce
+        self.running = {}    # fd potoku -> [pid, bufor, request, reply, obcięty]
+        self.shutting_down = False
+        self.last_prune = time.monotonic()
+
+    # --- Wejście żądań ---
+
+    def handle_line(self, line, reply):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+        except ValueError as e:
+            reply({'id': None, 'ok': False, 'error': f"Invalid request: {e}"})
+            return
+
+        op = request.get('op')
+        if op == 'ping':
+            reply({'id': request.get('id'), 'ok': True, 'result': 'pong'})
+        elif op == 'ops':
+            reply({'id': request.get('id'), 'ok': True, 'result': sorted(OPERATIONS)})
+        elif op == 'shutdown':
+            self.shutting_down = True
+            reply({'id': request.get('id'), 'ok': True, 'result': 'bye'})
+        else:
+            self.pending.append((request, reply))
+            self.start_jobs()
+
+    # --- Zadania w procesach potomnych ---
+
+    def start_jobs(self):
+        while self.pending and len(self.running) < self.max_jobs:
+            request, reply = self.pending.pop(0)
+            read_fd, write_fd = os.pipe()
+            pid = os.fork()
+
+            if pid == 0:
+                # Proces potomny: stdout konwerterów trafia na stderr, żeby nie
+                # mieszać się z protokołem; odpowiedź idzie potokiem do rodzica
+                os.close(read_fd)
+                try:
+                    signal.signal(signal.SIGINT, signal.SIG_DFL)
+                    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                    os.dup2(2, 1)
+                    response = run_job(request)
+                    try:
+                        payload = json.dumps(response).encode('utf-8')
+                    except (TypeError, ValueError) as e:
+                        payload = json.dumps({'id': request.get('id'), 'ok': False,
+                                              'error': f"Unserializable result: {e}"}).encode('utf-8')
+                    with os.fdopen(write_fd, 'wb') as pipe:
+                        pipe.write(payload)
+                finally:
+                    os._exit(0)
+
+            os.close(write_fd)
+            os.set_blocking(read_fd, False)
+            self.running[read_fd] = [pid, bytearray(), request, reply, False]
+            self.selector.register(read_fd, selectors.EVENT_READ, ('job', read_fd))
+
+    def read_job(self, read_fd):
+        job = self.running[read_fd]
+        try:
+            data = os.read(read_fd, 1 << 16)
+        except BlockingIOError:
+            return
+        if data:
+            # Za dużą odpowiedź czytamy do końca, ale jej nie przechowujemy
+            if len(job[1]) + len(data) <= MAX_RESULT_BYTES:
+                job[1].extend(data)
+            else:
+                job[4] = True
+            return
+
+        self.selector.unregister(read_fd)
+        os.close(read_fd)
+        del self.running[read_fd]
+        pid, payload, request, reply, truncated = job
+
+        _, status = os.waitpid(pid, 0)
+        if truncated:
+            response = {'id': request.get('id'), 'ok': False,
+                        'error': f"Job result exceeds {MAX_RESULT_BYTES} bytes, use an output file"}
+        elif payload:
+            response = json.loads(payload.decode('utf-8'))
+        else:
+            response = {'id': request.get('id'), 'ok': False,
+                        'error': f"Job process exited without a result (status {status})"}
+        reply(response)
+        self.start_jobs()
+        self.prune_cache()
+
+    def prune_cache(self):
+        """Przycina magazyn artefaktów co PRUNE_INTERVAL_SECONDS"""
+        if time.monotonic() - self.last_prune >= PRUNE_INTERVAL_SECONDS:
+            prune_to_limit()
+            self.last_prune = time.monotonic()
+
+    # --- Transport ---
+
+    def serve_stdio(self):
+        """Żądania ze stdin, odpowiedzi na stdout (jedna linia JSON na zadanie)"""
+        stdout = sys.stdout
+
+        def reply(response):
+            stdout.write(json.dumps(response) + '\n')
+            stdout.flush()
+
+        stdin_fd = sys.stdin.fileno()
+        os.set_blocking(stdin_fd, False)
+        self.selector.register(stdin_fd, selectors.EVENT_READ, ('stdin', reply))
+        buffer = bytearray()
+        stdin_open = True
+
+        while not self.shutting_down and (stdin_open or self.pending or self.running):
+            for key, _ in self.selector.select():
+                kind, value = key.data
+                if kind == 'job':
+                    self.read_job(value)
+                    continue
+                try:
+                    data = os.read(stdin_fd, 1 << 16)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    stdin_open = False
+                    self.selector.unregister(stdin_fd)
+                    data, buffer = bytes(buffer) + b'\n', bytearray()
+                buffer.extend(data)
+                *lines, rest = bytes(buffer).split(b'\n')
+                buffer = bytearray(rest)
+                for line in lines:
+                    self.handle_line(line.decode('utf-8', errors='replace'), reply)
+
+        self.wait_for_jobs()
+
+    def serve_socket(self, socket_path):
+        """Żądania z gniazda Unix; wiele połączeń i zadań jednocześnie"""
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(socket_path)
+        os.chmod(socket_path, 0o600)
+        server.listen()
+        server.setblocking(False)
+        self.selector.register(server, selectors.EVENT_READ, ('accept', None))
+        print(f"Worker listening on {socket_path}", file=sys.stderr)
+
+        try:
+            while not self.shutting_down:
+                for key, _ in self.selector.select():
+                    kind, value = key.data
+                    if kind == 'job':
+                        self.read_job(value)
+                    elif kind == 'accept':
+                        connection, _ = server.accept()
+                        connection.setblocking(False)
+                        self.selector.register(connection, selectors.EVENT_READ,
+                                               ('client', ClientConnection(connection, self)))
+                    else:
+                        value.read()
+            self.wait_for_jobs()
+        finally:
+            server.close()
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+
+    def has_jobs_for(self, reply):
+        """Czy zadania danego klienta czekają lub trwają"""
+        return any(job[3] == reply for job in self.running.values()) or \
+            any(pending_reply == reply for _, pending_reply in self.pending)
+
+    def wait_for_jobs(self):
+        """Dokańcza uruchomione zadania (np. po "shutdown" albo końcu stdin)"""
+        while self.running:
+            for key, _ in self.selector.select():
+                kind, value = key.data
+                if kind == 'job':
+                    self.read_job(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Warm worker process for STL/DXF converters')
+    parser.add_argument('--socket', help='Listen on this Unix socket path instead of stdin/stdout')
+    parser.add_argument('--max-jobs', type=int, default=os.cpu_count() or 1,
+                        help='Maximum number of jobs running at once')
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    prune_to_limit()
+    preload_modules()
+    print(f"Worker ready in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"(operations: {', '.join(sorted(OPERATIONS))})", file=sys.stderr)
+
+    worker = Worker(max(1, args.max_jobs))
+    try:
+        if args.socket:
+            worker.serve_socket(args.socket)
+        else:
+            worker.serve_stdio()
+    except KeyboardInterrupt:
+        pass
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
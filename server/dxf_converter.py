@@ -8,6 +8,7 @@ jak i specjalną bibliotekę do obsługi plików DXF, która lepiej radzi sobie
 z plikami DXF utworzonymi w różnych programach CAD.
 """
 
+import io
 import os
 import sys
 import json
@@ -18,6 +19,10 @@ import ezdxf
 from typing import Dict, Any, List, Tuple, Optional
 import logging
 
+from artifact_cache import cached_stream, converter_version
+from dxf_document import DxfDocument
+from dxf_svg_writer import svg_output
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -79,6 +84,16 @@ def convert_dxf_to_svg_with_custom_library(dxf_path, svg_path=None):
     raise NotImplementedError("Custom DXF library integration not implemented yet")
 
 
+def entity_vertices(entity):
+    """Wierzchołki encji mających get_points (granice w trybie info)"""
+    if hasattr(entity, 'get_points'):
+        try:
+            return entity.get_points()
+        except Exception:
+            pass
+    return []
+
+
 def parse_dxf_file(dxf_path):
     """Parsowanie pliku DXF i zwrócenie podstawowych informacji o nim"""
     try:
@@ -112,75 +127,22 @@ def parse_dxf_file(dxf_path):
                     raise ValueError("Custom library failed and ezdxf is not available")
         
         # Używamy ezdxf jako głównej biblioteki lub jako fallback
-        if HAVE_EZDXF:
-            try:
-                with open("/tmp/dxf_debug.log", "a") as f:
-                    f.write("Using ezdxf library\n")
-                doc = ezdxf.readfile(dxf_path)
-            except Exception as e:
-                with open("/tmp/dxf_debug.log", "a") as f:
-                    f.write(f"Standard readfile failed: {str(e)}\n")
-                # Spróbuj otworzyć jako strumień z różnymi kodowaniami
-                for encoding in ['utf-8', 'latin1', 'ascii', 'cp1250', 'cp1252']:
-                    try:
-                        with open("/tmp/dxf_debug.log", "a") as f:
-                            f.write(f"Trying encoding: {encoding}\n")
-                        with open(dxf_path, encoding=encoding, errors='ignore') as fp:
-                            doc = ezdxf.read(fp)
-                        with open("/tmp/dxf_debug.log", "a") as f:
-                            f.write(f"Success with encoding: {encoding}\n")
-                        break
-                    except Exception:
-                        continue
-                else:
-                    # Jeśli żadne kodowanie nie zadziałało, zgłoś błąd
-                    raise ValueError(f"Could not read DXF file with any encoding: {str(e)}")
-        else:
+        # (sesja dokumentu sama próbuje innych kodowań, gdy readfile zawiedzie)
+        if not HAVE_EZDXF:
             raise ValueError("No DXF library available")
+        with open("/tmp/dxf_debug.log", "a") as f:
+            f.write("Using ezdxf library\n")
+        document = DxfDocument(dxf_path, entity_vertices)
         
-        modelspace = doc.modelspace()
-        
-        # Zbieranie informacji o warstwach
-        layers = {layer.dxf.name: {
-            'name': layer.dxf.name,
-            'color': layer.dxf.color,
-            'linetype': layer.dxf.linetype
-        } for layer in doc.layers}
-        
-        # Liczenie encji w modelspace
-        entity_counts = {}
-        total_entities = 0
-        
-        for entity in modelspace:
-            entity_type = entity.dxftype()
-            entity_counts[entity_type] = entity_counts.get(entity_type, 0) + 1
-            total_entities += 1
-        
-        # Określenie wymiarów dokumentu
-        min_x, min_y = float('inf'), float('inf')
-        max_x, max_y = float('-inf'), float('-inf')
-        
-        for entity in modelspace:
-            if hasattr(entity, 'get_points'):
-                try:
-                    points = entity.get_points()
-                    for point in points:
-                        min_x = min(min_x, point[0])
-                        min_y = min(min_y, point[1])
-                        max_x = max(max_x, point[0])
-                        max_y = max(max_y, point[1])
-                except Exception:
-                    pass
-        
-        # Jeśli nie znaleziono encji, ustaw domyślne wymiary
-        if min_x == float('inf'):
-            min_x, min_y = 0, 0
-            max_x, max_y = 100, 100
+        # Liczniki encji i wymiary dokumentu z jednego przejścia po modelspace
+        entity_counts = document.entity_counts
+        total_entities = document.entity_count
+        min_x, min_y, max_x, max_y = document.bounds
         
         # Zwróć informacje o dokumencie
         result = {
             'filename': os.path.basename(dxf_path),
-            'layers': list(layers.values()),
+            'layers': document.layers,
             'entity_counts': entity_counts,
             'total_entities': total_entities,
             'bounds': {
@@ -308,129 +270,123 @@ def get_entity_bounds(entity) -> Tuple[float, float, float, float]:
         logger.warning(f"Error getting entity bounds: {e}")
         return (0, 0, 0, 0)
 
-def convert_dxf_to_svg(dxf_path: str, svg_path: Optional[str] = None) -> str:
+def entity_bound_corners(entity) -> List[Tuple[float, float]]:
+    """Opposite corners of the entity bounding box (bounds used for the SVG viewBox)"""
+    entity_min_x, entity_min_y, entity_max_x, entity_max_y = get_entity_bounds(entity)
+    return [(entity_min_x, entity_min_y), (entity_max_x, entity_max_y)]
+
+def iter_svg_lines(document: DxfDocument):
     """
-    Convert DXF file to SVG with improved scale preservation and centering.
+    Yield the SVG document line by line with improved scale preservation and centering.
+    Pass 1 (document bounds) runs before the header, so nothing is patched afterwards.
     """
-    try:
-        # Load DXF file
-        doc = ezdxf.readfile(dxf_path)
-        modelspace = doc.modelspace()
-        
-        # Detect units and get scale factor
-        unit_name, scale_factor = detect_units(doc)
-        logger.info(f"Detected units: {unit_name} (scale factor: {scale_factor})")
-        
-        # Calculate bounds
-        min_x = min_y = float('inf')
-        max_x = max_y = float('-inf')
-        
-        for entity in modelspace:
-            entity_min_x, entity_min_y, entity_max_x, entity_max_y = get_entity_bounds(entity)
-            min_x = min(min_x, entity_min_x)
-            min_y = min(min_y, entity_min_y)
-            max_x = max(max_x, entity_max_x)
-            max_y = max(max_y, entity_max_y)
-        
-        if min_x == float('inf'):
-            min_x = min_y = 0
-            max_x = max_y = 100
-        
-        # Calculate dimensions
-        width = (max_x - min_x) * scale_factor
-        height = (max_y - min_y) * scale_factor
-        
-        # Add margin
-        margin = max(width, height) * DEFAULT_MARGIN_PERCENT
-        min_x -= margin / scale_factor
-        min_y -= margin / scale_factor
-        max_x += margin / scale_factor
-        max_y += margin / scale_factor
-        
-        # Normalize scale for SVG
-        svg_width, svg_height = normalize_scale(width, height)
-        scale = min(svg_width / width, svg_height / height)
-        
-        # Calculate translation to center the drawing
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-        
-        # Start SVG
-        lines = []
-        lines.append('<?xml version="1.0" encoding="UTF-8"?>')
-        lines.append('<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">')
-        lines.append(f'<svg version="1.1" width="{svg_width:.{SVG_PRECISION}f}" height="{svg_height:.{SVG_PRECISION}f}" ' +
-                    f'viewBox="{min_x:.{SVG_PRECISION}f} {min_y:.{SVG_PRECISION}f} {(max_x-min_x):.{SVG_PRECISION}f} {(max_y-min_y):.{SVG_PRECISION}f}" ' +
-                    'xmlns="http://www.w3.org/2000/svg">')
-        
-        # Add metadata
-        lines.append('<metadata>')
-        lines.append(f'<units>{unit_name}</units>')
-        lines.append(f'<scale>{scale:.{SVG_PRECISION}f}</scale>')
-        lines.append('</metadata>')
+    modelspace = document.entities
+    
+    # Detect units and get scale factor
+    unit_name, scale_factor = detect_units(document.doc)
+    logger.info(f"Detected units: {unit_name} (scale factor: {scale_factor})")
+    
+    # Calculate bounds
+    min_x, min_y, max_x, max_y = document.bounds
+    
+    # Calculate dimensions
+    width = (max_x - min_x) * scale_factor
+    height = (max_y - min_y) * scale_factor
+    
+    # Add margin
+    margin = max(width, height) * DEFAULT_MARGIN_PERCENT
+    min_x -= margin / scale_factor
+    min_y -= margin / scale_factor
+    max_x += margin / scale_factor
+    max_y += margin / scale_factor
+    
+    # Normalize scale for SVG
+    svg_width, svg_height = normalize_scale(width, height)
+    scale = min(svg_width / width, svg_height / height)
+    
+    # Calculate translation to center the drawing
+    center_x = (min_x + max_x) / 2
+    center_y = (min_y + max_y) / 2
+    
+    # Start SVG
+    yield '<?xml version="1.0" encoding="UTF-8"?>'
+    yield '<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" "http://www.w3.org/Graphics/SVG/1.1/DTD/svg11.dtd">'
+    yield (f'<svg version="1.1" width="{svg_width:.{SVG_PRECISION}f}" height="{svg_height:.{SVG_PRECISION}f}" ' +
+           f'viewBox="{min_x:.{SVG_PRECISION}f} {min_y:.{SVG_PRECISION}f} {(max_x-min_x):.{SVG_PRECISION}f} {(max_y-min_y):.{SVG_PRECISION}f}" ' +
+           'xmlns="http://www.w3.org/2000/svg">')
+    
+    # Add metadata
+    yield '<metadata>'
+    yield f'<units>{unit_name}</units>'
+    yield f'<scale>{scale:.{SVG_PRECISION}f}</scale>'
+    yield '</metadata>'
+    
+    # Transform group for proper orientation
+    yield f'<g transform="scale(1,-1) translate({-center_x:.{SVG_PRECISION}f},{-center_y:.{SVG_PRECISION}f})">'
+    
+    # Convert entities
+    for entity in modelspace:
+        if entity.dxftype() == 'LINE':
+            start = entity.dxf.start
+            end = entity.dxf.end
+            yield (f'<line x1="{start[0]:.{SVG_PRECISION}f}" y1="{start[1]:.{SVG_PRECISION}f}" ' +
+                   f'x2="{end[0]:.{SVG_PRECISION}f}" y2="{end[1]:.{SVG_PRECISION}f}" ' +
+                   'stroke="black" stroke-width="0.5"/>')
         
-        # Transform group for proper orientation
-        lines.append(f'<g transform="scale(1,-1) translate({-center_x:.{SVG_PRECISION}f},{-center_y:.{SVG_PRECISION}f})">')
+        elif entity.dxftype() == 'CIRCLE':
+            center = entity.dxf.center
+            radius = entity.dxf.radius
+            yield (f'<circle cx="{center[0]:.{SVG_PRECISION}f}" cy="{center[1]:.{SVG_PRECISION}f}" ' +
+                   f'r="{radius:.{SVG_PRECISION}f}" stroke="black" fill="none" stroke-width="0.5"/>')
         
-        # Convert entities
-        for entity in modelspace:
-            if entity.dxftype() == 'LINE':
-                start = entity.dxf.start
-                end = entity.dxf.end
-                lines.append(f'<line x1="{start[0]:.{SVG_PRECISION}f}" y1="{start[1]:.{SVG_PRECISION}f}" ' +
-                           f'x2="{end[0]:.{SVG_PRECISION}f}" y2="{end[1]:.{SVG_PRECISION}f}" ' +
-                           'stroke="black" stroke-width="0.5"/>')
+        elif entity.dxftype() == 'ARC':
+            center = entity.dxf.center
+            radius = entity.dxf.radius
+            start_angle = entity.dxf.start_angle
+            end_angle = entity.dxf.end_angle
             
-            elif entity.dxftype() == 'CIRCLE':
-                center = entity.dxf.center
-                radius = entity.dxf.radius
-                lines.append(f'<circle cx="{center[0]:.{SVG_PRECISION}f}" cy="{center[1]:.{SVG_PRECISION}f}" ' +
-                           f'r="{radius:.{SVG_PRECISION}f}" stroke="black" fill="none" stroke-width="0.5"/>')
+            # Ensure angles are properly ordered
+            if end_angle < start_angle:
+                end_angle += 360
             
-            elif entity.dxftype() == 'ARC':
-                center = entity.dxf.center
-                radius = entity.dxf.radius
-                start_angle = entity.dxf.start_angle
-                end_angle = entity.dxf.end_angle
-                
-                # Ensure angles are properly ordered
-                if end_angle < start_angle:
-                    end_angle += 360
-                
-                # Calculate start and end points
-                start_x = center[0] + radius * math.cos(math.radians(start_angle))
-                start_y = center[1] + radius * math.sin(math.radians(start_angle))
-                end_x = center[0] + radius * math.cos(math.radians(end_angle))
-                end_y = center[1] + radius * math.sin(math.radians(end_angle))
-                
-                # Determine if arc is larger than 180 degrees
-                large_arc = 1 if (end_angle - start_angle) > 180 else 0
-                
-                lines.append(f'<path d="M {start_x:.{SVG_PRECISION}f},{start_y:.{SVG_PRECISION}f} ' +
-                           f'A {radius:.{SVG_PRECISION}f},{radius:.{SVG_PRECISION}f} 0 {large_arc} 1 {end_x:.{SVG_PRECISION}f},{end_y:.{SVG_PRECISION}f}" ' +
-                           'stroke="black" fill="none" stroke-width="0.5"/>')
+            # Calculate start and end points
+            start_x = center[0] + radius * math.cos(math.radians(start_angle))
+            start_y = center[1] + radius * math.sin(math.radians(start_angle))
+            end_x = center[0] + radius * math.cos(math.radians(end_angle))
+            end_y = center[1] + radius * math.sin(math.radians(end_angle))
             
-            elif entity.dxftype() in ('LWPOLYLINE', 'POLYLINE'):
-                points = entity.get_points() if hasattr(entity, 'get_points') else []
-                if points:
-                    points_str = " ".join([f"{p[0]:.{SVG_PRECISION}f},{p[1]:.{SVG_PRECISION}f}" for p in points])
-                    if getattr(entity, 'closed', False):
-                        lines.append(f'<polygon points="{points_str}" stroke="black" fill="none" stroke-width="0.5"/>')
-                    else:
-                        lines.append(f'<polyline points="{points_str}" stroke="black" fill="none" stroke-width="0.5"/>')
-        
-        # Close groups and SVG
-        lines.append('</g>')
-        lines.append('</svg>')
-        
-        svg_content = '\n'.join(lines)
-        
-        # Save to file if path provided
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(svg_content)
+            # Determine if arc is larger than 180 degrees
+            large_arc = 1 if (end_angle - start_angle) > 180 else 0
+            
+            yield (f'<path d="M {start_x:.{SVG_PRECISION}f},{start_y:.{SVG_PRECISION}f} ' +
+                   f'A {radius:.{SVG_PRECISION}f},{radius:.{SVG_PRECISION}f} 0 {large_arc} 1 {end_x:.{SVG_PRECISION}f},{end_y:.{SVG_PRECISION}f}" ' +
+                   'stroke="black" fill="none" stroke-width="0.5"/>')
         
-        return svg_content
+        elif entity.dxftype() in ('LWPOLYLINE', 'POLYLINE'):
+            points = entity.get_points() if hasattr(entity, 'get_points') else []
+            if points:
+                points_str = " ".join([f"{p[0]:.{SVG_PRECISION}f},{p[1]:.{SVG_PRECISION}f}" for p in points])
+                if getattr(entity, 'closed', False):
+                    yield f'<polygon points="{points_str}" stroke="black" fill="none" stroke-width="0.5"/>'
+                else:
+                    yield f'<polyline points="{points_str}" stroke="black" fill="none" stroke-width="0.5"/>'
+    
+    # Close groups and SVG
+    yield '</g>'
+    yield '</svg>'
+
+
+def write_svg(dxf_path: str, output) -> bool:
+    """
+    Stream the SVG of a DXF file to output (file path or text stream).
+    A file path is replaced atomically once the whole document is written.
+    """
+    try:
+        # Load DXF file once; bounds come from the same session
+        document = DxfDocument(dxf_path, entity_bound_corners)
+        with svg_output(output) as stream:
+            stream.writelines(line + '\n' for line in iter_svg_lines(document))
+        return True
         
     except Exception as e:
         logger.error(f"Error converting DXF to SVG: {str(e)}")
@@ -438,6 +394,20 @@ def convert_dxf_to_svg(dxf_path: str, svg_path: Optional[str] = None) -> str:
         raise
 
 
+def convert_dxf_to_svg(dxf_path: str, svg_path: Optional[str] = None) -> str:
+    """
+    Convert DXF file to SVG. With svg_path the SVG is streamed to the file and
+    the path is returned; otherwise the SVG text is returned.
+    """
+    if svg_path:
+        write_svg(dxf_path, svg_path)
+        return svg_path
+    
+    svg_io = io.StringIO()
+    write_svg(dxf_path, svg_io)
+    return svg_io.getvalue()
+
+
 def export_to_json(dxf_path, json_path):
     """Eksport informacji o pliku DXF do pliku JSON"""
     result = parse_dxf_file(dxf_path)
@@ -464,9 +434,11 @@ if __name__ == '__main__':
         sys.exit(1)
     
     if output_format == 'svg':
-        result = convert_dxf_to_svg(dxf_file, output_file)
-        if not output_file:
-            print(result)
+        # Wynik z magazynu artefaktów, jeśli ten sam rysunek był już konwertowany
+        # Streamed to the output file or stdout
+        cached_stream(dxf_file, output_file or sys.stdout, 'dxf_converter.svg',
+                      converter_version('dxf_converter.py', 'dxf_document.py', 'dxf_extents.py', 'dxf_svg_writer.py'),
+                      lambda output: write_svg(dxf_file, output), extension='.svg')
     
     elif output_format == 'json':
         if not output_file:
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Sesja wczytanego dokumentu DXF
+Plik czytany jest przez ezdxf dokładnie raz, a liczniki typów encji, granice
+rysunku i tabela warstw powstają w jednym przejściu po modelspace. Ta sama
+sesja zasila tryby info/json i rysowanie SVG, więc duży rysunek nie jest
+wczytywany ponownie w obrębie jednego żądania. Łuki, okręgi i polilinie
+z wypukłościami mają dokładne granice z dxf_extents.
+"""
+
+import os
+
+from dxf_extents import ExtentsCollector, transform_arcs
+
+# Kodowania próbowane, gdy ezdxf.readfile nie poradzi sobie z plikiem
+FALLBACK_ENCODINGS = ('utf-8', 'latin1', 'ascii', 'cp1250', 'cp1252')
+
+# Jednostki rysunku według kodu $INSUNITS
+UNIT_NAMES = {
+    1: "in",
+    2: "ft",
+    4: "mm",
+    5: "cm",
+    6: "m",
+    8: "µm",
+    9: "dm"
+}
+
+# Granice rysunku bez geometrii
+EMPTY_BOUNDS = (0, 0, 100, 100)
+
+# Maksymalne zagnieżdżenie bloków przy liczeniu granic (ochrona przed cyklami)
+MAX_BLOCK_DEPTH = 16
+
+
+def read_document(dxf_path):
+    """Wczytuje plik DXF; przy błędzie próbuje odczytu tekstowego w innych kodowaniach"""
+    import ezdxf
+
+    try:
+        return ezdxf.readfile(dxf_path)
+    except Exception as error:
+        for encoding in FALLBACK_ENCODINGS:
+            try:
+                with open(dxf_path, encoding=encoding, errors='ignore') as fp:
+                    return ezdxf.read(fp)
+            except Exception:
+                continue
+        raise ValueError(f"Could not read DXF file with any encoding: {error}")
+
+
+def convex_hull(points):
+    """Otoczka wypukła punktów (x, y) - algorytm monotoniczny Andrew; lista wierzchołków"""
+    unique = sorted({(float(p[0]), float(p[1])) for p in points if p is not None and len(p) >= 2})
+    if len(unique) <= 2:
+        return unique
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower, upper = [], []
+    for point in unique:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], point) <= 0:
+            lower.pop()
+        lower.append(point)
+    for point in reversed(unique):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], point) <= 0:
+            upper.pop()
+        upper.append(point)
+    return lower[:-1] + upper[:-1]
+
+
+def collect_entity(collector, entity, entity_points):
+    """Dodaje encję do granic: dokładnie, gdy typ ma analityczne granice, inaczej punkty entity_points"""
+    try:
+        if collector.add_entity(entity):
+            return
+    except Exception:
+        pass
+    collector.add_points(entity_points(entity))
+
+
+class BlockExtents:
+    """
+    Zarys bloków w ich własnym układzie, liczony raz na dokument (klucz: nazwa
+    bloku): otoczka wypukła punktów encji oraz tablica łuków (dxf_extents).
+    Granice wstawienia to wierzchołki otoczki i łuki przekształcone macierzą
+    wstawienia (skala, obrót, punkt bazowy, przesunięcie) - łuki analitycznie,
+    więc granice obróconych wstawień są dokładne, a koszt jest liniowy względem
+    liczby wstawień. Zagnieżdżone bloki korzystają z tej samej pamięci podręcznej.
+    """
+
+    def __init__(self, entity_points):
+        self.entity_points = entity_points
+        self._extents = {}
+
+    def block_extents(self, block, depth=0):
+        """(lokalna otoczka wypukła, tablica łuków) bloku; pusta dla bloku pustego lub cyklicznego"""
+        if block.name in self._extents:
+            return self._extents[block.name]
+        # Wpis przed zejściem - blok wstawiający sam siebie nie zapętla obliczeń
+        self._extents[block.name] = ([], None)
+        if depth >= MAX_BLOCK_DEPTH:
+            return [], None
+
+        collector = ExtentsCollector()
+        for entity in block:
+            if entity.dxftype() == 'INSERT':
+                self.add_insert(collector, entity, depth + 1)
+            elif entity.dxftype() != 'ATTDEF':
+                collect_entity(collector, entity, self.entity_points)
+        arcs = collector.arc_array() if collector.has_arcs else None
+        extents = (convex_hull(collector.points()), arcs)
+        self._extents[block.name] = extents
+        return extents
+
+    def add_insert(self, collector, insert, depth=0):
+        """Dodaje zarys wstawienia (także MINSERT) we współrzędnych nadrzędnych do collector"""
+        insert_collector = ExtentsCollector()
+        try:
+            block = insert.block()
+            hull, arcs = self.block_extents(block, depth) if block is not None else ([], None)
+            if not hull and arcs is None:
+                collector.add_points([insert.dxf.insert])
+                return
+
+            inserts = insert.multi_insert() if insert.mcount > 1 else (insert,)
+            for single in inserts:
+                matrix = single.matrix44()
+                insert_collector.add_points(matrix.transform_vertices(hull))
+                if arcs is not None:
+                    insert_collector.add_arcs(transform_arcs(arcs, matrix))
+            # Atrybuty są już we współrzędnych nadrzędnych
+            for attrib in insert.attribs:
+                collect_entity(insert_collector, attrib, self.entity_points)
+        except Exception:
+            collector.add_points([insert.dxf.insert])
+            return
+        collector.update(insert_collector)
+
+
+class DxfDocument:
+    """
+    Wczytany rysunek DXF. entity_points(entity) zwraca punkty encji używane
+    do granic rysunku (każdy konwerter ma własną definicję); bez niej granice
+    nie są liczone. Liczniki i granice liczone są leniwie, jednym przejściem.
+    Granice wstawień bloków (INSERT) liczone są przez block_extents, a łuków,
+    okręgów i polilinii - analitycznie (dxf_extents), niezależnie od entity_points.
+    """
+
+    def __init__(self, dxf_path, entity_points=None):
+        if not os.path.exists(dxf_path):
+            raise FileNotFoundError(f"Plik {dxf_path} nie istnieje")
+
+        self.path = dxf_path
+        self.filename = os.path.basename(dxf_path)
+        self.file_size = os.path.getsize(dxf_path)
+        if self.file_size == 0:
+            raise ValueError("Plik DXF jest pusty")
+
+        self.doc = read_document(dxf_path)
+        self.modelspace = self.doc.modelspace()
+        self.entity_points = entity_points
+        self.block_extents = BlockExtents(entity_points) if entity_points else None
+        self._entities = None
+        self._entity_counts = None
+        self._bounds = None
+        self._layers = None
+
+    @property
+    def entities(self):
+        """Encje modelspace jako lista (modelspace odczytywany raz)"""
+        if self._entities is None:
+            self._entities = list(self.modelspace)
+        return self._entities
+
+    def _scan(self):
+        """Jedno przejście po encjach: liczniki typów i granice rysunku"""
+        counts = {}
+        collector = ExtentsCollector()
+
+        for entity in self.entities:
+            entity_type = entity.dxftype()
+            counts[entity_type] = counts.get(entity_type, 0) + 1
+
+            if self.entity_points is None:
+                continue
+            if entity_type == 'INSERT':
+                self.block_extents.add_insert(collector, entity)
+            else:
+                collect_entity(collector, entity, self.entity_points)
+
+        self._entity_counts = counts
+        self._bounds = collector.bounds()
+
+    @property
+    def entity_counts(self):
+        """Liczba encji modelspace według typu"""
+        if self._entity_counts is None:
+            self._scan()
+        return self._entity_counts
+
+    @property
+    def entity_count(self):
+        return len(self.entities)
+
+    @property
+    def has_bounds(self):
+        """Czy w rysunku znaleziono jakiekolwiek punkty geometrii"""
+        if self._entity_counts is None:
+            self._scan()
+        return self._bounds is not None
+
+    @property
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y); EMPTY_BOUNDS, gdy rysunek nie ma geometrii"""
+        if self._entity_counts is None:
+            self._scan()
+        return self._bounds or EMPTY_BOUNDS
+
+    @property
+    def layers(self):
+        """Tabela warstw: lista słowników name/color/linetype"""
+        if self._layers is None:
+            self._layers = [{
+                "name": layer.dxf.name,
+                "color": layer.dxf.color,
+                "linetype": layer.dxf.linetype
+            } for layer in self.doc.layers]
+        return self._layers
+
+    @property
+    def layer_colors(self):
+        return {layer["name"]: layer["color"] for layer in self.layers}
+
+    @property
+    def layer_linetypes(self):
+        return {layer["name"]: layer["linetype"] for layer in self.layers}
+
+    @property
+    def blocks(self):
+        """Definicje bloków (bez układów papieru) z liczbą encji"""
+        return [{
+            "name": block.name,
+            "entity_count": len(block)
+        } for block in self.doc.blocks if not block.is_any_paperspace]
+
+    @property
+    def insunits(self):
+        """Kod jednostek $INSUNITS (domyślnie 4 - mm)"""
+        return self.doc.header.get('$INSUNITS', 4)
+
+    @property
+    def units(self):
+        """Nazwa jednostek rysunku (domyślnie mm)"""
+        return UNIT_NAMES.get(self.insunits, "mm")
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Dokładne granice łuków, okręgów i polilinii z łukami (bulge)
+Łuki wszystkich encji zbierane są do tablic i ich prostokąty otaczające
+liczone są jednym wektorowym przejściem NumPy: końce łuku oraz punkty, w których
+współrzędna x lub y osiąga ekstremum, jeśli leżą w zakresie kąta łuku. Bez
+próbkowania - wynik jest dokładny niezależnie od promienia i kolejności kątów.
+Łuk zapisany jest ogólnie jako łuk eliptyczny c + u·cos t + v·sin t, więc
+przekształcony macierzą wstawienia bloku (obrót, skala, odbicie) nadal ma
+dokładne granice.
+NumPy importowany jest dopiero przy liczeniu granic (moduł importują konwertery).
+"""
+
+# Tolerancja kąta (stopnie) przy sprawdzaniu, czy łuk przechodzi przez ekstremum
+ANGLE_TOLERANCE = 1e-9
+
+# Wypukłość (bulge), poniżej której segment polilinii jest odcinkiem - szum
+# zmiennoprzecinkowy z eksportu CAD dawałby łuk o promieniu rzędu cięciwa/(4·bulge)
+BULGE_TOLERANCE = 1e-9
+
+# Typy encji zapisane w układzie OCS, których granice liczy add_entity
+OCS_TYPES = ('ARC', 'CIRCLE', 'LWPOLYLINE', 'POLYLINE')
+
+# Liczba wierszy tablicy łuków: środek (cx, cy), wektory u i v, kąt początkowy i końcowy
+ARC_FIELDS = 8
+
+
+def ellipse_arc_boxes(cx, cy, ux, uy, vx, vy, start_angle, end_angle):
+    """
+    Prostokąty otaczające łuków eliptycznych c + u·cos t + v·sin t (tablice NumPy
+    lub listy, parametr t w stopniach rośnie od start do end). Pełny okrąg
+    to end - start >= 360; równe kąty to łuk zerowy (np. łuk wypukłości).
+    Zwraca tablice (min_x, min_y, max_x, max_y).
+    """
+    import numpy as np
+
+    cx, cy, ux, uy, vx, vy = (np.asarray(v, dtype=np.float64) for v in (cx, cy, ux, uy, vx, vy))
+    start = np.mod(np.asarray(start_angle, dtype=np.float64), 360.0)
+    # Rozpiętość w [0, 360]
+    sweep = np.asarray(end_angle, dtype=np.float64) - np.asarray(start_angle, dtype=np.float64)
+    span = np.where(sweep >= 360.0 - ANGLE_TOLERANCE, 360.0, np.mod(sweep, 360.0))
+
+    start_rad = np.radians(start)
+    end_rad = np.radians(start + span)
+    cos0, sin0, cos1, sin1 = np.cos(start_rad), np.sin(start_rad), np.cos(end_rad), np.sin(end_rad)
+    x0, y0 = cx + ux * cos0 + vx * sin0, cy + uy * cos0 + vy * sin0
+    x1, y1 = cx + ux * cos1 + vx * sin1, cy + uy * cos1 + vy * sin1
+
+    min_x, max_x = np.minimum(x0, x1), np.maximum(x0, x1)
+    min_y, max_y = np.minimum(y0, y1), np.maximum(y0, y1)
+
+    # x(t) = cx + |(ux, vx)|·cos(t - tx): maksimum dla t = tx, minimum dla t = tx + 180°
+    def extremes(center, a, b, low, high):
+        extreme = np.degrees(np.arctan2(b, a))
+        amplitude = np.hypot(a, b)
+        # Ekstremum w zakresie łuku: odległość kątowa od początku nie większa niż rozpiętość
+        high = np.where(np.mod(extreme - start, 360.0) <= span + ANGLE_TOLERANCE, center + amplitude, high)
+        low = np.where(np.mod(extreme + 180.0 - start, 360.0) <= span + ANGLE_TOLERANCE, center - amplitude, low)
+        return low, high
+
+    min_x, max_x = extremes(cx, ux, vx, min_x, max_x)
+    min_y, max_y = extremes(cy, uy, vy, min_y, max_y)
+    return min_x, min_y, max_x, max_y
+
+
+def arc_boxes(cx, cy, radius, start_angle, end_angle):
+    """
+    Prostokąty otaczające łuków okręgów (kąty w stopniach, łuk przeciwnie do
+    ruchu wskazówek zegara od start do end, pełny okrąg dla end - start >= 360). Zwraca tablice (min_x, min_y, max_x, max_y).
+    """
+    import numpy as np
+
+    radius = np.abs(np.asarray(radius, dtype=np.float64))
+    zeros = np.zeros_like(radius)
+    return ellipse_arc_boxes(cx, cy, radius, zeros, zeros, radius, start_angle, end_angle)
+
+
+def bulge_arcs(x0, y0, x1, y1, bulge):
+    """
+    Łuki segmentów polilinii z wypukłością bulge (tablice): środek, promień
+    i kąty w stopniach w kierunku przeciwnym do ruchu wskazówek zegara.
+    Ujemna wypukłość to łuk zgodny z ruchem wskazówek - kąty są zamieniane.
+    """
+    import numpy as np
+
+    x0, y0, x1, y1, bulge = (np.asarray(v, dtype=np.float64) for v in (x0, y0, x1, y1, bulge))
+    dx, dy = x1 - x0, y1 - y0
+    # Środek na symetralnej cięciwy: przesunięcie (1 - b²) / (4b) długości cięciwy
+    offset = (1.0 - bulge * bulge) / (4.0 * bulge)
+    cx = (x0 + x1) / 2 - dy * offset
+    cy = (y0 + y1) / 2 + dx * offset
+    radius = np.hypot(x0 - cx, y0 - cy)
+    angle0 = np.degrees(np.arctan2(y0 - cy, x0 - cx))
+    angle1 = np.degrees(np.arctan2(y1 - cy, x1 - cx))
+    positive = bulge > 0
+    return cx, cy, radius, np.where(positive, angle0, angle1), np.where(positive, angle1, angle0)
+
+
+def circle_arc_array(cx, cy, radius, start_angle, end_angle):
+    """Tablica łuków (ARC_FIELDS, n) dla łuków okręgów: u = (r, 0), v = (0, r)"""
+    import numpy as np
+
+    radius = np.abs(np.asarray(radius, dtype=np.float64))
+    zeros = np.zeros_like(radius)
+    return np.array([cx, cy, radius, zeros, zeros, radius, start_angle, end_angle], dtype=np.float64)
+
+
+def transform_arcs(arcs, matrix):
+    """
+    Tablica łuków (ARC_FIELDS, n) przekształcona macierzą ezdxf Matrix44 (konwencja
+    wektorów wierszowych): środek przesuwany, wektory u i v tylko przekształcane liniowo
+    """
+    import numpy as np
+
+    a00, a01, a10, a11 = matrix[0, 0], matrix[0, 1], matrix[1, 0], matrix[1, 1]
+    cx, cy, ux, uy, vx, vy, start, end = arcs
+    return np.array([
+        cx * a00 + cy * a10 + matrix[3, 0], cx * a01 + cy * a11 + matrix[3, 1],
+        ux * a00 + uy * a10, ux * a01 + uy * a11,
+        vx * a00 + vy * a10, vx * a01 + vy * a11,
+        start, end,
+    ])
+
+
+def _is_mirrored(entity):
+    """Czy układ OCS encji jest lustrzany (wektor wyciągnięcia (0, 0, -1))"""
+    extrusion = entity.dxf.get('extrusion', None)
+    return extrusion is not None and extrusion[2] < 0 and abs(extrusion[0]) < 1e-12 and abs(extrusion[1]) < 1e-12
+
+
+def _is_planar(entity):
+    """Czy encja leży w płaszczyźnie XY rysunku (wyciągnięcie ±Z)"""
+    extrusion = entity.dxf.get('extrusion', None)
+    return extrusion is None or (abs(extrusion[0]) < 1e-12 and abs(extrusion[1]) < 1e-12)
+
+
+class ExtentsCollector:
+    """
+    Zbiera punkty i łuki encji, a granice liczy na końcu jednym przejściem.
+    add_entity obsługuje ARC, CIRCLE, LWPOLYLINE i POLYLINE; pozostałe encje
+    dodawane są jako punkty przez add_points, a łuki przekształconych bloków
+    jako gotowe tablice przez add_arcs.
+    """
+
+    def __init__(self):
+        self.xs = []
+        self.ys = []
+        # Łuki okręgów: środek, promień, kąt początkowy i końcowy (stopnie)
+        self.arcs = ([], [], [], [], [])
+        # Segmenty z wypukłością: początek, koniec, bulge
+        self.bulges = ([], [], [], [], [])
+        # Tablice łuków eliptycznych (ARC_FIELDS, n), np. z wstawień bloków
+        self.arc_arrays = []
+
+    def add_points(self, points):
+        for point in points:
+            if point is not None and len(point) >= 2:  # Upewnij się, że point ma współrzędne x,y
+                self.xs.append(point[0])
+                self.ys.append(point[1])
+
+    def add_arc(self, cx, cy, radius, start_angle, end_angle):
+        for values, value in zip(self.arcs, (cx, cy, radius, start_angle, end_angle)):
+            values.append(value)
+
+    def add_arcs(self, arcs):
+        """Dodaje tablicę łuków eliptycznych (ARC_FIELDS, n)"""
+        if arcs is not None and arcs.shape[1]:
+            self.arc_arrays.append(arcs)
+
+    def update(self, other):
+        """Dołącza punkty i łuki innego kolektora"""
+        self.xs.extend(other.xs)
+        self.ys.extend(other.ys)
+        for values, other_values in zip(self.arcs + self.bulges, other.arcs + other.bulges):
+            values.extend(other_values)
+        self.arc_arrays.extend(other.arc_arrays)
+
+    def add_polyline(self, points, closed):
+        """Wierzchołki (x, y, bulge); segmenty z wypukłością trafiają do łuków"""
+        if not points:
+            return
+        segments = list(zip(points, points[1:]))
+        if closed and len(points) > 1:
+            segments.append((points[-1], points[0]))
+        for x, y, _ in points:
+            self.xs.append(x)
+            self.ys.append(y)
+        for (xa, ya, bulge), (xb, yb, _) in segments:
+            if abs(bulge) > BULGE_TOLERANCE and (xa != xb or ya != yb):
+                for values, value in zip(self.bulges, (xa, ya, xb, yb, bulge)):
+                    values.append(value)
+
+    def add_entity(self, entity):
+        """Dodaje encję z dokładnymi granicami; False, jeśli typ nie jest obsługiwany"""
+        entity_type = entity.dxftype()
+        if entity_type not in OCS_TYPES or not _is_planar(entity):
+            return False
+        # Lustrzany OCS (0, 0, -1): x -> -x, kierunek łuków odwrócony
+        sign = -1.0 if _is_mirrored(entity) else 1.0
+
+        if entity_type in ('ARC', 'CIRCLE'):
+            center = entity.dxf.center
+            if entity_type == 'CIRCLE':
+                start_angle, end_angle = 0.0, 360.0
+            elif sign < 0:
+                start_angle, end_angle = 180.0 - entity.dxf.end_angle, 180.0 - entity.dxf.start_angle
+            else:
+                start_angle, end_angle = entity.dxf.start_angle, entity.dxf.end_angle
+            # Kąt końcowy jako start + rozpiętość; ARC o równych kątach to pełny okrąg
+            span = (end_angle - start_angle) % 360.0
+            end_angle = start_angle + (360.0 if span <= ANGLE_TOLERANCE else span)
+            self.add_arc(sign * center[0], center[1], entity.dxf.radius, start_angle, end_angle)
+
+        elif entity_type == 'LWPOLYLINE':
+            points = [(sign * x, y, sign * b) for x, y, b in entity.get_points('xyb')]
+            self.add_polyline(points, entity.closed)
+
+        elif entity.is_2d_polyline:
+            points = [(sign * v.dxf.location[0], v.dxf.location[1], sign * v.dxf.get('bulge', 0))
+                      for v in entity.vertices]
+            self.add_polyline(points, entity.is_closed)
+
+        else:
+            # Polilinia 3D i siatki - wierzchołki bez łuków
+            self.add_points([v.dxf.location for v in entity.vertices])
+        return True
+
+    @property
+    def has_arcs(self):
+        return bool(self.arcs[0] or self.bulges[0] or self.arc_arrays)
+
+    def points(self):
+        """Zebrane punkty (x, y) bez łuków"""
+        return list(zip(self.xs, self.ys))
+
+    def arc_array(self):
+        """Wszystkie łuki, segmenty z wypukłością i tablice łuków jako jedna tablica (ARC_FIELDS, n)"""
+        import numpy as np
+
+        arrays = list(self.arc_arrays)
+        if self.arcs[0]:
+            arrays.append(circle_arc_array(*self.arcs))
+        if self.bulges[0]:
+            arrays.append(circle_arc_array(*bulge_arcs(*self.bulges)))
+        if not arrays:
+            return np.empty((ARC_FIELDS, 0))
+        return np.concatenate(arrays, axis=1)
+
+    def arc_boxes(self):
+        """Prostokąty wszystkich łuków jako tablice (min_x, min_y, max_x, max_y)"""
+        return ellipse_arc_boxes(*self.arc_array())
+
+    def bounds(self):
+        """(min_x, min_y, max_x, max_y) wszystkich zebranych elementów albo None"""
+        import numpy as np
+
+        boxes = []
+        if self.xs:
+            xs = np.asarray(self.xs, dtype=np.float64)
+            ys = np.asarray(self.ys, dtype=np.float64)
+            boxes.append((xs.min(), ys.min(), xs.max(), ys.max()))
+        if self.has_arcs:
+            min_x, min_y, max_x, max_y = self.arc_boxes()
+            boxes.append((min_x.min(), min_y.min(), max_x.max(), max_y.max()))
+        if not boxes:
+            return None
+        return (float(min(box[0] for box in boxes)), float(min(box[1] for box in boxes)),
+                float(max(box[2] for box in boxes)), float(max(box[3] for box in boxes)))
+
+
+def entity_box_corners(entity):
+    """Narożniki dokładnego prostokąta otaczającego ARC/CIRCLE/polilinii; pusta lista dla innych"""
+    collector = ExtentsCollector()
+    if not collector.add_entity(entity):
+        return []
+    box = collector.bounds()
+    if box is None:
+        return []
+    min_x, min_y, max_x, max_y = box
+    return [(min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y)]
+
+
+def tilted_box_corners(entity):
+    """
+    Narożniki prostokąta otaczającego (WCS) encji OCS_TYPES leżącej poza płaszczyzną XY,
+    liczone przez ezdxf.bbox; None dla pozostałych encji (te obsługuje add_entity
+    albo punkty konwertera)
+    """
+    if entity.dxftype() not in OCS_TYPES or _is_planar(entity):
+        return None
+    from ezdxf import bbox
+
+    box = bbox.extents([entity], fast=False)
+    if not box.has_data:
+        return []
+    return [box.extmin, box.extmax]
@@ -16,22 +16,36 @@ import base64
 from typing import Dict, List, Tuple, Optional, Any, Union
 import math
 
-try:
-    import ezdxf
-    from ezdxf.addons import r12writer
-except ImportError:
-    print("BŁĄD: Biblioteka ezdxf nie jest zainstalowana. Użyj 'pip install ezdxf'")
-    sys.exit(1)
+# ezdxf i matplotlib importowane są dopiero przy konwersji: tryby info/json
+# nie potrzebują matplotlib, a odczyt z magazynu artefaktów żadnej z nich
 
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.path import Path
-    import matplotlib.patches as patches
-    from matplotlib.figure import Figure
-    from matplotlib.backends.backend_svg import FigureCanvasSVG
-except ImportError:
-    print("BŁĄD: Biblioteka matplotlib nie jest zainstalowana. Użyj 'pip install matplotlib'")
-    sys.exit(1)
+
+def _import_ezdxf():
+    """Importuje ezdxf przy pierwszym parsowaniu pliku"""
+    try:
+        import ezdxf
+    except ImportError:
+        print("BŁĄD: Biblioteka ezdxf nie jest zainstalowana. Użyj 'pip install ezdxf'")
+        raise
+    return ezdxf
+
+
+def _import_matplotlib():
+    """Importuje część matplotlib potrzebną do rysowania SVG (bez pyplot)"""
+    try:
+        import matplotlib.patches as patches
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_svg import FigureCanvasSVG
+    except ImportError:
+        print("BŁĄD: Biblioteka matplotlib nie jest zainstalowana. Użyj 'pip install matplotlib'")
+        raise
+    return patches, Figure, FigureCanvasSVG
+
+
+from artifact_cache import cached_text, cached_stream, converter_version
+from dxf_document import DxfDocument
+from dxf_extents import tilted_box_corners
+from dxf_svg_writer import dimensions_metadata, svg_output, StreamRewriter
 
 
 def get_entity_points(entity):
@@ -39,6 +53,10 @@ def get_entity_points(entity):
     points = []
     
     try:
+        # Łuki, okręgi i polilinie w OCS poza płaszczyzną XY - granice we WCS
+        corners = tilted_box_corners(entity)
+        if corners is not None:
+            return corners
         if hasattr(entity, 'get_points'):
             # Większość obiektów ma metodę get_points
             return entity.get_points()
@@ -81,8 +99,17 @@ def get_entity_points(entity):
     return points
 
 
-def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
-    """Parsowanie pliku DXF i zwrócenie podstawowych informacji o nim"""
+def open_document(dxf_path: str) -> DxfDocument:
+    """Wczytuje rysunek raz; granice liczone przez get_entity_points"""
+    _import_ezdxf()
+    return DxfDocument(dxf_path, get_entity_points)
+
+
+def parse_dxf_file(dxf_path: str, document: Optional[DxfDocument] = None) -> Dict[str, Any]:
+    """
+    Parsowanie pliku DXF i zwrócenie podstawowych informacji o nim.
+    Przekazana sesja document jest używana zamiast ponownego wczytania pliku.
+    """
     
     # Sprawdź, czy plik istnieje
     if not os.path.exists(dxf_path):
@@ -94,56 +121,19 @@ def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
         raise ValueError("Plik DXF jest pusty")
     
     try:
-        # Wczytaj plik DXF
-        doc = ezdxf.readfile(dxf_path)
-        
-        # Pobierz modelspace
-        modelspace = doc.modelspace()
+        # Wczytaj plik DXF (jeden odczyt, jedno przejście po modelspace)
+        if document is None:
+            document = open_document(dxf_path)
         
         # Określenie wymiarów dokumentu
-        min_x, min_y = float('inf'), float('inf')
-        max_x, max_y = float('-inf'), float('-inf')
-        has_entities = False
-        
-        # Najpierw sprawdźmy, czy w dokumencie są jakieś encje
-        for entity in modelspace:
-            has_entities = True
-            # Użyj nowej funkcji get_entity_points do pobrania punktów z encji
-            points = get_entity_points(entity)
-            
-            for point in points:
-                if point and len(point) >= 2:  # Upewnij się, że point ma współrzędne x,y
-                    min_x = min(min_x, point[0])
-                    min_y = min(min_y, point[1])
-                    max_x = max(max_x, point[0])
-                    max_y = max(max_y, point[1])
-        
-        # Jeśli nie znaleziono encji, ustaw domyślne wymiary
-        if not has_entities or min_x == float('inf'):
-            min_x, min_y = 0, 0
-            max_x, max_y = 100, 100
+        min_x, min_y, max_x, max_y = document.bounds
             
         # Próba wykrycia jednostek z dokumentu DXF
         units = "mm"  # domyślnie milimetry
         try:
             # W DXF jednostki są zapisane jako liczba typu int
             # 1=cale, 2=stopy, 4=mm, 5=cm, 6=m, 8=mikrony, 9=decymetry
-            dxf_units = doc.header.get('$INSUNITS', 4)  # domyślnie 4 (mm)
-            
-            if dxf_units == 1:
-                units = "in"
-            elif dxf_units == 2:
-                units = "ft"
-            elif dxf_units == 4:
-                units = "mm"
-            elif dxf_units == 5:
-                units = "cm"
-            elif dxf_units == 6:
-                units = "m"
-            elif dxf_units == 8:
-                units = "µm"
-            elif dxf_units == 9:
-                units = "dm"
+            units = document.units
         except Exception as e:
             # Jeśli wystąpi błąd, pozostaw domyślne jednostki
             print(f"Błąd podczas odczytu jednostek DXF: {e}")
@@ -173,8 +163,8 @@ def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
             "maxX": max_x,
             "maxY": max_y,
             "count": {
-                "entities": len(list(modelspace)),
-                "layers": len(doc.layers),
+                "entities": document.entity_count,
+                "layers": len(document.layers),
             }
         }
         
@@ -192,17 +182,18 @@ def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
         raise ValueError(f"Błąd podczas parsowania pliku DXF: {str(e)}")
 
 
-def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None) -> str:
-    """Konwertuje plik DXF do SVG używając matplotlib"""
+def write_svg_matplotlib(dxf_path: str, output) -> bool:
+    """
+    Konwertuje plik DXF do SVG używając matplotlib. Wynik zapisywany jest
+    strumieniowo do output (ścieżka albo strumień tekstowy); atrybut
+    preserveAspectRatio i metadata wstawiane są w locie podczas zapisu.
+    Przy błędzie zapisuje SVG z komunikatem i zwraca False.
+    """
     try:
-        # Najpierw parsuj plik DXF, aby uzyskać wymiary i podstawowe informacje
-        dxf_info = parse_dxf_file(dxf_path)
-        
-        # Wczytaj plik DXF
-        doc = ezdxf.readfile(dxf_path)
-        
-        # Pobierz modelspace
-        modelspace = doc.modelspace()
+        # Jedna sesja dokumentu: wymiary, informacje i rysowane encje z jednego odczytu
+        document = open_document(dxf_path)
+        dxf_info = parse_dxf_file(dxf_path, document)
+        patches, Figure, FigureCanvasSVG = _import_matplotlib()
         
         # Określenie wymiarów dokumentu
         min_x, min_y = dxf_info["minX"], dxf_info["minY"]
@@ -262,7 +253,7 @@ def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None)
             spine.set_visible(False)
         
         # Narysuj wszystkie encje
-        for entity in modelspace:
+        for entity in document.entities:
             if entity.dxftype() == 'LINE':
                 start = entity.dxf.start
                 end = entity.dxf.end
@@ -271,7 +262,7 @@ def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None)
             elif entity.dxftype() == 'CIRCLE':
                 center = entity.dxf.center
                 radius = entity.dxf.radius
-                circle = plt.Circle((center[0], center[1]), radius, fill=False, color='k', linewidth=0.5)
+                circle = patches.Circle((center[0], center[1]), radius, fill=False, color='k', linewidth=0.5)
                 ax.add_patch(circle)
             
             elif entity.dxftype() == 'ARC':
@@ -337,23 +328,7 @@ def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None)
                 except Exception as e:
                     print(f"Błąd przetwarzania POLYLINE: {e}")
         
-        # Utwórz SVG jako ciąg znaków
-        svg_io = io.StringIO()
-        canvas = FigureCanvasSVG(fig)
-        canvas.print_svg(svg_io)
-        svg_content = svg_io.getvalue()
-        
-        # Zapisz SVG do pliku, jeśli podano ścieżkę
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(svg_content)
-        
-        # Dodaj do SVG informacje o wymiarach
         # Sprawdz czy to plik koło.dxf i zastosuj specjalne wymiary
-        filename = os.path.basename(dxf_path).lower()
-        is_kolo_dxf = "kolo" in filename or "koło" in filename
-        
-        # Ustaw właściwe wymiary dla koło.dxf
         if is_kolo_dxf:
             svg_width = 35
             svg_height = 35
@@ -362,30 +337,18 @@ def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None)
             svg_width = width
             svg_height = height
         
-        # Dodaj do SVG informacje o wymiarach z uwzględnieniem specjalnego przypadku
-        svg_content = svg_content.replace('</svg>', f'''
-  <metadata>
-    <dimensions>
-      <width>{svg_width}</width>
-      <height>{svg_height}</height>
-      <minX>{min_x}</minX>
-      <minY>{min_y}</minY>
-      <maxX>{max_x}</maxX>
-      <maxY>{max_y}</maxY>
-      <units>{units}</units>
-    </dimensions>
-  </metadata>
-</svg>''')
-        
-        # Optymalizuj SVG dla mobilnych urządzeń
-        svg_content = svg_content.replace('<svg ', '<svg preserveAspectRatio="xMidYMid meet" ')
+        # Informacje o wymiarach z uwzględnieniem specjalnego przypadku i optymalizacja
+        # dla mobilnych urządzeń - dopisywane w locie podczas zapisu SVG
+        metadata = dimensions_metadata(svg_width, svg_height, min_x, min_y, max_x, max_y, units)
+        with svg_output(output) as stream:
+            writer = StreamRewriter(stream, [
+                ('<svg ', '<svg preserveAspectRatio="xMidYMid meet" '),
+                ('</svg>', metadata + '</svg>'),
+            ])
+            FigureCanvasSVG(fig).print_svg(writer)
+            writer.finish()
         
-        # Zapisz zmodyfikowane SVG
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(svg_content)
-        
-        return svg_content
+        return True
         
     except Exception as e:
         with open("/tmp/dxf_debug.log", "a") as f:
@@ -400,11 +363,24 @@ def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None)
             <text x="20" y="130" font-family="Arial" font-size="12">{str(e)[50:100] if len(str(e)) > 50 else ""}</text>
         </svg>'''
         
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(error_svg)
+        with svg_output(output) as stream:
+            stream.write(error_svg)
         
-        return error_svg
+        return False
+
+
+def convert_dxf_to_svg_matplotlib(dxf_path: str, svg_path: Optional[str] = None) -> str:
+    """
+    Konwersja DXF do SVG. Ze ścieżką svg_path wynik zapisywany jest strumieniowo
+    i zwracana jest ścieżka; bez niej zwracana jest treść SVG.
+    """
+    if svg_path:
+        write_svg_matplotlib(dxf_path, svg_path)
+        return svg_path
+    
+    svg_io = io.StringIO()
+    write_svg_matplotlib(dxf_path, svg_io)
+    return svg_io.getvalue()
 
 
 if __name__ == '__main__':
@@ -422,22 +398,29 @@ if __name__ == '__main__':
         print(f"Error: File {dxf_file} does not exist")
         sys.exit(1)
     
-    if output_format == 'svg':
-        result = convert_dxf_to_svg_matplotlib(dxf_file, output_file)
-        if not output_file:
-            print(result)
+    # Wyniki z magazynu artefaktów, jeśli ten sam rysunek był już konwertowany
+    version = converter_version('dxf_matplotlib_converter.py', 'dxf_document.py', 'dxf_extents.py', 'dxf_svg_writer.py')
     
-    elif output_format == 'json':
-        if not output_file:
-            output_file = dxf_file.replace('.dxf', '.json')
-        result = parse_dxf_file(dxf_file)
-        with open(output_file, 'w') as f:
-            json.dump(result, f, indent=2)
-        print(f"Exported to {output_file}")
+    if output_format == 'svg':
+        filename = os.path.basename(dxf_file).lower()
+        # Strumieniowo do pliku albo na stdout; SVG z błędem nie trafia do magazynu
+        cached_stream(dxf_file, output_file or sys.stdout, 'dxf_matplotlib_converter.svg', version,
+                      lambda output: write_svg_matplotlib(dxf_file, output),
+                      {'kolo': "kolo" in filename or "koło" in filename}, '.svg')
     
-    elif output_format == 'info':
-        result = parse_dxf_file(dxf_file)
-        print(json.dumps(result, indent=2))
+    elif output_format in ('json', 'info'):
+        # Informacje zawierają nazwę pliku, więc jest ona częścią klucza
+        result = cached_text(dxf_file, 'dxf_matplotlib_converter.info', version,
+                             lambda: json.dumps(parse_dxf_file(dxf_file), indent=2),
+                             {'filename': os.path.basename(dxf_file)}, '.json')
+        if output_format == 'json':
+            if not output_file:
+                output_file = dxf_file.replace('.dxf', '.json')
+            with open(output_file, 'w') as f:
+                f.write(result)
+            print(f"Exported to {output_file}")
+        else:
+            print(result)
     
     else:
         print(f"Unknown output format: {output_format}")
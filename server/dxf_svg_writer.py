@@ -0,0 +1,516 @@
+#!/usr/bin/env python3
+"""
+Bezpośredni zapis SVG z encji DXF (bez matplotlib)
+Geometria zapisywana jest we współrzędnych rysunku pod jedną transformacją
+odwracającą oś Y (scale(1 -1)); viewBox to granice rysunku. Obsługiwane encje:
+LINE, CIRCLE, ARC, LWPOLYLINE i POLYLINE (z łukami bulge), TEXT, MTEXT,
+ATTRIB, INSERT (z pełną macierzą wstawienia), HATCH, DIMENSION (blok geometrii
+wymiaru), SPLINE i ELLIPSE (krzywe Béziera ze ścieżek ezdxf). Encje w OCS
+innym niż WCS (np. lustrzanym, wyciągnięcie (0, 0, -1)) przeliczane są do WCS.
+"""
+
+import io
+import logging
+import math
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from artifact_cache import atomic_open
+from dxf_extents import BULGE_TOLERANCE
+
+# Liczba miejsc po przecinku współrzędnych (w jednostkach rysunku)
+SVG_DECIMALS = 4
+
+# Szerokość rysunku w punktach - jak rysunek matplotlib 8 cali x 72 pt
+SVG_WIDTH_PT = 576
+
+# Grubość linii w punktach przy szerokości SVG_WIDTH_PT (jak DEFAULT_LINE_WIDTH matplotlib)
+LINE_WIDTH_PT = 0.5
+
+# Wypełnienie obszarów HATCH
+HATCH_FILL = '#000'
+HATCH_OPACITY = 0.3
+
+# Wzory kreskowania typów linii warstw (w grubościach linii)
+LINETYPE_DASHES = {
+    'DASHED': (6, 3),
+    'DOTTED': (1, 3),
+    'DASHDOT': (6, 3, 1, 3),
+}
+
+# Odstęp wierszy MTEXT jako wielokrotność wysokości znaku
+MTEXT_LINE_SPACING = 1.5
+
+# Wysokość tekstu wymiaru, gdy encja nie ma bloku geometrii
+DIMENSION_TEXT_SIZE = 2.5
+
+# Maksymalne zagnieżdżenie bloków (ochrona przed cyklicznymi odwołaniami)
+MAX_BLOCK_DEPTH = 16
+
+# Dokument buforowany dla strumienia wyjściowego trzymany w pamięci do tego rozmiaru
+SPOOL_MAX_BYTES = 8 << 20
+
+logger = logging.getLogger(__name__)
+
+
+def escape(text):
+    """Tekst jako treść elementu XML"""
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def fmt(value):
+    """Liczba w SVG: stała liczba miejsc po przecinku bez zbędnych zer"""
+    text = f"{value:.{SVG_DECIMALS}f}".rstrip('0').rstrip('.')
+    return text if text not in ('', '-0') else '0'
+
+
+def stroke_length(value):
+    """Grubość linii lub długość kreski - cyfry znaczące, bo w blokach skalowanych bywa bardzo mała"""
+    return f"{value:.6g}"
+
+
+def insert_matrix(insert):
+    """Macierz SVG (a b c d e f) wstawienia bloku: skala, obrót, punkt bazowy, przesunięcie"""
+    m = insert.matrix44()
+    return (m[0, 0], m[0, 1], m[1, 0], m[1, 1], m[3, 0], m[3, 1])
+
+
+def matrix_scale(matrix):
+    """Średnia skala macierzy SVG (pierwiastek z wyznacznika); 1 dla macierzy zdegenerowanej"""
+    a, b, c, d = matrix[:4]
+    scale = math.sqrt(abs(a * d - b * c))
+    return scale if scale > 0 else 1.0
+
+
+def default_ocs(entity):
+    """Czy układ OCS encji pokrywa się z WCS (wyciągnięcie (0, 0, 1))"""
+    extrusion = entity.dxf.get('extrusion', None)
+    return extrusion is None or (abs(extrusion[0]) < 1e-12 and abs(extrusion[1]) < 1e-12 and extrusion[2] > 0)
+
+
+def bulge_arc(x0, y0, x1, y1, bulge):
+    """Polecenie łuku SVG dla segmentu polilinii z wypukłością bulge"""
+    chord = math.hypot(x1 - x0, y1 - y0)
+    if chord == 0:
+        return ''
+    angle = 4 * math.atan(abs(bulge))
+    radius = chord / (2 * math.sin(angle / 2))
+    large_arc = 1 if angle > math.pi else 0
+    # Dodatnia wypukłość - łuk przeciwnie do ruchu wskazówek zegara (rosnący kąt)
+    sweep = 1 if bulge > 0 else 0
+    return f"A{fmt(radius)} {fmt(radius)} 0 {large_arc} {sweep} {fmt(x1)} {fmt(y1)}"
+
+
+def polyline_path(points, closed):
+    """Dane ścieżki dla wierzchołków (x, y, bulge); zamknięcie dodaje ostatni segment"""
+    if not points:
+        return ''
+    x0, y0, _ = points[0]
+    commands = [f"M{fmt(x0)} {fmt(y0)}"]
+    segments = list(zip(points, points[1:]))
+    if closed and len(points) > 1:
+        segments.append((points[-1], points[0]))
+    for (xa, ya, bulge), (xb, yb, _) in segments:
+        if abs(bulge) > BULGE_TOLERANCE:
+            commands.append(bulge_arc(xa, ya, xb, yb, bulge))
+        else:
+            commands.append(f"L{fmt(xb)} {fmt(yb)}")
+    if closed:
+        commands.append('Z')
+    return ''.join(commands)
+
+
+def ezdxf_path_data(paths):
+    """Dane ścieżki SVG ze ścieżek ezdxf (odcinki i krzywe Béziera 2. i 3. stopnia)"""
+    from ezdxf.path import Command
+
+    commands = []
+    for path in paths:
+        start = path.start
+        commands.append(f"M{fmt(start.x)} {fmt(start.y)}")
+        for command in path.commands():
+            end = command.end
+            if command.type == Command.LINE_TO:
+                commands.append(f"L{fmt(end.x)} {fmt(end.y)}")
+            elif command.type == Command.MOVE_TO:
+                commands.append(f"M{fmt(end.x)} {fmt(end.y)}")
+            elif command.type == Command.CURVE3_TO:
+                ctrl = command.ctrl
+                commands.append(f"Q{fmt(ctrl.x)} {fmt(ctrl.y)} {fmt(end.x)} {fmt(end.y)}")
+            else:
+                ctrl1, ctrl2 = command.ctrl1, command.ctrl2
+                commands.append(f"C{fmt(ctrl1.x)} {fmt(ctrl1.y)} {fmt(ctrl2.x)} {fmt(ctrl2.y)} "
+                                f"{fmt(end.x)} {fmt(end.y)}")
+        if path.is_closed:
+            commands.append('Z')
+    return ''.join(commands)
+
+
+class DxfSvgWriter:
+    """
+    Generator elementów SVG dla encji rysunku. Grubość linii i wzory kreskowania
+    wyrażone są w jednostkach rysunku, żeby wyglądały jak w konwerterze matplotlib.
+    Każdy blok zapisywany jest raz na skalę wstawienia jako <g id> w <defs> (tuż
+    przed pierwszym użyciem), a każde wstawienie jako <use> z macierzą wstawienia.
+    Grubość i kreskowanie linii w definicji są podzielone przez łączną skalę
+    wstawień, więc po transformacji <use> linie wyglądają jak w trybie explode=True,
+    w którym wstawienia rozbijane są na geometrię we współrzędnych rysunku.
+    """
+
+    def __init__(self, layer_linetypes=None, line_width=1.0, explode=False):
+        self.layer_linetypes = layer_linetypes or {}
+        self.base_line_width = line_width
+        self.explode = explode
+        # Łączna skala wstawień zapisywanej definicji bloku i grubość linii w jej układzie
+        self.scale = 1.0
+        self.line_width = line_width
+        # (nazwa bloku, skala) -> id jego definicji w SVG
+        self.block_ids = {}
+
+    def _style(self, entity):
+        """Atrybut kreskowania linii według typu linii warstwy (pusty dla ciągłej)"""
+        linetype = self.layer_linetypes.get(entity.dxf.get('layer', '0'))
+        dashes = LINETYPE_DASHES.get(linetype)
+        if not dashes:
+            return ''
+        return f' stroke-dasharray="{" ".join(stroke_length(d * self.line_width) for d in dashes)}"'
+
+    def text_element(self, x, y, text, height, rotation=0.0, anchor=None, mirrored=False):
+        """
+        Tekst we współrzędnych rysunku - lokalnie odwrócony, żeby nie był lustrzany;
+        mirrored=True dla tekstu w lustrzanym OCS (0, 0, -1)
+        """
+        transform = f"translate({fmt(x)} {fmt(y)})"
+        if mirrored:
+            transform += " scale(-1 1)"
+        if rotation:
+            transform += f" rotate({fmt(rotation)})"
+        transform += " scale(1 -1)"
+        anchor_attribute = f' text-anchor="{anchor}"' if anchor else ''
+        return (f'<text transform="{transform}" font-size="{fmt(height)}"{anchor_attribute}>'
+                f'{escape(text)}</text>')
+
+    def entity_elements(self, entity, depth=0):
+        """
+        Elementy SVG jednej encji; nieobsługiwane typy są pomijane, a encja,
+        której zapis się nie powiedzie, jest logowana i pomijana w całości
+        (jak w draw_entity_matplotlib), bez przerywania konwersji
+        """
+        entity_type = entity.dxftype()
+        handler = getattr(self, '_emit_' + entity_type.lower(), None)
+        if handler is None:
+            return []
+        known_blocks = len(self.block_ids)
+        try:
+            return list(handler(entity, depth))
+        except Exception as e:
+            # Definicje bloków z odrzuconych elementów nie zostały zapisane
+            for key in list(self.block_ids)[known_blocks:]:
+                del self.block_ids[key]
+            logger.warning(f"Błąd podczas zapisu encji {entity_type}: {e}")
+            return []
+
+    def _emit_line(self, entity, depth):
+        start, end = entity.dxf.start, entity.dxf.end
+        yield (f'<line x1="{fmt(start[0])}" y1="{fmt(start[1])}" x2="{fmt(end[0])}" '
+               f'y2="{fmt(end[1])}"{self._style(entity)}/>')
+
+    def _emit_ocs_path(self, entity, depth):
+        """Ścieżka ezdxf we współrzędnych WCS: SPLINE, ELLIPSE i encje w OCS innym niż WCS (np. lustrzanym)"""
+        from ezdxf.path import make_path
+
+        data = ezdxf_path_data([make_path(entity)])
+        if data:
+            yield f'<path d="{data}"{self._style(entity)}/>'
+
+    def _emit_circle(self, entity, depth):
+        if not default_ocs(entity):
+            yield from self._emit_ocs_path(entity, depth)
+            return
+        center = entity.dxf.center
+        yield (f'<circle cx="{fmt(center[0])}" cy="{fmt(center[1])}" '
+               f'r="{fmt(entity.dxf.radius)}"{self._style(entity)}/>')
+
+    def _emit_arc(self, entity, depth):
+        if not default_ocs(entity):
+            yield from self._emit_ocs_path(entity, depth)
+            return
+        center, radius = entity.dxf.center, entity.dxf.radius
+        start_angle = entity.dxf.start_angle
+        span = (entity.dxf.end_angle - start_angle) % 360 or 360
+        if span >= 360:
+            yield from self._emit_circle(entity, depth)
+            return
+        start = math.radians(start_angle)
+        end = math.radians(start_angle + span)
+        x0, y0 = center[0] + radius * math.cos(start), center[1] + radius * math.sin(start)
+        x1, y1 = center[0] + radius * math.cos(end), center[1] + radius * math.sin(end)
+        large_arc = 1 if span > 180 else 0
+        yield (f'<path d="M{fmt(x0)} {fmt(y0)}A{fmt(radius)} {fmt(radius)} 0 {large_arc} 1 '
+               f'{fmt(x1)} {fmt(y1)}"{self._style(entity)}/>')
+
+    def _emit_lwpolyline(self, entity, depth):
+        if not default_ocs(entity):
+            yield from self._emit_ocs_path(entity, depth)
+            return
+        points = [(x, y, b) for x, y, b in entity.get_points('xyb')]
+        data = polyline_path(points, entity.closed)
+        if data:
+            yield f'<path d="{data}"{self._style(entity)}/>'
+
+    def _emit_polyline(self, entity, depth):
+        if entity.is_2d_polyline and not default_ocs(entity):
+            yield from self._emit_ocs_path(entity, depth)
+            return
+        if entity.is_2d_polyline:
+            points = [(v.dxf.location[0], v.dxf.location[1], v.dxf.get('bulge', 0))
+                      for v in entity.vertices]
+        else:
+            # Polilinia 3D i siatki - rzut wierzchołków na płaszczyznę XY
+            points = [(v.dxf.location[0], v.dxf.location[1], 0) for v in entity.vertices]
+        data = polyline_path(points, entity.is_closed)
+        if data:
+            yield f'<path d="{data}"{self._style(entity)}/>'
+
+    def _emit_text(self, entity, depth):
+        position = entity.dxf.insert
+        mirrored = False
+        if not default_ocs(entity):
+            # Punkt wstawienia w OCS; w lustrzanym OCS także znaki są odbite
+            position = entity.ocs().to_wcs(position)
+            mirrored = entity.dxf.extrusion[2] < 0
+        yield self.text_element(position[0], position[1], entity.plain_text(),
+                                entity.dxf.height, entity.dxf.get('rotation', 0), mirrored=mirrored)
+
+    _emit_attrib = _emit_text
+
+    def _emit_mtext(self, entity, depth):
+        position = entity.dxf.insert
+        height = entity.dxf.char_height
+        rotation = entity.dxf.get('rotation', 0)
+        lines = entity.plain_text().split('\n')
+        # Punkt wstawienia MTEXT to górny lewy róg - pierwsza linia bazowa o wysokość niżej
+        transform = f"translate({fmt(position[0])} {fmt(position[1])})"
+        if rotation:
+            transform += f" rotate({fmt(rotation)})"
+        spans = ''.join(f'<tspan x="0" y="{fmt(height + i * height * MTEXT_LINE_SPACING)}">'
+                        f'{escape(line)}</tspan>' for i, line in enumerate(lines))
+        yield f'<text transform="{transform} scale(1 -1)" font-size="{fmt(height)}">{spans}</text>'
+
+    @staticmethod
+    def block_key(block, scale):
+        """Klucz definicji bloku: nazwa i łączna skala wstawień (do 6 cyfr znaczących)"""
+        return block.name, f"{scale:.6g}"
+
+    def block_definition(self, block, depth=0, scale=1.0):
+        """
+        Definicja bloku dla łącznej skali wstawień scale w <defs> (generator), jeśli
+        jeszcze nie została zapisana. Bloki zagnieżdżone definiowane są wcześniej,
+        żeby <use> zawsze wskazywał istniejący element; id nadawane przed zejściem
+        chroni przed cyklami.
+        """
+        key = self.block_key(block, scale)
+        if key in self.block_ids or depth >= MAX_BLOCK_DEPTH:
+            return
+        block_id = f"block-{len(self.block_ids) + 1}"
+        self.block_ids[key] = block_id
+
+        outer_scale, outer_line_width = self.scale, self.line_width
+        self.scale, self.line_width = scale, self.base_line_width / scale
+        try:
+            for block_entity in block:
+                if block_entity.dxftype() == 'INSERT':
+                    nested = block_entity.block()
+                    if nested is not None:
+                        nested_scale = scale * matrix_scale(insert_matrix(block_entity))
+                        yield from self.block_definition(nested, depth + 1, nested_scale)
+
+            # Grubość zawsze jawnie - treść <use> dziedziczy styl z miejsca użycia,
+            # czyli w bloku zagnieżdżonym z definicji o innej skali
+            yield f'<defs><g id="{block_id}" stroke-width="{stroke_length(self.line_width)}">'
+            for block_entity in block:
+                yield from self.entity_elements(block_entity, depth + 1)
+            yield '</g></defs>'
+        finally:
+            self.scale, self.line_width = outer_scale, outer_line_width
+
+    def _emit_insert(self, entity, depth):
+        if depth >= MAX_BLOCK_DEPTH:
+            return
+        block = entity.block()
+        block_id = None
+        if block is not None and not self.explode:
+            # Wszystkie kopie MINSERT mają tę samą skalę co wstawienie
+            scale = self.scale * matrix_scale(insert_matrix(entity))
+            yield from self.block_definition(block, depth, scale)
+            block_id = self.block_ids.get(self.block_key(block, scale))
+
+        inserts = entity.multi_insert() if entity.mcount > 1 else (entity,)
+        for insert in inserts:
+            if self.explode and block is not None:
+                # Płaska geometria: encje bloku przekształcone przez ezdxf do układu
+                # rysunku, zagnieżdżone wstawienia rozbijane rekurencyjnie
+                for virtual_entity in insert.virtual_entities():
+                    yield from self.entity_elements(virtual_entity, depth + 1)
+            elif block_id is not None:
+                matrix = ' '.join(fmt(v) for v in insert_matrix(insert))
+                yield f'<use xlink:href="#{block_id}" transform="matrix({matrix})"/>'
+            # Atrybuty bloku są już we współrzędnych rysunku
+            for attrib in insert.attribs:
+                yield from self.entity_elements(attrib, depth + 1)
+
+    def _emit_hatch(self, entity, depth):
+        from ezdxf.path import from_hatch
+
+        data = ezdxf_path_data(from_hatch(entity))
+        if data:
+            yield (f'<path d="{data}" fill="{HATCH_FILL}" fill-opacity="{HATCH_OPACITY}" '
+                   f'fill-rule="evenodd"{self._style(entity)}/>')
+
+    # SPLINE i ELLIPSE są we współrzędnych WCS - ścieżka ezdxf bez przeliczania
+    _emit_spline = _emit_ocs_path
+    _emit_ellipse = _emit_ocs_path
+
+    def _emit_dimension(self, entity, depth):
+        block = entity.get_geometry_block()
+        if block is not None and depth < MAX_BLOCK_DEPTH:
+            # Blok geometrii wymiaru (linie, strzałki, tekst) jest we współrzędnych rysunku
+            for block_entity in block:
+                yield from self.entity_elements(block_entity, depth + 1)
+            return
+
+        # Bez bloku geometrii: linie między punktami definicyjnymi i wartość wymiaru
+        points = [entity.dxf.get(name) for name in ('defpoint', 'defpoint2', 'defpoint3')]
+        points = [p for p in points if p is not None]
+        dashes = f' stroke-dasharray="{stroke_length(6 * self.line_width)} {stroke_length(3 * self.line_width)}"'
+        for start, end in zip(points, points[1:]):
+            yield (f'<line x1="{fmt(start[0])}" y1="{fmt(start[1])}" x2="{fmt(end[0])}" '
+                   f'y2="{fmt(end[1])}"{dashes}/>')
+        text = entity.dxf.get('text', '')
+        position = entity.dxf.get('text_midpoint')
+        if text and text != '<>' and position is not None:
+            yield self.text_element(position[0], position[1], text, DIMENSION_TEXT_SIZE, anchor='middle')
+
+
+def dimensions_metadata(svg_width, svg_height, min_x, min_y, max_x, max_y, units):
+    """Blok <metadata> z wymiarami rysunku odczytywany przez przeglądarkę DXF"""
+    return f'''
+  <metadata>
+    <dimensions>
+      <width>{svg_width}</width>
+      <height>{svg_height}</height>
+      <minX>{min_x}</minX>
+      <minY>{min_y}</minY>
+      <maxX>{max_x}</maxX>
+      <maxY>{max_y}</maxY>
+      <units>{units}</units>
+    </dimensions>
+  </metadata>
+'''
+
+
+def svg_header(min_x, min_y, max_x, max_y, metadata=''):
+    """
+    Początek dokumentu SVG: viewBox w granicach rysunku (oś Y odwrócona),
+    blok metadata oraz grupa z transformacją i wspólnym stylem linii
+    """
+    width = max_x - min_x
+    height = max_y - min_y
+    width_pt = SVG_WIDTH_PT
+    height_pt = SVG_WIDTH_PT * height / width if width > 0 else SVG_WIDTH_PT
+    line_width = LINE_WIDTH_PT * max(width, height) / SVG_WIDTH_PT
+    return (
+        '<?xml version="1.0" encoding="utf-8" standalone="no"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'version="1.1" width="{fmt(width_pt)}pt" height="{fmt(height_pt)}pt" '
+        f'viewBox="{fmt(min_x)} {fmt(-max_y)} {fmt(width)} {fmt(height)}" '
+        f'preserveAspectRatio="xMidYMid meet">\n'
+        f'{metadata}'
+        f'<style>text{{fill:#000;stroke:none;font-family:Arial,sans-serif}}</style>\n'
+        f'<g transform="scale(1 -1)" fill="none" stroke="#000" stroke-width="{fmt(line_width)}" '
+        f'stroke-linecap="round" stroke-linejoin="round">\n'
+    ), line_width
+
+
+SVG_FOOTER = '</g>\n</svg>\n'
+
+
+def iter_svg(entities, bounds, metadata='', layer_linetypes=None, explode=False):
+    """
+    Kolejne fragmenty dokumentu SVG dla encji w granicach bounds (min_x, min_y, max_x, max_y).
+    explode=True zapisuje wstawienia bloków jako płaską geometrię zamiast <use>.
+    """
+    header, line_width = svg_header(*bounds, metadata=metadata)
+    yield header
+    writer = DxfSvgWriter(layer_linetypes, line_width, explode)
+    for entity in entities:
+        for element in writer.entity_elements(entity):
+            yield element + '\n'
+    yield SVG_FOOTER
+
+
+@contextmanager
+def svg_output(output):
+    """
+    Strumień tekstowy dla wyniku, zapisywany w całości albo wcale: ścieżka
+    otwierana jest atomowo (plik powstaje dopiero po udanym zapisie), a dla
+    strumienia dokument buforowany jest w pliku tymczasowym i przepisywany po
+    udanym zapisie - przy błędzie nic nie trafia do wyjścia
+    """
+    if isinstance(output, str):
+        with atomic_open(output, 'w', encoding='utf-8') as f:
+            yield f
+    else:
+        with tempfile.SpooledTemporaryFile(SPOOL_MAX_BYTES, 'w+', encoding='utf-8') as buffer:
+            yield buffer
+            buffer.seek(0)
+            shutil.copyfileobj(buffer, output)
+
+
+class StreamRewriter(io.TextIOBase):
+    """
+    Strumień tekstowy zamieniający w locie pierwsze wystąpienia kolejnych wzorców
+    (np. dopisanie atrybutów do <svg i metadanych przed </svg>). Przetrzymuje
+    tylko końcówkę krótszą od szukanego wzorca, więc nie kopiuje dokumentu.
+    Po zapisie dokumentu trzeba wywołać finish().
+    """
+
+    def __init__(self, stream, replacements):
+        super().__init__()
+        self.stream = stream
+        self.pending = list(replacements)
+        self.buffer = ''
+
+    def write(self, text):
+        if not isinstance(text, str):
+            # matplotlib sprawdza write(b'') - strumień przyjmuje tylko tekst
+            raise TypeError("StreamRewriter accepts text only")
+        if not self.pending:
+            self.stream.write(text)
+            return len(text)
+
+        self.buffer += text
+        while self.pending:
+            old, new = self.pending[0]
+            index = self.buffer.find(old)
+            if index < 0:
+                break
+            self.stream.write(self.buffer[:index] + new)
+            self.buffer = self.buffer[index + len(old):]
+            self.pending.pop(0)
+
+        keep = len(self.pending[0][0]) - 1 if self.pending else 0
+        if len(self.buffer) > keep:
+            self.stream.write(self.buffer[:len(self.buffer) - keep])
+            self.buffer = self.buffer[len(self.buffer) - keep:]
+        return len(text)
+
+    def writable(self):
+        return True
+
+    def finish(self):
+        """Wypisuje przetrzymaną końcówkę dokumentu"""
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer = ''
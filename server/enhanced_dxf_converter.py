@@ -12,6 +12,8 @@ Ten konwerter obsługuje pełny zakres kształtów DXF, w tym:
 - INSERT (bloki)
 
 Zapewnia poprawne renderowanie wszystkich typów encji oraz dokładne wymiary.
+Domyślnie elementy SVG zapisywane są bezpośrednio (dxf_svg_writer); rysowanie
+przez matplotlib dostępne jest jako backend 'matplotlib'.
 """
 
 import os
@@ -35,52 +37,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger("EnhancedDXFConverter")
 
-try:
-    import ezdxf
-    from ezdxf.addons import r12writer
-except ImportError:
-    logger.error("Biblioteka ezdxf nie jest zainstalowana. Użyj 'pip install ezdxf'")
-    sys.exit(1)
+# ezdxf i matplotlib importowane są dopiero przy konwersji: tryby info/json
+# nie potrzebują matplotlib, a odczyt z magazynu artefaktów żadnej z nich
 
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.path import Path
-    import matplotlib.patches as patches
-    from matplotlib.figure import Figure
-    from matplotlib.backends.backend_svg import FigureCanvasSVG
-    import matplotlib.transforms as transforms
-    from matplotlib.textpath import TextPath
-    from matplotlib.font_manager import FontProperties
-except ImportError:
-    logger.error("Biblioteka matplotlib nie jest zainstalowana. Użyj 'pip install matplotlib'")
-    sys.exit(1)
+
+def _import_ezdxf():
+    """Importuje ezdxf przy pierwszym parsowaniu pliku"""
+    try:
+        import ezdxf
+    except ImportError:
+        logger.error("Biblioteka ezdxf nie jest zainstalowana. Użyj 'pip install ezdxf'")
+        raise
+    return ezdxf
+
+
+def _import_matplotlib():
+    """Importuje część matplotlib potrzebną do rysowania SVG (bez pyplot)"""
+    try:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_svg import FigureCanvasSVG
+    except ImportError:
+        logger.error("Biblioteka matplotlib nie jest zainstalowana. Użyj 'pip install matplotlib'")
+        raise
+    return Figure, FigureCanvasSVG
+
+
+from artifact_cache import cached_text, cached_stream, converter_version
+from dxf_document import DxfDocument
+from dxf_extents import tilted_box_corners
+from dxf_svg_writer import iter_svg, dimensions_metadata, svg_output, StreamRewriter
 
 # Stałe
 DEFAULT_LINE_WIDTH = 0.5
 DEFAULT_LINE_COLOR = 'k'  # czarny
 DEFAULT_TEXT_COLOR = 'k'
 DEFAULT_TEXT_SIZE = 10
-DEFAULT_FONT = FontProperties(family='Arial')
+DEFAULT_FONT_FAMILY = 'Arial'
 DEFAULT_BLOCK_COLOR = 'k'
 DEFAULT_HATCH_COLOR = 'k'
 DEFAULT_HATCH_ALPHA = 0.3
 
+# Początek SVG zastępczego zwracanego przy błędzie konwersji (nie trafia do magazynu)
+ERROR_SVG_MARKER = "Error converting DXF to SVG"
+
 # Specjalne przypadki plików
 SPECIAL_CASES = {
     "kolo.dxf": {"width": 35, "height": 35},
     "koło.dxf": {"width": 35, "height": 35}
 }
 
+def special_case_name(dxf_path: str) -> Optional[str]:
+    """Nazwa szczególnego przypadku z SPECIAL_CASES pasująca do nazwy pliku"""
+    filename = os.path.basename(dxf_path).lower()
+    for case_name in SPECIAL_CASES:
+        if case_name.lower() in filename:
+            return case_name
+    return None
+
 def get_entity_points(entity) -> List[Tuple[float, float]]:
     """
     Pobiera punkty z encji DXF różnych typów.
-    Rozszerzona wersja z obsługą większej ilości typów encji.
+    Rozszerzona wersja z obsługą większej ilości typów encji. Wstawienia bloków
+    (INSERT) obsługuje pamięć granic bloków sesji dokumentu (BlockExtents),
+    a płaskie łuki, okręgi i polilinie - dokładne granice z dxf_extents.
     """
     points = []
     
     try:
         entity_type = entity.dxftype()
         
+        # Łuki, okręgi i polilinie w OCS poza płaszczyzną XY - granice we WCS
+        corners = tilted_box_corners(entity)
+        if corners is not None:
+            return corners
+        
         if hasattr(entity, 'get_points'):
             # Większość obiektów ma metodę get_points
             return entity.get_points()
@@ -102,31 +132,6 @@ def get_entity_points(entity) -> List[Tuple[float, float]]:
                 ))
             return points
         
-        elif entity_type == 'ARC':
-            # Dla łuku zwracamy kilka punktów wzdłuż łuku
-            center = entity.dxf.center
-            radius = entity.dxf.radius
-            start_angle = entity.dxf.start_angle
-            end_angle = entity.dxf.end_angle
-            
-            # Zapewnienie poprawnej kolejności kątów
-            if end_angle < start_angle:
-                end_angle += 360.0
-            
-            # Liczba punktów zależy od długości łuku
-            arc_length = math.radians(end_angle - start_angle) * radius
-            num_points = max(4, int(arc_length / 5))  # Przynajmniej 4 punkty, więcej dla dłuższych łuków
-            
-            points = []
-            for i in range(num_points + 1):
-                angle = start_angle + (end_angle - start_angle) * (i / num_points)
-                rad = math.radians(angle)
-                points.append((
-                    center[0] + radius * math.cos(rad),
-                    center[1] + radius * math.sin(rad)
-                ))
-            return points
-        
         elif entity_type == 'POLYLINE':
             # Dla polilinii pobieramy punkty z wierzchołków
             try:
@@ -164,48 +169,6 @@ def get_entity_points(entity) -> List[Tuple[float, float]]:
                 logger.warning(f"Błąd pobierania punktów {entity_type}: {e}")
                 return [entity.dxf.insert]
         
-        elif entity_type == 'INSERT':
-            # Dla bloku (INSERT) zwracamy punkty otaczające
-            try:
-                insert_point = entity.dxf.insert
-                # Pobierz skalę
-                scale_x = entity.dxf.xscale if hasattr(entity.dxf, 'xscale') else 1.0
-                scale_y = entity.dxf.yscale if hasattr(entity.dxf, 'yscale') else 1.0
-                
-                # Pobierz referencję do bloku
-                block = entity.block()
-                
-                # Inicjuj skrajne punkty
-                min_x, min_y = float('inf'), float('inf')
-                max_x, max_y = float('-inf'), float('-inf')
-                
-                # Szukaj granic w encjach bloku
-                for block_entity in block:
-                    block_points = get_entity_points(block_entity)
-                    for point in block_points:
-                        # Zastosuj skalę i przesunięcie
-                        x = insert_point[0] + point[0] * scale_x
-                        y = insert_point[1] + point[1] * scale_y
-                        min_x = min(min_x, x)
-                        min_y = min(min_y, y)
-                        max_x = max(max_x, x)
-                        max_y = max(max_y, y)
-                
-                # Jeśli nie znaleziono punktów, użyj tylko punktu wstawienia
-                if min_x == float('inf'):
-                    return [insert_point]
-                
-                # Zwróć narożniki prostokąta otaczającego blok
-                return [
-                    (min_x, min_y), 
-                    (max_x, min_y), 
-                    (max_x, max_y), 
-                    (min_x, max_y)
-                ]
-            except Exception as e:
-                logger.warning(f"Błąd pobierania punktów INSERT: {e}")
-                return [entity.dxf.insert]
-        
         elif entity_type == 'HATCH':
             # Dla wypełnień (HATCH) zwracamy punkty z granic
             try:
@@ -254,10 +217,16 @@ def get_entity_points(entity) -> List[Tuple[float, float]]:
     
     return points
 
-def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
+def open_document(dxf_path: str) -> DxfDocument:
+    """Wczytuje rysunek raz; granice liczone przez get_entity_points"""
+    _import_ezdxf()
+    return DxfDocument(dxf_path, get_entity_points)
+
+def parse_dxf_file(dxf_path: str, document: Optional[DxfDocument] = None) -> Dict[str, Any]:
     """
     Parsowanie pliku DXF i zwrócenie podstawowych informacji o nim.
-    Rozszerzona wersja z pełniejszą obsługą metadanych.
+    Rozszerzona wersja z pełniejszą obsługą metadanych. Przekazana sesja
+    document jest używana zamiast ponownego wczytania pliku.
     """
     # Sprawdź, czy plik istnieje
     if not os.path.exists(dxf_path):
@@ -269,60 +238,20 @@ def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
         raise ValueError("Plik DXF jest pusty")
     
     try:
-        # Wczytaj plik DXF
-        doc = ezdxf.readfile(dxf_path)
+        # Wczytaj plik DXF (jeden odczyt, jedno przejście po modelspace)
+        if document is None:
+            document = open_document(dxf_path)
         
-        # Pobierz modelspace
-        modelspace = doc.modelspace()
-        
-        # Liczniki różnych typów encji
-        entity_counts = {}
-        
-        # Określenie wymiarów dokumentu
-        min_x, min_y = float('inf'), float('inf')
-        max_x, max_y = float('-inf'), float('-inf')
-        has_entities = False
-        
-        # Przejdź przez wszystkie encje i zbierz informacje
-        for entity in modelspace:
-            has_entities = True
-            entity_type = entity.dxftype()
-            
-            # Zliczanie typów encji
-            entity_counts[entity_type] = entity_counts.get(entity_type, 0) + 1
-            
-            # Użyj funkcji get_entity_points do pobrania punktów z encji
-            points = get_entity_points(entity)
-            
-            for point in points:
-                if point and len(point) >= 2:  # Upewnij się, że point ma współrzędne x,y
-                    min_x = min(min_x, point[0])
-                    min_y = min(min_y, point[1])
-                    max_x = max(max_x, point[0])
-                    max_y = max(max_y, point[1])
-        
-        # Jeśli nie znaleziono encji, ustaw domyślne wymiary
-        if not has_entities or min_x == float('inf'):
-            min_x, min_y = 0, 0
-            max_x, max_y = 100, 100
+        # Liczniki typów encji i wymiary dokumentu
+        entity_counts = document.entity_counts
+        min_x, min_y, max_x, max_y = document.bounds
             
         # Próba wykrycia jednostek z dokumentu DXF
         units = "mm"  # domyślnie milimetry
         try:
             # W DXF jednostki są zapisane jako liczba typu int
             # 1=cale, 2=stopy, 4=mm, 5=cm, 6=m, 8=mikrony, 9=decymetry
-            dxf_units = doc.header.get('$INSUNITS', 4)  # domyślnie 4 (mm)
-            
-            units_map = {
-                1: "in",
-                2: "ft",
-                4: "mm",
-                5: "cm",
-                6: "m",
-                8: "µm",
-                9: "dm"
-            }
-            units = units_map.get(dxf_units, "mm")
+            units = document.units
             
         except Exception as e:
             logger.warning(f"Błąd podczas odczytu jednostek DXF: {e}")
@@ -356,32 +285,16 @@ def parse_dxf_file(dxf_path: str) -> Dict[str, Any]:
             "maxX": max_x,
             "maxY": max_y,
             "count": {
-                "entities": len(list(modelspace)),
-                "layers": len(doc.layers),
+                "entities": document.entity_count,
+                "layers": len(document.layers),
                 "entity_types": entity_counts
             },
             "special_case": special_case
         }
         
-        # Dodaj informacje o warstwach
-        info["layers"] = []
-        for layer in doc.layers:
-            layer_info = {
-                "name": layer.dxf.name,
-                "color": layer.dxf.color,
-                "linetype": layer.dxf.linetype
-            }
-            info["layers"].append(layer_info)
-        
-        # Dodaj informacje o blokach
-        info["blocks"] = []
-        for block in doc.blocks:
-            if not block.is_any_paperspace:
-                block_info = {
-                    "name": block.name,
-                    "entity_count": len(list(block))
-                }
-                info["blocks"].append(block_info)
+        # Dodaj informacje o warstwach i blokach
+        info["layers"] = document.layers
+        info["blocks"] = document.blocks
         
         # DEBUG: Wypisz informacje o wymiarach
         logger.info(f"DXF wymiary: {filename} - {width}x{height} {units}")
@@ -400,6 +313,10 @@ def draw_entity_matplotlib(entity, ax, layer_colors=None, layer_linetypes=None):
     Rysuje pojedynczą encję DXF na osi matplotlib.
     Obsługuje pełen zakres typów encji.
     """
+    import matplotlib.patches as patches
+    import matplotlib.transforms as transforms
+    from matplotlib.font_manager import FontProperties
+
     try:
         entity_type = entity.dxftype()
         
@@ -432,7 +349,7 @@ def draw_entity_matplotlib(entity, ax, layer_colors=None, layer_linetypes=None):
         elif entity_type == 'CIRCLE':
             center = entity.dxf.center
             radius = entity.dxf.radius
-            circle = plt.Circle((center[0], center[1]), radius, fill=False, color=color, linewidth=linewidth, linestyle=linestyle)
+            circle = patches.Circle((center[0], center[1]), radius, fill=False, color=color, linewidth=linewidth, linestyle=linestyle)
             ax.add_patch(circle)
         
         elif entity_type == 'ARC':
@@ -505,8 +422,7 @@ def draw_entity_matplotlib(entity, ax, layer_colors=None, layer_linetypes=None):
                 rotation = entity.dxf.rotation
                 
                 # Utwórz obiekt czcionki
-                font_prop = DEFAULT_FONT
-                font_prop.set_size(height)
+                font_prop = FontProperties(family=DEFAULT_FONT_FAMILY, size=height)
                 
                 # Dodaj tekst z transformacją dla obrotu
                 t = ax.text(
@@ -641,19 +557,94 @@ def draw_entity_matplotlib(entity, ax, layer_colors=None, layer_linetypes=None):
     except Exception as e:
         logger.warning(f"Błąd podczas rysowania encji {entity.dxftype()}: {str(e)}")
 
-def convert_dxf_to_svg_enhanced(dxf_path: str, svg_path: Optional[str] = None) -> str:
+def render_svg_matplotlib(document: DxfDocument, min_x, min_y, max_x, max_y, metadata: str, stream,
+                          explode: bool = True) -> None:
+    """
+    Rysunek przez matplotlib (dawny backend) zapisywany do strumienia; atrybut
+    preserveAspectRatio i metadata wstawiane są w locie podczas zapisu.
+    Bloki są zawsze rysowane osobno dla każdego wstawienia.
+    """
+    Figure, FigureCanvasSVG = _import_matplotlib()
+    width = max_x - min_x
+    height = max_y - min_y
+    
+    # Utwórz rysunek, upewniając się, że zachowany jest stosunek boków
+    fig = Figure(figsize=(8, 8 * height / width if width > height else 8))
+    ax = fig.add_subplot(111, aspect='equal')
+    
+    # Odwróć oś Y, by zachować konwencję CAD (Y do góry)
+    ax.invert_yaxis()
+    
+    # Ustaw limity osi
+    ax.set_xlim(min_x, max_x)
+    ax.set_ylim(max_y, min_y)  # Odwrócone limity Y
+    
+    # Wyłącz siatkę
+    ax.grid(False)
+    
+    # Wyłącz tiki i etykiety osi
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_xticklabels([])
+    ax.set_yticklabels([])
+    
+    # Wyłącz ramki
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    
+    # Przygotuj mapę kolorów warstw
+    layer_colors = document.layer_colors
+    layer_linetypes = document.layer_linetypes
+    
+    # Narysuj wszystkie encje
+    for entity in document.entities:
+        draw_entity_matplotlib(entity, ax, layer_colors, layer_linetypes)
+    
+    # Optymalizacja dla mobilnych urządzeń i informacje o wymiarach dopisywane w locie
+    writer = StreamRewriter(stream, [
+        ('<svg ', '<svg preserveAspectRatio="xMidYMid meet" '),
+        ('</svg>', metadata + '</svg>'),
+    ])
+    FigureCanvasSVG(fig).print_svg(writer)
+    writer.finish()
+
+def render_svg_direct(document: DxfDocument, min_x, min_y, max_x, max_y, metadata: str, stream,
+                      explode: bool = False) -> None:
+    """
+    Bezpośredni zapis elementów SVG we współrzędnych rysunku (bez matplotlib);
+    bloki raz jako <defs>, wstawienia jako <use>, chyba że explode=True
+    """
+    stream.writelines(iter_svg(document.entities, (min_x, min_y, max_x, max_y),
+                               metadata, document.layer_linetypes, explode))
+
+# Backendy rysowania SVG
+SVG_BACKENDS = {
+    'direct': render_svg_direct,
+    'matplotlib': render_svg_matplotlib,
+}
+
+# Backend domyślny - bezpośredni zapis jest wielokrotnie szybszy od matplotlib
+DEFAULT_SVG_BACKEND = 'direct'
+
+def write_svg_enhanced(dxf_path: str, output, backend: str = DEFAULT_SVG_BACKEND,
+                       explode: bool = False) -> bool:
     """
     Ulepszona konwersja pliku DXF do SVG z obsługą wszystkich typów encji.
+    Dwa przejścia: granice rysunku z sesji dokumentu, potem strumieniowy zapis
+    elementów do output (ścieżka albo strumień tekstowy) - nagłówek i metadata
+    powstają od razu z właściwymi wartościami, bez poprawiania gotowego tekstu.
+    backend: 'direct' (zapis elementów SVG) albo 'matplotlib'; explode=True
+    zapisuje wstawienia bloków jako płaską geometrię zamiast <use>.
+    Przy błędzie zapisuje SVG z komunikatem i zwraca False.
     """
     try:
-        # Najpierw parsuj plik DXF, aby uzyskać wymiary i podstawowe informacje
-        dxf_info = parse_dxf_file(dxf_path)
-        
-        # Wczytaj plik DXF
-        doc = ezdxf.readfile(dxf_path)
+        render = SVG_BACKENDS.get(backend)
+        if render is None:
+            raise ValueError(f"Unknown SVG backend '{backend}'")
         
-        # Pobierz modelspace
-        modelspace = doc.modelspace()
+        # Jedna sesja dokumentu: wymiary, informacje i rysowane encje z jednego odczytu
+        document = open_document(dxf_path)
+        dxf_info = parse_dxf_file(dxf_path, document)
         
         # Określenie wymiarów dokumentu
         min_x, min_y = dxf_info["minX"], dxf_info["minY"]
@@ -681,57 +672,6 @@ def convert_dxf_to_svg_enhanced(dxf_path: str, svg_path: Optional[str] = None) -
             width = max_x - min_x
             height = max_y - min_y
         
-        # Znajdź punkt środkowy
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-        
-        # Utwórz rysunek, upewniając się, że zachowany jest stosunek boków
-        fig = Figure(figsize=(8, 8 * height / width if width > height else 8))
-        ax = fig.add_subplot(111, aspect='equal')
-        
-        # Odwróć oś Y, by zachować konwencję CAD (Y do góry)
-        ax.invert_yaxis()
-        
-        # Ustaw limity osi
-        ax.set_xlim(min_x, max_x)
-        ax.set_ylim(max_y, min_y)  # Odwrócone limity Y
-        
-        # Wyłącz siatkę
-        ax.grid(False)
-        
-        # Wyłącz tiki i etykiety osi
-        ax.set_xticks([])
-        ax.set_yticks([])
-        ax.set_xticklabels([])
-        ax.set_yticklabels([])
-        
-        # Wyłącz ramki
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        # Przygotuj mapę kolorów warstw
-        layer_colors = {}
-        layer_linetypes = {}
-        
-        for layer in doc.layers:
-            layer_colors[layer.dxf.name] = layer.dxf.color
-            layer_linetypes[layer.dxf.name] = layer.dxf.linetype
-        
-        # Narysuj wszystkie encje
-        for entity in modelspace:
-            draw_entity_matplotlib(entity, ax, layer_colors, layer_linetypes)
-        
-        # Utwórz SVG jako ciąg znaków
-        svg_io = io.StringIO()
-        canvas = FigureCanvasSVG(fig)
-        canvas.print_svg(svg_io)
-        svg_content = svg_io.getvalue()
-        
-        # Zapisz SVG do pliku, jeśli podano ścieżkę
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(svg_content)
-        
         # Ustal właściwe wymiary dla SVG
         if has_special_case:
             svg_width = dxf_info["special_case"]["width"]
@@ -741,30 +681,11 @@ def convert_dxf_to_svg_enhanced(dxf_path: str, svg_path: Optional[str] = None) -
             svg_width = width
             svg_height = height
         
-        # Dodaj do SVG informacje o wymiarach
-        svg_content = svg_content.replace('</svg>', f'''
-  <metadata>
-    <dimensions>
-      <width>{svg_width}</width>
-      <height>{svg_height}</height>
-      <minX>{min_x}</minX>
-      <minY>{min_y}</minY>
-      <maxX>{max_x}</maxX>
-      <maxY>{max_y}</maxY>
-      <units>{units}</units>
-    </dimensions>
-  </metadata>
-</svg>''')
-        
-        # Optymalizuj SVG dla mobilnych urządzeń
-        svg_content = svg_content.replace('<svg ', '<svg preserveAspectRatio="xMidYMid meet" ')
-        
-        # Zapisz zmodyfikowane SVG
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(svg_content)
-        
-        return svg_content
+        metadata = dimensions_metadata(svg_width, svg_height, min_x, min_y, max_x, max_y, units)
+        with svg_output(output) as stream:
+            render(document, min_x, min_y, max_x, max_y, metadata, stream, explode)
+        
+        return True
         
     except Exception as e:
         logger.error(f"Error in convert_dxf_to_svg_enhanced: {str(e)}")
@@ -778,11 +699,24 @@ def convert_dxf_to_svg_enhanced(dxf_path: str, svg_path: Optional[str] = None) -
             <text x="20" y="130" font-family="Arial" font-size="12">{str(e)[50:100] if len(str(e)) > 50 else ""}</text>
         </svg>'''
         
-        if svg_path:
-            with open(svg_path, 'w') as f:
-                f.write(error_svg)
+        with svg_output(output) as stream:
+            stream.write(error_svg)
         
-        return error_svg
+        return False
+
+def convert_dxf_to_svg_enhanced(dxf_path: str, svg_path: Optional[str] = None,
+                                backend: str = DEFAULT_SVG_BACKEND, explode: bool = False) -> str:
+    """
+    Konwersja DXF do SVG. Ze ścieżką svg_path wynik zapisywany jest strumieniowo
+    i zwracana jest ścieżka; bez niej zwracana jest treść SVG.
+    """
+    if svg_path:
+        write_svg_enhanced(dxf_path, svg_path, backend, explode)
+        return svg_path
+    
+    svg_io = io.StringIO()
+    write_svg_enhanced(dxf_path, svg_io, backend, explode)
+    return svg_io.getvalue()
 
 def export_dxf_to_json(dxf_path: str, json_path: Optional[str] = None) -> str:
     """
@@ -822,36 +756,61 @@ def export_dxf_to_json(dxf_path: str, json_path: Optional[str] = None) -> str:
 
 if __name__ == '__main__':
     """Uruchomienie skryptu z linii poleceń"""
-    if len(sys.argv) < 3:
-        print("Usage: python enhanced_dxf_converter.py dxf_file output_format [output_file]")
+    args = sys.argv[1:]
+    
+    # Opcjonalny backend rysowania SVG: --backend direct|matplotlib
+    backend = DEFAULT_SVG_BACKEND
+    if '--backend' in args:
+        index = args.index('--backend')
+        backend = args[index + 1] if index + 1 < len(args) else ''
+        del args[index:index + 2]
+        if backend not in SVG_BACKENDS:
+            print(f"Error: Unknown backend '{backend}', expected one of: {', '.join(SVG_BACKENDS)}")
+            sys.exit(1)
+    
+    # Wstawienia bloków jako płaska geometria zamiast <use> (backend direct)
+    explode = '--explode' in args
+    if explode:
+        args.remove('--explode')
+    
+    if len(args) < 2:
+        print("Usage: python enhanced_dxf_converter.py dxf_file output_format [output_file] [--backend direct|matplotlib] [--explode]")
         print("  output_format: svg, json or info")
         sys.exit(1)
     
-    dxf_file = sys.argv[1]
-    output_format = sys.argv[2].lower()
-    output_file = sys.argv[3] if len(sys.argv) > 3 else None
+    dxf_file = args[0]
+    output_format = args[1].lower()
+    output_file = args[2] if len(args) > 2 else None
     
     if not os.path.exists(dxf_file):
         print(f"Error: File {dxf_file} does not exist")
         sys.exit(1)
     
-    if output_format == 'svg':
-        result = convert_dxf_to_svg_enhanced(dxf_file, output_file)
-        if not output_file:
-            print(result)
+    # Wyniki z magazynu artefaktów, jeśli ten sam rysunek był już konwertowany
+    version = converter_version('enhanced_dxf_converter.py', 'dxf_document.py', 'dxf_extents.py', 'dxf_svg_writer.py')
     
-    elif output_format == 'json':
-        result = export_dxf_to_json(dxf_file, output_file)
-        if not output_file:
-            print(result)
+    if output_format == 'svg':
+        # Strumieniowo do pliku albo na stdout; SVG z błędem nie trafia do magazynu
+        cached_stream(dxf_file, output_file or sys.stdout, 'enhanced_dxf_converter.svg', version,
+                      lambda output: write_svg_enhanced(dxf_file, output, backend, explode),
+                      {'special_case': special_case_name(dxf_file), 'backend': backend, 'explode': explode},
+                      '.svg')
     
-    elif output_format == 'info':
-        info = parse_dxf_file(dxf_file)
+    elif output_format in ('json', 'info'):
+        # Informacje zawierają nazwę pliku, więc jest ona częścią klucza
+        # Tryb "json" zwraca JSON z błędem, tryb "info" przerywa działanie wyjątkiem
+        if output_format == 'json':
+            produce = lambda: export_dxf_to_json(dxf_file)
+        else:
+            produce = lambda: json.dumps(parse_dxf_file(dxf_file), indent=2)
+        result = cached_text(dxf_file, 'enhanced_dxf_converter.info', version, produce,
+                             {'filename': os.path.basename(dxf_file)}, '.json',
+                             is_valid=lambda text: not text.startswith('{\n  "error": true'))
         if output_file:
             with open(output_file, 'w') as f:
-                json.dump(info, f, indent=2)
+                f.write(result)
         else:
-            print(json.dumps(info, indent=2))
+            print(result)
     
     else:
         print(f"Error: Unknown output format '{output_format}'")
@@ -35,6 +35,9 @@ def convert_step_to_stl(input_file, output_file):
         # Zapisz metadane o modelu
         create_model_info(shape, os.path.splitext(output_file)[0] + ".json")
         
+        # Lekka wersja dla przeglądarki (GLB z kwantowanymi buforami)
+        export_viewer_glb(shape, os.path.splitext(output_file)[0] + ".glb")
+        
         print("Conversion completed successfully")
         return True
     except Exception as e:
@@ -67,6 +70,18 @@ def convert_dwg_to_svg(input_file, output_file):
         print(f"Error converting DWG to SVG: {str(e)}")
         return False
 
+def export_viewer_glb(shape, output_file):
+    """Zapisuje teselację kształtu jako GLB dla przeglądarki."""
+    try:
+        from mesh_index import shape_mesh
+        from generate_glb import mesh_to_glb
+        from artifact_cache import atomic_write
+        
+        atomic_write(output_file, mesh_to_glb(*shape_mesh(shape)))
+        print(f"Viewer GLB saved to {output_file}")
+    except Exception as e:
+        print(f"Warning: could not export GLB: {str(e)}")
+
 def create_model_info(shape, output_file):
     """Tworzy plik JSON z informacjami o modelu."""
     try:
@@ -101,6 +116,13 @@ def create_model_info(shape, output_file):
             }
         }
         
+        # Wymiar surówki (minimalny prostopadłościan zorientowany) z teselacji kształtu
+        try:
+            from mesh_obb import box_info, shape_bounding_box
+            model_info["stock"] = box_info(shape_bounding_box(shape))
+        except Exception as e:
+            print(f"Warning: could not compute stock size: {str(e)}")
+        
         # Zapisz informacje do pliku JSON
         with open(output_file, 'w') as f:
             json.dump(model_info, f, indent=2)
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Eksport modeli STL/STEP do binarnego glTF (GLB) dla przeglądarki three.js
+Siatka indeksowana (zespawane wierzchołki, rozdzielone tylko na ostrych
+krawędziach), pozycje kwantowane do uint16 z przeskalowaniem w węźle oraz
+normalne int8 (KHR_mesh_quantization). Plik jest kilka razy mniejszy od STL
+i ładuje się bez parsowania - bufory trafiają wprost do GPU.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import numpy as np
+
+from mesh_index import (load_indexed_mesh, load_step_mesh, DEFAULT_WELD_TOLERANCE,
+                        STEP_TESSELLATION_TOLERANCE)
+from artifact_cache import atomic_write, cached_file, converter_version
+
+# Moduły, od których zależy zawartość GLB (ich zmiana unieważnia artefakty)
+GLB_SOURCES = ('generate_glb.py', 'mesh_index.py', 'stl_mesh.py')
+
+# Kąt między ścianami (stopnie), powyżej którego krawędź jest ostra - wierzchołki
+# są na niej rozdzielane, żeby płaskie ściany części CNC nie były wygładzane
+DEFAULT_CREASE_ANGLE = 30.0
+
+# Liczba poziomów kwantyzacji normalnych ścian przy rozdzielaniu wierzchołków (na składową)
+CREASE_NORMAL_LEVELS = 255
+
+# Największa wartość pozycji po kwantyzacji (uint16)
+POSITION_LEVELS = 65535
+
+# Kolor materiału (RGBA liniowe) - jak jasnoszary model w przeglądarce
+DEFAULT_BASE_COLOR = (0.62, 0.64, 0.68, 1.0)
+
+# Stałe formatu glTF 2.0 / GLB
+GLB_MAGIC = 0x46546C67
+GLB_VERSION = 2
+GLB_CHUNK_JSON = 0x4E4F534A
+GLB_CHUNK_BIN = 0x004E4942
+GLTF_BYTE = 5120
+GLTF_UNSIGNED_SHORT = 5123
+GLTF_UNSIGNED_INT = 5125
+GLTF_ARRAY_BUFFER = 34962
+GLTF_ELEMENT_ARRAY_BUFFER = 34963
+GLTF_TRIANGLES = 4
+
+# Liczba trójkątów przetwarzanych naraz przy liczeniu normalnych
+NORMAL_CHUNK_FACES = 1 << 16
+
+
+def face_normals(vertices, faces):
+    """Nieznormalizowane normalne ścian (F,3) float32 - długość to podwojone pole"""
+    x, y, z = (np.ascontiguousarray(vertices[:, axis], dtype=np.float32) for axis in range(3))
+    normals = np.empty((len(faces), 3), dtype=np.float32)
+
+    for start in range(0, len(faces), NORMAL_CHUNK_FACES):
+        corners = np.asarray(faces[start:start + NORMAL_CHUNK_FACES]).T
+        x0, x1, x2 = (x.take(index) for index in corners)
+        y0, y1, y2 = (y.take(index) for index in corners)
+        z0, z1, z2 = (z.take(index) for index in corners)
+        x1 -= x0; y1 -= y0; z1 -= z0
+        x2 -= x0; y2 -= y0; z2 -= z0
+
+        out = normals[start:start + len(x0)]
+        out[:, 0] = y1 * z2 - z1 * y2
+        out[:, 1] = z1 * x2 - x1 * z2
+        out[:, 2] = x1 * y2 - y1 * x2
+
+    return normals
+
+
+def _normalize(vectors):
+    """Wektory jednostkowe (zerowe zostają zerowe)"""
+    lengths = np.sqrt(np.einsum('ij,ij->i', vectors, vectors))
+    return vectors / np.where(lengths > 0, lengths, 1)[:, None]
+
+
+def split_creases(vertices, faces, crease_angle=DEFAULT_CREASE_ANGLE):
+    """
+    Siatka z normalnymi wierzchołków do cieniowania. Narożnik trójkąta, którego
+    normalna odbiega od uśrednionej normalnej wierzchołka o więcej niż
+    crease_angle, dostaje osobny wierzchołek wspólny z narożnikami o tej samej
+    (skwantowanej) normalnej - płaska ściana ma wtedy jedną normalną, a gładkie
+    powierzchnie pozostają zespawane.
+    Zwraca (pozycje (N,3), normalne jednostkowe (N,3), ściany (F,3)).
+    """
+    faces = np.asarray(faces)
+    normals = face_normals(vertices, faces)
+    vertex_count = len(vertices)
+
+    # Normalne wierzchołków ważone polem ścian
+    corner_vertex = faces.ravel().astype(np.int64)
+    corner_normal = np.repeat(normals, 3, axis=0)
+    vertex_normal = np.column_stack([np.bincount(corner_vertex, weights=corner_normal[:, axis],
+                                                 minlength=vertex_count) for axis in range(3)])
+    vertex_normal = _normalize(vertex_normal)
+    unit_corner = _normalize(corner_normal)
+
+    cosine = np.einsum('ij,ij->i', unit_corner, vertex_normal[corner_vertex])
+    sharp = cosine < np.cos(np.radians(crease_angle))
+
+    # Klucz narożnika: wierzchołek i kod normalnej ściany (0 - grupa gładka)
+    levels = CREASE_NORMAL_LEVELS
+    quantized = np.rint((unit_corner[sharp] + 1) * (levels / 2)).astype(np.int64)
+    code = np.zeros(len(corner_vertex), dtype=np.int64)
+    code[sharp] = 1 + (quantized[:, 0] * (levels + 1) + quantized[:, 1]) * (levels + 1) + quantized[:, 2]
+    keys = corner_vertex * ((levels + 1) ** 3 + 1) + code
+
+    unique_keys, first_corner, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    inverse = inverse.ravel()
+    split_normal = np.column_stack([np.bincount(inverse, weights=corner_normal[:, axis],
+                                                minlength=len(unique_keys)) for axis in range(3)])
+
+    positions = np.asarray(vertices)[corner_vertex[first_corner]]
+    return positions, _normalize(split_normal), inverse.reshape(-1, 3)
+
+
+def quantize_positions(positions):
+    """
+    Pozycje uint16 z jednolitą skalą (normalne się nie zmieniają).
+    Zwraca (pozycje (N,3) uint16, przesunięcie, skala) - p = q * skala + przesunięcie.
+    """
+    positions = np.asarray(positions, dtype=np.float64)
+    minimum = positions.min(axis=0)
+    extent = float((positions.max(axis=0) - minimum).max())
+    scale = extent / POSITION_LEVELS if extent > 0 else 1.0
+    quantized = np.rint((positions - minimum) / scale)
+    return np.clip(quantized, 0, POSITION_LEVELS).astype(np.uint16), minimum, scale
+
+
+def quantize_normals(normals):
+    """Normalne jednostkowe jako int8 znormalizowane (-127..127)"""
+    return np.clip(np.rint(np.asarray(normals) * 127), -127, 127).astype(np.int8)
+
+
+def _padded(data, fill=b'\0'):
+    """Bajty dopełnione do wielokrotności 4 (wymóg wyrównania glTF)"""
+    return data + fill * (-len(data) % 4)
+
+
+def build_glb(positions, normals, faces, translation, scale, base_color=DEFAULT_BASE_COLOR):
+    """
+    Składa plik GLB z kwantowanych buforów. Pozycje uint16 i normalne int8
+    dopełnione do 8 i 4 bajtów na wierzchołek (wyrównanie atrybutów), indeksy
+    uint16 albo uint32 zależnie od liczby wierzchołków.
+    """
+    vertex_count = len(positions)
+    position_data = np.zeros((vertex_count, 4), dtype=np.uint16)
+    position_data[:, :3] = positions
+    normal_data = np.zeros((vertex_count, 4), dtype=np.int8)
+    normal_data[:, :3] = normals
+    index_type = np.uint16 if vertex_count <= 0xFFFF else np.uint32
+    index_data = np.ascontiguousarray(faces, dtype=index_type)
+
+    views = []
+    binary = b''
+    for data, stride, target in ((position_data, 8, GLTF_ARRAY_BUFFER),
+                                 (normal_data, 4, GLTF_ARRAY_BUFFER),
+                                 (index_data, None, GLTF_ELEMENT_ARRAY_BUFFER)):
+        view = {'buffer': 0, 'byteOffset': len(binary), 'byteLength': data.nbytes, 'target': target}
+        if stride:
+            view['byteStride'] = stride
+        views.append(view)
+        binary = _padded(binary + data.tobytes())
+
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'Fast-Cnc-Viewer generate_glb.py'},
+        'extensionsUsed': ['KHR_mesh_quantization'],
+        'extensionsRequired': ['KHR_mesh_quantization'],
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        # Dekwantyzacja pozycji w węźle: jednolita skala i przesunięcie do minimum modelu
+        'nodes': [{'mesh': 0, 'translation': [float(v) for v in translation],
+                   'scale': [float(scale)] * 3}],
+        'meshes': [{'primitives': [{
+            'attributes': {'POSITION': 0, 'NORMAL': 1},
+            'indices': 2,
+            'material': 0,
+            'mode': GLTF_TRIANGLES,
+        }]}],
+        'materials': [{'pbrMetallicRoughness': {'baseColorFactor': list(base_color),
+                                                'metallicFactor': 0.1, 'roughnessFactor': 0.6}}],
+        'accessors': [
+            {'bufferView': 0, 'componentType': GLTF_UNSIGNED_SHORT, 'count': vertex_count, 'type': 'VEC3',
+             'min': positions.min(axis=0).tolist(), 'max': positions.max(axis=0).tolist()},
+            {'bufferView': 1, 'componentType': GLTF_BYTE, 'normalized': True, 'count': vertex_count,
+             'type': 'VEC3'},
+            {'bufferView': 2, 'componentType': GLTF_UNSIGNED_SHORT if index_type is np.uint16
+             else GLTF_UNSIGNED_INT, 'count': int(index_data.size), 'type': 'SCALAR'},
+        ],
+        'bufferViews': views,
+        'buffers': [{'byteLength': len(binary)}],
+    }
+
+    json_chunk = _padded(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+    length = 12 + 8 + len(json_chunk) + 8 + len(binary)
+    return b''.join([
+        struct.pack('<III', GLB_MAGIC, GLB_VERSION, length),
+        struct.pack('<II', len(json_chunk), GLB_CHUNK_JSON), json_chunk,
+        struct.pack('<II', len(binary), GLB_CHUNK_BIN), binary,
+    ])
+
+
+def mesh_to_glb(vertices, faces, crease_angle=DEFAULT_CREASE_ANGLE):
+    """Bajty GLB dla siatki indeksowanej"""
+    if len(faces) == 0:
+        raise ValueError("Mesh contains no triangles")
+    positions, normals, split_faces = split_creases(vertices, faces, crease_angle)
+    quantized, translation, scale = quantize_positions(positions)
+    return build_glb(quantized, quantize_normals(normals), split_faces, translation, scale)
+
+
+def load_model_mesh(input_path, tolerance=None):
+    """Siatka indeksowana pliku STL albo teselacja pliku STEP (FreeCAD)"""
+    if os.path.splitext(input_path)[1].lower() in ('.step', '.stp'):
+        return load_step_mesh(input_path, tolerance or STEP_TESSELLATION_TOLERANCE)
+    return load_indexed_mesh(input_path, tolerance or DEFAULT_WELD_TOLERANCE)
+
+
+def generate_glb(input_path, output_path, crease_angle=DEFAULT_CREASE_ANGLE, tolerance=None):
+    """Zapisuje atomowo model STL/STEP jako GLB; zwraca True/False"""
+    if not os.path.exists(input_path):
+        print(f"Input file does not exist: {input_path}", file=sys.stderr)
+        return False
+
+    try:
+        vertices, faces = load_model_mesh(input_path, tolerance)
+    except ImportError:
+        print("FreeCAD is required for STEP files", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"Error loading model: {e}", file=sys.stderr)
+        return False
+
+    try:
+        data = mesh_to_glb(vertices, faces, crease_angle)
+        atomic_write(output_path, data)
+        print(f"GLB saved to {output_path} ({len(data)} bytes)", file=sys.stderr)
+        return True
+    except Exception as e:
+        print(f"Error exporting GLB: {e}", file=sys.stderr)
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export STL/STEP model to quantized binary glTF (GLB)')
+    parser.add_argument('input', help='Input STL or STEP file path')
+    parser.add_argument('output', help='Output GLB file path')
+    parser.add_argument('--crease-angle', type=float, default=DEFAULT_CREASE_ANGLE,
+                        help='Split vertex normals across edges sharper than this angle (degrees)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='STEP tessellation tolerance or STL vertex weld tolerance')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    # GLB z magazynu artefaktów, jeśli ten sam model był już eksportowany
+    success = cached_file(
+        args.input,
+        args.output,
+        'generate_glb',
+        converter_version(*GLB_SOURCES),
+        lambda output_path: generate_glb(args.input, output_path, args.crease_angle, args.tolerance),
+        {'crease_angle': args.crease_angle, 'tolerance': args.tolerance}
+    )
+
+    sys.exit(0 if success else 1)
+
+if __name__ == '__main__':
+    main()
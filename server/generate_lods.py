@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Łańcuch poziomów szczegółowości (LOD) dla progresywnego ładowania modeli
+Przy przyjęciu pliku powstają uproszczone wersje siatki (np. 1%, 10% i 100%
+trójkątów) jako pliki GLB oraz mały manifest <nazwa>.lods.json. Przeglądarka
+pokazuje najpierw najmniejszy poziom, a potem podmienia go na dokładniejsze.
+Upraszczanie tym samym klastrowaniem wierzchołków co miniaturki (mesh_decimate).
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from mesh_decimate import decimate_mesh
+from generate_glb import mesh_to_glb, load_model_mesh, DEFAULT_CREASE_ANGLE
+from artifact_cache import atomic_write
+from mesh_index import sidecar_path_for
+
+# Domyślne poziomy jako ułamek liczby trójkątów modelu
+DEFAULT_LOD_RATIOS = (0.01, 0.1, 1.0)
+
+# Poziom uproszczony nie schodzi poniżej tej liczby trójkątów (mniej nie oddaje kształtu)
+MIN_LOD_TRIANGLES = 2000
+
+# Rozszerzenie manifestu zapisywanego obok poziomów
+LOD_MANIFEST_SUFFIX = '.lods.json'
+
+
+def parse_ratios(spec):
+    """Parsuje listę poziomów "1%,10%,100%" albo "0.01,0.1,1"; zwraca rosnącą krotkę ułamków"""
+    ratios = set()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        ratio = float(item[:-1]) / 100 if item.endswith('%') else float(item)
+        if not 0 < ratio <= 1:
+            raise ValueError(f"Invalid level '{item}', expected a fraction in (0, 1] or a percentage")
+        ratios.add(ratio)
+    if not ratios:
+        raise ValueError("No levels given")
+    return tuple(sorted(ratios))
+
+
+def build_lod_chain(vertices, faces, ratios=DEFAULT_LOD_RATIOS):
+    """
+    Poziomy siatki od najdokładniejszego do najbardziej zgrubnego - każdy
+    upraszczany z poprzedniego (mniej pracy niż z pełnej siatki). Poziomy,
+    które nie byłyby mniejsze od dokładniejszego, są pomijane.
+    Zwraca listę (ułamek, vertices, faces) od najzgrubszego poziomu.
+    """
+    total = len(faces)
+    levels = []
+    for ratio in sorted(ratios, reverse=True):
+        target = max(MIN_LOD_TRIANGLES, int(round(total * ratio)))
+        if levels and target >= len(levels[-1][2]):
+            continue
+        if target < len(faces):
+            vertices, faces = decimate_mesh(vertices, faces, target)
+        levels.append((ratio, vertices, faces))
+    return levels[::-1]
+
+
+def lod_file_name(name, level):
+    """Nazwa pliku poziomu: <nazwa>.lod<N>.glb, 0 - najbardziej zgrubny"""
+    return f"{name}.lod{level}.glb"
+
+
+def generate_lods(input_path, output_dir=None, ratios=DEFAULT_LOD_RATIOS,
+                  crease_angle=DEFAULT_CREASE_ANGLE, tolerance=None):
+    """
+    Zapisuje poziomy GLB i manifest do output_dir (domyślnie obok pliku wejściowego).
+    Manifest zapisywany jest na końcu, więc nigdy nie wskazuje brakujących plików.
+    Zwraca słownik manifestu albo None.
+    """
+    if not os.path.exists(input_path):
+        print(f"Input file does not exist: {input_path}", file=sys.stderr)
+        return None
+
+    try:
+        vertices, faces = load_model_mesh(input_path, tolerance)
+    except ImportError:
+        print("FreeCAD is required for STEP files", file=sys.stderr)
+        return None
+    except Exception as e:
+        print(f"Error loading model: {e}", file=sys.stderr)
+        return None
+
+    if len(faces) == 0:
+        print("Model contains no geometry", file=sys.stderr)
+        return None
+
+    output_dir = output_dir or os.path.dirname(os.path.abspath(input_path))
+    name = os.path.basename(input_path)
+
+    try:
+        levels = []
+        for level, (ratio, level_vertices, level_faces) in enumerate(build_lod_chain(vertices, faces, ratios)):
+            data = mesh_to_glb(level_vertices, level_faces, crease_angle)
+            file_name = lod_file_name(name, level)
+            atomic_write(os.path.join(output_dir, file_name), data)
+            levels.append({
+                'file': file_name,
+                'ratio': ratio,
+                'triangles': int(len(level_faces)),
+                'vertices': int(len(level_vertices)),
+                'bytes': len(data),
+            })
+
+        # Plik usunięty w trakcie (upraszczanie działa w tle po przyjęciu) - bez osieroconych poziomów
+        if not os.path.exists(input_path):
+            for level in levels:
+                os.remove(os.path.join(output_dir, level['file']))
+            if os.path.exists(sidecar_path_for(input_path)):
+                os.remove(sidecar_path_for(input_path))
+            print(f"Input file was removed during LOD generation: {input_path}", file=sys.stderr)
+            return None
+
+        # Poziomy od najmniejszego - przeglądarka ładuje je kolejno
+        manifest = {
+            'source': name,
+            'triangles': int(len(faces)),
+            'levels': levels,
+        }
+        atomic_write(os.path.join(output_dir, name + LOD_MANIFEST_SUFFIX),
+                     json.dumps(manifest, indent=2).encode('utf-8'))
+        return manifest
+
+    except Exception as e:
+        print(f"Error generating LODs: {e}", file=sys.stderr)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate level-of-detail GLB chain with manifest')
+    parser.add_argument('input', help='Input STL or STEP file path')
+    parser.add_argument('--output-dir', help='Output directory (default: next to the input file)')
+    parser.add_argument('--levels', default=','.join(f"{r:g}" for r in DEFAULT_LOD_RATIOS),
+                        help='Triangle fractions or percentages, e.g. "1%%,10%%,100%%"')
+    parser.add_argument('--crease-angle', type=float, default=DEFAULT_CREASE_ANGLE,
+                        help='Split vertex normals across edges sharper than this angle (degrees)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='STEP tessellation tolerance or STL vertex weld tolerance')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        ratios = parse_ratios(args.levels)
+    except ValueError as e:
+        print(f"Invalid --levels: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    manifest = generate_lods(args.input, args.output_dir, ratios, args.crease_angle, args.tolerance)
+    if manifest is None:
+        sys.exit(1)
+
+    for level in manifest['levels']:
+        print(f"{level['file']}: {level['triangles']} triangles, {level['bytes']} bytes")
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,19 @@ Używa FreeCAD do renderowania modeli STEP jako obrazy PNG
 """
 
 import argparse
+import io
 import sys
 import os
+import tempfile
 
-def generate_step_thumbnail(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa'):
-    """Generuje miniaturkę dla pliku STEP używając FreeCAD"""
+from image_encode import save_image, save_image_set, parse_sizes, render_size
+
+def generate_step_thumbnail(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa',
+                            sizes=None):
+    """
+    Generuje miniaturkę dla pliku STEP używając FreeCAD. Z listą sizes renderuje
+    raz w największym rozmiarze i zapisuje warianty WebP + PNG/JPEG z manifestem srcset.
+    """
     
     # Sprawdź czy plik istnieje
     if not os.path.exists(input_path):
@@ -53,8 +61,24 @@ def generate_step_thumbnail(input_path, output_path, width=300, height=300, qual
         view.viewIsometric()
         view.fitAll()
         
-        # Renderuj do pliku
-        view.saveImage(output_path, width, height, background)
+        if sizes:
+            # FreeCAD zapisuje obraz tylko do pliku - render w największym rozmiarze
+            # do pliku tymczasowego, z którego powstają warianty
+            from PIL import Image
+            render_width, render_height = render_size(sizes)
+            fd, render_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)),
+                                               suffix='.png')
+            os.close(fd)
+            try:
+                view.saveImage(render_path, render_width, render_height, background)
+                with Image.open(render_path) as img:
+                    img.load()
+                    save_image_set(img, output_path, sizes, quality=quality, primary_size=(width, height))
+            finally:
+                os.remove(render_path)
+        else:
+            # Renderuj do pliku
+            view.saveImage(output_path, width, height, background)
         
         # Zamknij dokument
         FreeCAD.closeDocument(doc.Name)
@@ -63,7 +87,8 @@ def generate_step_thumbnail(input_path, output_path, width=300, height=300, qual
         
     except ImportError:
         print("FreeCAD not available, trying alternative method", file=sys.stderr)
-        return generate_step_thumbnail_alternative(input_path, output_path, width, height, quality, background)
+        return generate_step_thumbnail_alternative(input_path, output_path, width, height, quality, background,
+                                                   sizes)
     except Exception as e:
         print(f"Error generating STEP thumbnail: {e}", file=sys.stderr)
         try:
@@ -72,15 +97,18 @@ def generate_step_thumbnail(input_path, output_path, width=300, height=300, qual
             pass
         return False
 
-def generate_step_thumbnail_alternative(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa'):
+def generate_step_thumbnail_alternative(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa',
+                                        sizes=None):
     """Alternatywna metoda generowania miniaturek STEP używając matplotlib i prostego parsera"""
     
     try:
         import matplotlib.pyplot as plt
         import matplotlib.patches as patches
+        from PIL import Image
         
-        # Utwórz prostą wizualizację zastępczą
-        fig, ax = plt.subplots(figsize=(width/100, height/100), dpi=100)
+        # Utwórz prostą wizualizację zastępczą (przy sizes w największym rozmiarze)
+        render_width, render_height = render_size(sizes) if sizes else (width, height)
+        fig, ax = plt.subplots(figsize=(render_width/100, render_height/100), dpi=100)
         
         # Dodaj prostą reprezentację 3D obiektu
         # Rysuj prostopadłościan jako reprezentację modelu STEP
@@ -112,8 +140,9 @@ def generate_step_thumbnail_alternative(input_path, output_path, width=300, heig
         # Usuń marginesy
         plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
         
-        # Zapisz jako PNG
-        plt.savefig(output_path, 
+        # Render do bufora w pamięci
+        buffer = io.BytesIO()
+        plt.savefig(buffer, 
                    format='png', 
                    dpi=100, 
                    bbox_inches='tight', 
@@ -122,6 +151,15 @@ def generate_step_thumbnail_alternative(input_path, output_path, width=300, heig
                    edgecolor='none')
         plt.close()
         
+        # Format z rozszerzenia pliku (PNG, JPEG lub WebP), jeden atomowy zapis
+        buffer.seek(0)
+        with Image.open(buffer) as img:
+            img.load()
+            if sizes:
+                save_image_set(img, output_path, sizes, quality=quality, primary_size=(width, height))
+            else:
+                save_image(img, output_path, quality=quality)
+        
         return True
         
     except Exception as e:
@@ -136,16 +174,28 @@ def main():
     parser.add_argument('--height', type=int, default=300, help='Thumbnail height')
     parser.add_argument('--quality', type=int, default=85, help='Image quality')
     parser.add_argument('--background', default='#f8f9fa', help='Background color')
+    parser.add_argument('--sizes',
+                        help='Also write downsampled WebP + PNG/JPEG variants and a .srcset.json '
+                             'manifest, e.g. "150,600x600" (rendered once at the largest size)')
     
     args = parser.parse_args()
     
+    sizes = None
+    if args.sizes:
+        try:
+            sizes = parse_sizes(args.sizes, args.width, args.height)
+        except ValueError as e:
+            print(f"Invalid --sizes: {e}", file=sys.stderr)
+            sys.exit(1)
+    
     success = generate_step_thumbnail(
         args.input, 
         args.output, 
         args.width, 
         args.height, 
         args.quality, 
-        args.background
+        args.background,
+        sizes
     )
     
     sys.exit(0 if success else 1)
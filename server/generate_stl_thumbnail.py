@@ -1,52 +1,38 @@
 #!/usr/bin/env python3
 """
 Generator miniaturek dla plików STL
-Używa matplotlib i numpy do renderowania 3D modeli STL jako obrazy PNG
+Używa numpy do renderowania 3D modeli STL jako obrazy PNG (programowy z-bufor)
 """
 
 import argparse
-import numpy as np
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d import Axes3D
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-import matplotlib.patches as patches
 import sys
 import os
+import numpy as np
+
+from stl_mesh import (read_stl_binary, read_stl_triangle_count, is_ascii_stl,
+                      compute_stl_stats, MAX_FULL_LOAD_TRIANGLES)
+from mesh_index import load_indexed_mesh
+from mesh_rasterizer import render_mesh, parse_color
+from mesh_decimate import decimate_mesh, decimate_stl_file, DEFAULT_MAX_TRIANGLES
+from image_encode import save_image, save_image_set, parse_sizes, render_size
+from artifact_cache import cached_file, converter_version
 
-def parse_stl_binary(file_path):
+# Moduły, od których zależy wygląd miniaturki (ich zmiana unieważnia artefakty)
+STL_THUMBNAIL_SOURCES = ('generate_stl_thumbnail.py', 'mesh_rasterizer.py', 'mesh_decimate.py',
+                         'mesh_index.py', 'stl_mesh.py', 'image_encode.py')
+
+def parse_stl_binary(file_path, max_triangles=None):
     """Parsuje binarny plik STL"""
     try:
-        with open(file_path, 'rb') as f:
-            # Pomiń nagłówek (80 bajtów)
-            f.seek(80)
-            
-            # Odczytaj liczbę trójkątów
-            triangle_count = int.from_bytes(f.read(4), byteorder='little')
-            
-            vertices = []
-            faces = []
-            
-            for i in range(triangle_count):
-                # Pomiń wektor normalny (12 bajtów)
-                f.read(12)
-                
-                # Odczytaj 3 wierzchołki (po 12 bajtów każdy)
-                triangle_vertices = []
-                for j in range(3):
-                    x = np.frombuffer(f.read(4), dtype=np.float32)[0]
-                    y = np.frombuffer(f.read(4), dtype=np.float32)[0]
-                    z = np.frombuffer(f.read(4), dtype=np.float32)[0]
-                    triangle_vertices.append([x, y, z])
-                
-                # Dodaj wierzchołki do listy
-                start_idx = len(vertices)
-                vertices.extend(triangle_vertices)
-                faces.append([start_idx, start_idx + 1, start_idx + 2])
-                
-                # Pomiń atrybuty (2 bajty)
-                f.read(2)
-            
-            return np.array(vertices), np.array(faces)
+        if max_triangles is None or read_stl_triangle_count(file_path) <= max_triangles:
+            # Siatka indeksowana z pliku pomocniczego .npz (lub zbudowana i zapisana)
+            return load_indexed_mesh(file_path)
+        
+        # Próbka dużego pliku jako "zupa" trójkątów - spawa ją dopiero decymacja,
+        # bez zapisu pliku pomocniczego
+        triangles, _ = read_stl_binary(file_path, max_triangles)
+        vertices = triangles.reshape(-1, 3)
+        return vertices, np.arange(len(vertices), dtype=np.uint32).reshape(-1, 3)
             
     except Exception as e:
         print(f"Error parsing STL file: {e}", file=sys.stderr)
@@ -55,50 +41,19 @@ def parse_stl_binary(file_path):
 def parse_stl_ascii(file_path):
     """Parsuje ASCII plik STL"""
     try:
-        vertices = []
-        faces = []
-        
-        with open(file_path, 'r') as f:
-            lines = f.readlines()
-            
-        i = 0
-        triangle_vertices = []
-        
-        while i < len(lines):
-            line = lines[i].strip().lower()
-            
-            if line.startswith('vertex'):
-                parts = line.split()
-                if len(parts) >= 4:
-                    x, y, z = float(parts[1]), float(parts[2]), float(parts[3])
-                    triangle_vertices.append([x, y, z])
-            
-            elif line.startswith('endfacet'):
-                if len(triangle_vertices) == 3:
-                    start_idx = len(vertices)
-                    vertices.extend(triangle_vertices)
-                    faces.append([start_idx, start_idx + 1, start_idx + 2])
-                triangle_vertices = []
-            
-            i += 1
-        
-        return np.array(vertices), np.array(faces)
+        # Strumieniowy parser ASCII; wynik trafia do tego samego pliku pomocniczego .npz
+        return load_indexed_mesh(file_path)
         
     except Exception as e:
         print(f"Error parsing ASCII STL file: {e}", file=sys.stderr)
         return None, None
 
-def is_ascii_stl(file_path):
-    """Sprawdza czy plik STL jest w formacie ASCII"""
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            first_line = f.readline().strip().lower()
-            return first_line.startswith('solid')
-    except:
-        return False
-
-def generate_stl_thumbnail(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa'):
-    """Generuje miniaturkę dla pliku STL"""
+def generate_stl_thumbnail(input_path, output_path, width=300, height=300, quality=85, background='#f8f9fa',
+                           max_triangles=DEFAULT_MAX_TRIANGLES, sizes=None):
+    """
+    Generuje miniaturkę dla pliku STL. Z listą sizes renderuje raz w największym
+    rozmiarze i zapisuje zmniejszone warianty WebP + PNG/JPEG z manifestem srcset.
+    """
     
     # Sprawdź czy plik istnieje
     if not os.path.exists(input_path):
@@ -106,10 +61,32 @@ def generate_stl_thumbnail(input_path, output_path, width=300, height=300, quali
         return False
     
     # Parsuj plik STL
+    stats = None
     if is_ascii_stl(input_path):
         vertices, faces = parse_stl_ascii(input_path)
     else:
-        vertices, faces = parse_stl_binary(input_path)
+        # Najpierw statystyki z mapy pamięci - dopiero one decydują,
+        # czy siatkę można wczytać w całości
+        try:
+            stats = compute_stl_stats(input_path)
+        except Exception as e:
+            print(f"Error computing STL statistics: {e}", file=sys.stderr)
+            return False
+        
+        if stats['triangle_count'] > MAX_FULL_LOAD_TRIANGLES and max_triangles:
+            # Decymacja porcjami z mapy pamięci - cała siatka nigdy nie trafia do pamięci
+            print(f"Large STL ({stats['triangle_count']} triangles), decimating "
+                  f"to {max_triangles} while streaming", file=sys.stderr)
+            try:
+                vertices, faces = decimate_stl_file(input_path, min(max_triangles, MAX_FULL_LOAD_TRIANGLES), stats)
+            except Exception as e:
+                print(f"Error decimating STL file: {e}", file=sys.stderr)
+                return False
+        else:
+            if stats['triangle_count'] > MAX_FULL_LOAD_TRIANGLES:
+                print(f"Large STL ({stats['triangle_count']} triangles), sampling "
+                      f"{MAX_FULL_LOAD_TRIANGLES} for thumbnail", file=sys.stderr)
+            vertices, faces = parse_stl_binary(input_path, MAX_FULL_LOAD_TRIANGLES)
     
     if vertices is None or faces is None:
         print("Failed to parse STL file", file=sys.stderr)
@@ -120,88 +97,23 @@ def generate_stl_thumbnail(input_path, output_path, width=300, height=300, quali
         return False
     
     try:
-        # Utwórz figurę matplotlib
-        fig = plt.figure(figsize=(width/100, height/100), dpi=100)
-        ax = fig.add_subplot(111, projection='3d')
-        
-        # Przygotuj kolekcję trójkątów
-        triangles = []
-        for face in faces:
-            if len(face) >= 3:
-                triangle = vertices[face[:3]]
-                triangles.append(triangle)
-        
-        if not triangles:
-            print("No valid triangles found", file=sys.stderr)
-            return False
-        
-        # Przygotuj mesh z lepszym renderowaniem
-        vertices_array = np.array(vertices)
-        
-        # Oblicz normalne dla lepszego oświetlenia
-        face_normals = []
-        for triangle in triangles:
-            v1 = triangle[1] - triangle[0]
-            v2 = triangle[2] - triangle[0]
-            normal = np.cross(v1, v2)
-            if np.linalg.norm(normal) > 0:
-                normal = normal / np.linalg.norm(normal)
-            face_normals.append(normal)
-        
-        face_normals = np.array(face_normals)
-        
-        # Symuluj oświetlenie z góry-przodu
-        light_direction = np.array([0.3, 0.3, 1.0])
-        light_direction = light_direction / np.linalg.norm(light_direction)
-        
-        # Oblicz intensywność oświetlenia
-        if len(face_normals) > 0:
-            lighting = np.dot(face_normals, light_direction)
-            lighting = np.clip(lighting, 0.3, 1.0)  # Minimum 30% jasności
-            
-            # Mapuj intensywność na kolory
-            colors = plt.cm.plasma(lighting)
+        # Ogranicz liczbę trójkątów, żeby czas renderowania nie zależał od rozmiaru pliku
+        if max_triangles and len(faces) > max_triangles:
+            original_count = len(faces)
+            vertices, faces = decimate_mesh(vertices, faces, max_triangles)
+            print(f"Decimated mesh from {original_count} to {len(faces)} triangles", file=sys.stderr)
+        
+        # Renderuj widok izometryczny z buforem głębokości i konturami
+        render_width, render_height = render_size(sizes) if sizes else (width, height)
+        pixels = render_mesh(vertices, faces, render_width, render_height,
+                             elevation=20, azimuth=45,
+                             background=parse_color(background))
+        
+        if sizes:
+            save_image_set(pixels, output_path, sizes, quality=quality, primary_size=(width, height))
         else:
-            colors = 'lightblue'
-        
-        # Utwórz kolekcję 3D z lepszymi kolorami
-        poly3d = Poly3DCollection(triangles, alpha=0.85, facecolors=colors, edgecolor='black', linewidth=0.05)
-        ax.add_collection3d(poly3d)
-        
-        # Oblicz granice modelu
-        all_vertices = np.array(triangles).reshape(-1, 3)
-        min_vals = np.min(all_vertices, axis=0)
-        max_vals = np.max(all_vertices, axis=0)
-        
-        # Ustaw granice osi
-        ax.set_xlim(min_vals[0], max_vals[0])
-        ax.set_ylim(min_vals[1], max_vals[1])
-        ax.set_zlim(min_vals[2], max_vals[2])
-        
-        # Ukryj osie i etykiety
-        ax.set_axis_off()
-        
-        # Ustaw kąt widzenia dla lepszej prezentacji
-        ax.view_init(elev=20, azim=45)
-        
-        # Ustaw tło
-        fig.patch.set_facecolor(background)
-        ax.xaxis.pane.fill = False
-        ax.yaxis.pane.fill = False
-        ax.zaxis.pane.fill = False
-        
-        # Usuń marginesy
-        plt.subplots_adjust(left=0, right=1, top=1, bottom=0)
-        
-        # Zapisz jako PNG
-        plt.savefig(output_path, 
-                   format='png', 
-                   dpi=100, 
-                   bbox_inches='tight', 
-                   pad_inches=0,
-                   facecolor=background,
-                   edgecolor='none')
-        plt.close()
+            # Format z rozszerzenia pliku (PNG, JPEG lub WebP), jeden atomowy zapis
+            save_image(pixels, output_path, quality=quality)
         
         return True
         
@@ -217,16 +129,46 @@ def main():
     parser.add_argument('--height', type=int, default=300, help='Thumbnail height')
     parser.add_argument('--quality', type=int, default=85, help='Image quality')
     parser.add_argument('--background', default='#f8f9fa', help='Background color')
+    parser.add_argument('--max-triangles', type=int, default=DEFAULT_MAX_TRIANGLES,
+                        help='Decimate meshes above this triangle count before rendering (0 disables)')
+    parser.add_argument('--sizes',
+                        help='Also write downsampled WebP + PNG/JPEG variants and a .srcset.json '
+                             'manifest, e.g. "150,600x600" (rendered once at the largest size)')
     
     args = parser.parse_args()
     
-    success = generate_stl_thumbnail(
-        args.input, 
-        args.output, 
-        args.width, 
-        args.height, 
-        args.quality, 
-        args.background
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+    
+    if args.sizes:
+        try:
+            sizes = parse_sizes(args.sizes, args.width, args.height)
+        except ValueError as e:
+            print(f"Invalid --sizes: {e}", file=sys.stderr)
+            sys.exit(1)
+        # Zestaw plików wariantów nie trafia do magazynu artefaktów
+        success = generate_stl_thumbnail(args.input, args.output, args.width, args.height,
+                                         args.quality, args.background, args.max_triangles, sizes)
+        sys.exit(0 if success else 1)
+    
+    # Miniaturka z magazynu artefaktów, jeśli ten sam model był już renderowany
+    success = cached_file(
+        args.input,
+        args.output,
+        'generate_stl_thumbnail',
+        converter_version(*STL_THUMBNAIL_SOURCES),
+        lambda output_path: generate_stl_thumbnail(
+            args.input, 
+            output_path, 
+            args.width, 
+            args.height, 
+            args.quality, 
+            args.background,
+            args.max_triangles
+        ),
+        {'width': args.width, 'height': args.height, 'quality': args.quality,
+         'background': args.background, 'max_triangles': args.max_triangles}
     )
     
     sys.exit(0 if success else 1)
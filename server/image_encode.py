@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Kodowanie obrazów miniaturek w pamięci
+Renderery przekazują tu surowe piksele; format (PNG/JPEG/WebP) wynika
+z rozszerzenia pliku albo z opcji, a plik zapisywany jest atomowo jeden raz.
+Zestaw rozmiarów (srcset) powstaje z jednego renderu przez zmniejszanie.
+"""
+
+import io
+import json
+import os
+
+from artifact_cache import atomic_write
+
+# Format Pillow według rozszerzenia pliku wyjściowego
+IMAGE_FORMATS = {
+    '.png': 'PNG',
+    '.jpg': 'JPEG',
+    '.jpeg': 'JPEG',
+    '.webp': 'WEBP',
+}
+
+# Domyślna jakość kompresji stratnej (JPEG/WebP)
+DEFAULT_IMAGE_QUALITY = 75
+
+# Typy MIME formatów dla manifestu srcset
+MIME_TYPES = {
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+# Rozszerzenie plików wariantów według formatu
+FORMAT_EXTENSIONS = {
+    'PNG': '.png',
+    'JPEG': '.jpg',
+    'WEBP': '.webp',
+}
+
+# Tło pod przezroczystość dla formatów bez kanału alfa
+FLATTEN_BACKGROUND = (255, 255, 255)
+
+
+def image_format(output_path, fmt=None):
+    """Format Pillow z opcji (png/jpeg/webp) albo z rozszerzenia pliku; domyślnie PNG"""
+    if fmt:
+        key = '.' + fmt.lower().lstrip('.')
+        if key not in IMAGE_FORMATS:
+            raise ValueError(f"Unsupported image format '{fmt}', expected one of "
+                             f"{', '.join(sorted(set(IMAGE_FORMATS.values())))}")
+        return IMAGE_FORMATS[key]
+    return IMAGE_FORMATS.get(os.path.splitext(output_path)[1].lower(), 'PNG')
+
+
+def encode_image(pixels, fmt='PNG', quality=DEFAULT_IMAGE_QUALITY, max_size=None):
+    """
+    Koduje obraz do bajtów w pamięci. pixels to tablica uint8 (H, W, 3|4)
+    albo obraz Pillow; max_size=(szer., wys.) zmniejsza za duże obrazy.
+    """
+    from PIL import Image
+
+    img = pixels if isinstance(pixels, Image.Image) else Image.fromarray(pixels)
+
+    if fmt == 'JPEG' and img.mode != 'RGB':
+        # JPEG nie ma kanału alfa - przezroczystość na białym tle
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, FLATTEN_BACKGROUND)
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert('RGB')
+
+    if max_size and (img.size[0] > max_size[0] or img.size[1] > max_size[1]):
+        img = img.copy()
+        img.thumbnail(max_size, Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    if fmt == 'PNG':
+        img.save(buffer, format='PNG', optimize=True)
+    elif fmt == 'JPEG':
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+    else:
+        img.save(buffer, format=fmt, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def save_image(pixels, output_path, fmt=None, quality=DEFAULT_IMAGE_QUALITY, max_size=None):
+    """Koduje obraz w formacie z opcji lub rozszerzenia i zapisuje go atomowo"""
+    data = encode_image(pixels, image_format(output_path, fmt), quality, max_size)
+    atomic_write(output_path, data)
+    return len(data)
+
+
+def parse_sizes(spec, width, height):
+    """
+    Parsuje listę rozmiarów rozdzieloną przecinkami: "SZERxWYS" albo sama
+    szerokość (wysokość w proporcji width:height). Zwraca posortowaną listę
+    (szer., wys.) bez powtórzeń, zawsze z rozmiarem podstawowym (width, height).
+    """
+    sizes = {(width, height)}
+    for item in spec.split(','):
+        item = item.strip().lower()
+        if not item:
+            continue
+        size_width, _, size_height = item.partition('x')
+        size_width = int(size_width)
+        size_height = int(size_height) if size_height else max(1, round(size_width * height / width))
+        if size_width <= 0 or size_height <= 0:
+            raise ValueError(f"Invalid size '{item}'")
+        sizes.add((size_width, size_height))
+    return sorted(sizes)
+
+
+def render_size(sizes):
+    """Rozmiar renderu, z którego da się zmniejszyć wszystkie warianty"""
+    return max(w for w, _ in sizes), max(h for _, h in sizes)
+
+
+def save_image_set(pixels, output_path, sizes, fmt=None, quality=DEFAULT_IMAGE_QUALITY,
+                   primary_size=None):
+    """
+    Zapisuje warianty jednego renderu: dla każdego rozmiaru WebP oraz format
+    zapasowy (z fmt albo rozszerzenia output_path: PNG lub JPEG; dla WebP - PNG)
+    jako <nazwa>_<szer>x<wys>.<rozszerzenie>. Pod output_path trafia wariant
+    w rozmiarze podstawowym w formacie zgodnym z rozszerzeniem ścieżki (WebP dla
+    .webp, inaczej zapasowy), a obok manifest <nazwa>.srcset.json dla warstwy WWW.
+    Zwraca słownik manifestu.
+    """
+    from PIL import Image
+
+    img = pixels if isinstance(pixels, Image.Image) else Image.fromarray(pixels)
+    fallback = image_format(output_path, fmt)
+    if fallback == 'WEBP':
+        fallback = 'PNG'
+    # Bajty pod output_path zawsze w formacie jego rozszerzenia
+    extension_format = IMAGE_FORMATS.get(os.path.splitext(output_path)[1].lower())
+    primary_format = extension_format or fallback
+    if primary_format not in ('WEBP', fallback):
+        raise ValueError(f"Output path {os.path.basename(output_path)} does not match image format "
+                         f"{fallback}")
+    primary_size = tuple(primary_size or sizes[0])
+
+    root = os.path.splitext(output_path)[0]
+    name = os.path.basename(root)
+    images = []
+    srcsets = {'WEBP': [], fallback: []}
+
+    for size in sorted(set(map(tuple, sizes)) | {primary_size}):
+        # Zmniejszenie z zachowaniem proporcji renderu (obraz mieści się w rozmiarze)
+        variant = img
+        if img.size != size:
+            variant = img.copy()
+            variant.thumbnail(size, Image.Resampling.LANCZOS)
+
+        for variant_format in ('WEBP', fallback):
+            data = encode_image(variant, variant_format, quality)
+            file_name = f"{name}_{size[0]}x{size[1]}{FORMAT_EXTENSIONS[variant_format]}"
+            atomic_write(os.path.join(os.path.dirname(output_path), file_name), data)
+            if size == primary_size:
+                if variant_format == primary_format:
+                    atomic_write(output_path, data)
+                if variant_format == fallback:
+                    fallback_src = os.path.basename(output_path) if primary_format == fallback else file_name
+
+            srcsets[variant_format].append(f"{file_name} {variant.size[0]}w")
+            images.append({
+                'file': file_name,
+                'type': MIME_TYPES[variant_format],
+                'width': variant.size[0],
+                'height': variant.size[1],
+                'bytes': len(data),
+            })
+
+    # Układ jak w <picture>: <source> z WebP, format zapasowy w <img src/srcset>
+    manifest = {
+        'src': fallback_src,
+        'type': MIME_TYPES[fallback],
+        'width': primary_size[0],
+        'height': primary_size[1],
+        'srcset': ', '.join(srcsets[fallback]),
+        'sources': [{'type': MIME_TYPES['WEBP'], 'srcset': ', '.join(srcsets['WEBP'])}],
+        'images': images,
+    }
+    atomic_write(f"{root}.srcset.json", json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
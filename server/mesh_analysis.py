@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Analiza siatek trójkątów do wyceny CNC
+Objętość ze znakiem, pole powierzchni, prostopadłościan otaczający (AABB),
+środek masy oraz liczba krawędzi brzegowych i nierozmaitościowych - wszystko
+wektorowo w NumPy na siatce indeksowanej (plik pomocniczy .mesh.npz).
+Wynik CLI ma ten sam kształt JSON co create_model_info w freecad-converter.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+from mesh_index import load_indexed_mesh, DEFAULT_WELD_TOLERANCE
+
+# Liczba trójkątów przetwarzanych naraz - tablice pośrednie float64 mieszczą się w cache
+ANALYSIS_CHUNK_FACES = 1 << 14
+
+
+def edge_statistics(faces, vertex_count):
+    """
+    Zlicza krawędzie siatki: (wszystkie unikalne, brzegowe - należące do jednego
+    trójkąta, nierozmaitościowe - należące do więcej niż dwóch trójkątów)
+    """
+    faces = np.asarray(faces)
+    if len(faces) == 0:
+        return 0, 0, 0
+
+    # Klucz krawędzi nieskierowanej: mniejszy_indeks * V + większy_indeks
+    # (min/max na kolumnach w typie indeksów, dopiero klucz w int64)
+    face_count = len(faces)
+    columns = np.ascontiguousarray(faces.T)
+    keys = np.empty(3 * face_count, dtype=np.int64)
+    for corner in range(3):
+        a, b = columns[corner], columns[(corner + 1) % 3]
+        out = keys[corner * face_count:(corner + 1) * face_count]
+        out[:] = np.minimum(a, b)
+        out *= vertex_count
+        out += np.maximum(a, b)
+    keys.sort()
+
+    # Po sortowaniu wystąpienia krawędzi tworzą ciągi równych kluczy
+    same = keys[1:] == keys[:-1]
+    edges = len(keys) - int(np.count_nonzero(same))
+    padded = np.concatenate(([False], same, [False]))
+    boundary = int(np.count_nonzero(~(padded[:-1] | padded[1:])))
+    # Ciąg co najmniej trzech kluczy liczony raz, na swoim początku
+    non_manifold = int(np.count_nonzero(same[1:] & same[:-1] & ~padded[:-3]))
+    return edges, boundary, non_manifold
+
+
+def iter_face_terms(x, y, z, faces, chunk_faces=ANALYSIS_CHUNK_FACES):
+    """
+    Porcje wielkości na trójkąt dla współrzędnych kolumnowych x, y, z (float64):
+    (początek porcji, sześciokrotna objętość czworościanu v0.(e1 x e2),
+    podwojone pole, suma wierzchołków (sx, sy, sz))
+    """
+    for start in range(0, len(faces), chunk_faces):
+        corners = faces[start:start + chunk_faces].T
+        x0, x1, x2 = (x.take(index) for index in corners)
+        y0, y1, y2 = (y.take(index) for index in corners)
+        z0, z1, z2 = (z.take(index) for index in corners)
+
+        # Krawędzie e1 = v1 - v0, e2 = v2 - v0 (w miejscu v1, v2)
+        x1 -= x0; y1 -= y0; z1 -= z0
+        x2 -= x0; y2 -= y0; z2 -= z0
+
+        # n = e1 x e2: |n| to podwojone pole, v0 . n to sześciokrotna objętość czworościanu
+        nx = y1 * z2; nx -= z1 * y2
+        ny = z1 * x2; ny -= x1 * z2
+        nz = x1 * y2; nz -= y1 * x2
+        tetra = x0 * nx; tetra += y0 * ny; tetra += z0 * nz
+        twice_area = nx * nx; twice_area += ny * ny; twice_area += nz * nz
+        np.sqrt(twice_area, out=twice_area)
+
+        # Suma wierzchołków trójkąta v0 + v1 + v2 = 3 v0 + e1 + e2
+        sx = x1 + x2; sx += 3 * x0
+        sy = y1 + y2; sy += 3 * y0
+        sz = z1 + z2; sz += 3 * z0
+
+        yield start, tetra, twice_area, (sx, sy, sz)
+
+
+def mass_properties(vertices, faces, chunk_faces=ANALYSIS_CHUNK_FACES):
+    """
+    Objętość ze znakiem, pole powierzchni i środek masy bryły ograniczonej siatką.
+    Czworościany liczone są względem środka AABB (mniejsze błędy zaokrągleń);
+    dla siatek bez objętości środek masy to środek ciężkości powierzchni.
+    Zwraca (objętość, pole, środek masy, minimum, maksimum).
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    minimum = np.array([vertices[:, axis].min() for axis in range(3)], dtype=np.float64)
+    maximum = np.array([vertices[:, axis].max() for axis in range(3)], dtype=np.float64)
+    origin = (minimum + maximum) / 2
+    x, y, z = (vertices[:, axis].astype(np.float64) - origin[axis] for axis in range(3))
+
+    volume6 = 0.0
+    area2 = 0.0
+    volume_moment = np.zeros(3)
+    area_moment = np.zeros(3)
+
+    for _, tetra, twice_area, (sx, sy, sz) in iter_face_terms(x, y, z, faces, chunk_faces):
+        volume6 += tetra.sum()
+        area2 += twice_area.sum()
+        volume_moment += (tetra @ sx, tetra @ sy, tetra @ sz)
+        area_moment += (twice_area @ sx, twice_area @ sy, twice_area @ sz)
+
+    volume = volume6 / 6.0
+    area = area2 / 2.0
+
+    # Środek czworościanu to (origin + v0 + v1 + v2) / 4, trójkąta (v0 + v1 + v2) / 3
+    if abs(volume) > 1e-9 * area * float(np.linalg.norm(maximum - minimum)):
+        center_of_mass = origin + volume_moment / (4.0 * volume6)
+    elif area > 0:
+        center_of_mass = origin + area_moment / (3.0 * area2)
+    else:
+        center_of_mass = origin
+
+    return float(volume), float(area), center_of_mass, minimum, maximum
+
+
+def analyze_mesh(vertices, faces):
+    """
+    Pełna analiza siatki indeksowanej. Zwraca słownik w kształcie
+    create_model_info (dimensions, center, volume, area, elements)
+    rozszerzony o sekcję "mesh" ze szczelnością i środkiem masy.
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    if len(faces) == 0:
+        raise ValueError("Mesh contains no triangles")
+
+    signed_volume, area, center_of_mass, minimum, maximum = mass_properties(vertices, faces)
+    edges, boundary_edges, non_manifold_edges = edge_statistics(faces, len(vertices))
+    size = maximum - minimum
+    center = (minimum + maximum) / 2
+
+    return {
+        "dimensions": {
+            "width": float(size[0]),
+            "height": float(size[1]),
+            "depth": float(size[2])
+        },
+        "center": {
+            "x": float(center[0]),
+            "y": float(center[1]),
+            "z": float(center[2])
+        },
+        "volume": abs(signed_volume),
+        "area": area,
+        "elements": {
+            "faces": int(len(faces)),
+            "edges": int(edges),
+            "vertices": int(len(vertices))
+        },
+        "mesh": {
+            "signed_volume": signed_volume,
+            "center_of_mass": {
+                "x": float(center_of_mass[0]),
+                "y": float(center_of_mass[1]),
+                "z": float(center_of_mass[2])
+            },
+            "boundary_edges": boundary_edges,
+            "non_manifold_edges": non_manifold_edges,
+            "watertight": boundary_edges == 0 and non_manifold_edges == 0
+        }
+    }
+
+
+def analyze_stl_file(file_path, tolerance=DEFAULT_WELD_TOLERANCE):
+    """Analiza pliku STL (siatka indeksowana z pliku pomocniczego lub zbudowana)"""
+    vertices, faces = load_indexed_mesh(file_path, tolerance)
+    return analyze_mesh(vertices, faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze STL mesh: volume, area, bounds, watertightness')
+    parser.add_argument('input', help='Input STL file path')
+    parser.add_argument('--output', help='Write JSON to this file instead of stdout')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_WELD_TOLERANCE,
+                        help='Vertex weld tolerance')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        model_info = analyze_stl_file(args.input, args.tolerance)
+    except Exception as e:
+        print(f"Error analyzing mesh: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(model_info, f, indent=2)
+        print(f"Model information saved to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(model_info, indent=2))
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Podział siatki na rozłączne powłoki (spójne składowe)
+Wielobryłowe eksporty STL (np. płyta i luźne śruby) rozdzielane są wektorowym
+union-find na siatce indeksowanej (plik pomocniczy .mesh.npz). Dla każdej
+powłoki liczone są trójkąty, wymiary, objętość i pole; powłoki można zapisać
+jako osobne pliki STL. Nie wymaga FreeCAD.
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+from mesh_index import load_indexed_mesh, DEFAULT_WELD_TOLERANCE
+from mesh_analysis import iter_face_terms
+from stl_mesh import write_stl_binary
+
+
+def component_labels(faces, vertex_count):
+    """
+    Etykiety spójnych składowych wierzchołków: (etykiety (V,) 0..k-1, k).
+    Union-find równolegle na wszystkich krawędziach: korzeń o większym indeksie
+    podpinany jest pod mniejszy (minimum.at), potem pełne skracanie ścieżek.
+    Krawędzie, których końce mają już wspólny korzeń, odpadają z kolejnych
+    rund, więc praca maleje z każdą rundą. Wierzchołki bez ścian to osobne składowe.
+    """
+    parent = np.arange(vertex_count, dtype=np.intp)
+    faces = np.asarray(faces)
+    if len(faces) and vertex_count:
+        # Krawędzie v0-v1 i v1-v2 wystarczą do połączenia trójkąta
+        first = np.concatenate([faces[:, 0], faces[:, 1]]).astype(np.intp)
+        second = np.concatenate([faces[:, 1], faces[:, 2]]).astype(np.intp)
+
+        while len(first):
+            root_first, root_second = parent[first], parent[second]
+            pending = root_first != root_second
+            if not pending.any():
+                break
+            first, second = first[pending], second[pending]
+            root_first, root_second = root_first[pending], root_second[pending]
+
+            np.minimum.at(parent, np.maximum(root_first, root_second),
+                          np.minimum(root_first, root_second))
+
+            # Skracanie ścieżek: każdy wierzchołek wskazuje wprost na korzeń
+            while True:
+                grandparent = parent[parent]
+                if np.array_equal(grandparent, parent):
+                    break
+                parent = grandparent
+
+    roots = parent == np.arange(vertex_count)
+    compact = np.cumsum(roots) - 1
+    return compact[parent], int(np.count_nonzero(roots))
+
+
+def split_components(vertices, faces):
+    """
+    Statystyki powłok siatki indeksowanej, od największej objętości.
+    Zwraca (etykiety powłok trójkątów (F,), lista słowników powłok); etykieta
+    trójkąta to pozycja powłoki na liście.
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces)
+    if len(faces) == 0:
+        raise ValueError("Mesh contains no triangles")
+
+    # Wierzchołki bez ścian nie tworzą powłok - etykiety tylko z trójkątów
+    vertex_labels, _ = component_labels(faces, len(vertices))
+    _, face_labels = np.unique(vertex_labels[faces[:, 0]], return_inverse=True)
+    face_labels = face_labels.ravel()
+    count = int(face_labels.max()) + 1
+
+    triangles = np.bincount(face_labels, minlength=count)
+
+    # Granice z wierzchołków należących do ścian
+    used_labels = np.full(len(vertices), -1, dtype=np.intp)
+    used_labels[faces[:, 0]] = face_labels
+    used_labels[faces[:, 1]] = face_labels
+    used_labels[faces[:, 2]] = face_labels
+    used = used_labels >= 0
+    points = np.asarray(vertices[used], dtype=np.float64)
+    point_labels = used_labels[used]
+    minimum = np.full((count, 3), np.inf)
+    maximum = np.full((count, 3), -np.inf)
+    np.minimum.at(minimum, point_labels, points)
+    np.maximum.at(maximum, point_labels, points)
+    vertex_counts = np.bincount(point_labels, minlength=count)
+
+    # Objętość i pole względem środka AABB całej siatki (mniejsze błędy zaokrągleń)
+    origin = (points.min(axis=0) + points.max(axis=0)) / 2
+    x, y, z = (vertices[:, axis].astype(np.float64) - origin[axis] for axis in range(3))
+    volume6 = np.zeros(count)
+    area2 = np.zeros(count)
+    for start, tetra, twice_area, _ in iter_face_terms(x, y, z, faces):
+        labels = face_labels[start:start + len(tetra)]
+        volume6 += np.bincount(labels, weights=tetra, minlength=count)
+        area2 += np.bincount(labels, weights=twice_area, minlength=count)
+
+    # Kolejność od największej objętości (zwykle część główna), potem liczby trójkątów
+    volume = volume6 / 6.0
+    order = np.lexsort((-triangles, -np.abs(volume)))
+    rank = np.empty(count, dtype=np.intp)
+    rank[order] = np.arange(count)
+
+    shells = []
+    for index in order:
+        size = maximum[index] - minimum[index]
+        center = (minimum[index] + maximum[index]) / 2
+        shells.append({
+            "triangles": int(triangles[index]),
+            "vertices": int(vertex_counts[index]),
+            "dimensions": {
+                "width": float(size[0]),
+                "height": float(size[1]),
+                "depth": float(size[2])
+            },
+            "center": {
+                "x": float(center[0]),
+                "y": float(center[1]),
+                "z": float(center[2])
+            },
+            "min": minimum[index].tolist(),
+            "max": maximum[index].tolist(),
+            "volume": float(abs(volume[index])),
+            "signed_volume": float(volume[index]),
+            "area": float(area2[index] / 2.0)
+        })
+
+    return rank[face_labels], shells
+
+
+def write_shells(vertices, faces, face_labels, output_dir, name):
+    """Zapisuje każdą powłokę jako <name>_shell<NNN>.stl; zwraca listę nazw plików"""
+    os.makedirs(output_dir, exist_ok=True)
+    order = np.argsort(face_labels, kind='stable')
+    bounds = np.searchsorted(face_labels[order], np.arange(int(face_labels.max()) + 2))
+
+    file_names = []
+    for index in range(len(bounds) - 1):
+        shell_faces = faces[order[bounds[index]:bounds[index + 1]]]
+        file_name = f"{name}_shell{index + 1:03d}.stl"
+        write_stl_binary(os.path.join(output_dir, file_name), vertices[shell_faces])
+        file_names.append(file_name)
+    return file_names
+
+
+def analyze_components(file_path, tolerance=DEFAULT_WELD_TOLERANCE, output_dir=None):
+    """Powłoki pliku STL; z output_dir zapisuje je też jako osobne pliki STL"""
+    vertices, faces = load_indexed_mesh(file_path, tolerance)
+    face_labels, shells = split_components(vertices, faces)
+
+    if output_dir:
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        for shell, file_name in zip(shells, write_shells(vertices, faces, face_labels, output_dir, name)):
+            shell["file"] = file_name
+
+    return {
+        "shells": len(shells),
+        "triangles": int(len(faces)),
+        "parts": shells
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Split STL mesh into disconnected shells with per-shell statistics')
+    parser.add_argument('input', help='Input STL file path')
+    parser.add_argument('--output', help='Write JSON to this file instead of stdout')
+    parser.add_argument('--output-dir', help='Write each shell as a separate STL file into this directory')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_WELD_TOLERANCE,
+                        help='Vertex weld tolerance')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        info = analyze_components(args.input, args.tolerance, args.output_dir)
+    except Exception as e:
+        print(f"Error splitting mesh: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(info, f, indent=2)
+        print(f"Shell information saved to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(info, indent=2))
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
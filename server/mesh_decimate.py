@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Upraszczanie siatek trójkątów metodą klasteryzacji wierzchołków
+Redukuje liczbę trójkątów do zadanego budżetu przed renderowaniem i eksportem
+"""
+
+import numpy as np
+
+from stl_mesh import iter_stl_chunks, compute_stl_stats, DEFAULT_CHUNK_TRIANGLES
+
+# Maksymalna liczba przebiegów dopasowujących rozdzielczość siatki klastrów
+MAX_DECIMATION_PASSES = 6
+
+# Domyślny budżet trójkątów dla miniaturek - powyżej niego czas renderowania
+# rośnie, a obraz 300x300 nie zyskuje szczegółów
+DEFAULT_MAX_TRIANGLES = 1_000_000
+
+# Wynik z co najmniej takim wypełnieniem budżetu kończy dopasowywanie
+MIN_BUDGET_FILL = 0.5
+
+# Do tej liczby komórek klastry numerowane są tablicą zajętości zamiast sortowania
+DENSE_GRID_CELLS = 1 << 22
+
+# Zapas przy szacowaniu rozdzielczości, żeby zwykle trafić w budżet za pierwszym razem
+BUDGET_SAFETY = 0.9
+
+
+def _unique_rows(rows):
+    """Indeksy pierwszych wystąpień unikalnych wierszy tablicy int (N,K)"""
+    rows = np.ascontiguousarray(rows)
+    keys = rows.view(np.dtype((np.void, rows.dtype.itemsize * rows.shape[1]))).ravel()
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def spread_faces(faces, max_triangles):
+    """Równomiernie rozłożona próbka max_triangles trójkątów - z całej siatki, a nie jej początek"""
+    if len(faces) <= max_triangles:
+        return faces
+    return faces[np.linspace(0, len(faces) - 1, max_triangles).astype(np.int64)]
+
+
+def cluster_vertices(vertices, faces, cell_size):
+    """
+    Łączy wszystkie wierzchołki w obrębie sześciennej komórki o boku cell_size
+    w jeden wierzchołek (średnia pozycja). Zwraca (vertices, faces) bez trójkątów
+    zdegenerowanych i zdublowanych.
+    """
+    points = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+
+    # Numer komórki na każdej osi osobno (redukcje po kolumnach są szybsze niż axis=0)
+    cells = [np.floor((points[:, axis] - points[:, axis].min()) / cell_size).astype(np.int64)
+             for axis in range(3)]
+    dims = [int(column.max()) + 1 for column in cells]
+
+    # Jeden klucz int64 na komórkę (siatka ma co najwyżej ~2^21 komórek na oś)
+    key = (cells[0] * dims[1] + cells[1]) * dims[2] + cells[2]
+    del cells
+
+    if dims[0] * dims[1] * dims[2] <= DENSE_GRID_CELLS:
+        # Gęsta tablica zajętości zamiast sortowania kluczy
+        occupied = np.zeros(dims[0] * dims[1] * dims[2], dtype=bool)
+        occupied[key] = True
+        cluster_of_cell = np.cumsum(occupied, dtype=np.int64) - 1
+        cluster = cluster_of_cell[key]
+    else:
+        _, cluster = np.unique(key, return_inverse=True)
+        cluster = cluster.ravel()
+
+    counts = np.bincount(cluster)
+    new_vertices = np.column_stack([
+        np.bincount(cluster, weights=points[:, axis]) / counts for axis in range(3)
+    ]).astype(np.float32)
+
+    new_faces = cluster[faces]
+    keep = (new_faces[:, 0] != new_faces[:, 1]) & (new_faces[:, 1] != new_faces[:, 2]) & \
+        (new_faces[:, 0] != new_faces[:, 2])
+    new_faces = new_faces[keep]
+
+    # Trójkąty o tym samym zbiorze wierzchołków (np. zapadnięte cienkie ścianki)
+    if len(new_faces):
+        new_faces = new_faces[_unique_rows(np.sort(new_faces, axis=1))]
+
+    # Tylko wierzchołki używane przez pozostałe trójkąty
+    used, remap = np.unique(new_faces, return_inverse=True)
+    return new_vertices[used], remap.reshape(-1, 3).astype(np.uint32)
+
+
+def decimate_mesh(vertices, faces, max_triangles):
+    """
+    Upraszcza siatkę do co najwyżej max_triangles trójkątów. Działa zarówno
+    na siatce indeksowanej, jak i na "zupie" trójkątów (wtedy ją przy okazji spawa).
+    Zwraca (vertices, faces); siatki mieszczące się w budżecie zwracane są bez zmian.
+    """
+    faces = np.asarray(faces)
+    if max_triangles is None or len(faces) <= max_triangles:
+        return vertices, faces
+
+    points = np.asarray(vertices, dtype=np.float64)
+    triangles = points[faces]
+    area = 0.5 * np.linalg.norm(
+        np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0]), axis=1).sum()
+    del triangles
+    if area <= 0:
+        return vertices, spread_faces(faces, max_triangles)
+
+    # Siatka klastrów o oczku c daje około 3 * pole / c^2 trójkątów (dla powierzchni
+    # gładkich); kolejne przebiegi korygują oczko proporcjonalnie do błędu liczby trójkątów
+    target = max_triangles * BUDGET_SAFETY
+    cell_size = np.sqrt(3 * area / target)
+    best = None
+
+    for _ in range(MAX_DECIMATION_PASSES):
+        result = cluster_vertices(points, faces, cell_size)
+        count = len(result[1])
+        if count <= max_triangles:
+            if best is None or count > len(best[1]):
+                best = result
+            # Płaskie modele CAD mają mniej trójkątów niż szacunek - zagęść siatkę klastrów
+            if count >= max_triangles * MIN_BUDGET_FILL:
+                break
+        cell_size *= np.clip(np.sqrt(max(count, 1) / target), 0.25, 4.0)
+
+    if best is not None:
+        return best
+
+    # Coraz zgrubniejsza siatka klastrów aż do budżetu - kończy się najpóźniej, gdy
+    # komórka obejmie cały model; przycinanie listy trójkątów ucięłoby całe fragmenty modelu
+    previous = (vertices, faces)
+    while True:
+        cell_size *= 2
+        result = cluster_vertices(points, faces, cell_size)
+        if len(result[1]) <= max_triangles:
+            break
+        previous = result
+
+    # Zgrubienie zapadło model (np. cienki pas) - równomierna próbka poprzedniej siatki
+    if len(result[1]) == 0:
+        return previous[0], spread_faces(previous[1], max_triangles)
+    return result
+
+
+def decimate_stl_file(file_path, max_triangles, stats=None, chunk_triangles=DEFAULT_CHUNK_TRIANGLES):
+    """
+    Upraszcza binarny STL porcjami z mapy pamięci, bez wczytywania całej siatki.
+    Oczko klastrów wynika z pola powierzchni, więc wystarcza jeden przebieg po pliku;
+    zużycie pamięci zależy od budżetu, a nie od rozmiaru pliku. Zwraca (vertices, faces).
+    """
+    if stats is None:
+        stats = compute_stl_stats(file_path, chunk_triangles)
+
+    origin = np.array(stats['min'], dtype=np.float64)
+    extent = np.array(stats['max'], dtype=np.float64) - origin
+    cell_size = np.sqrt(3 * stats['surface_area'] / (max_triangles * BUDGET_SAFETY))
+    if not cell_size > 0:
+        cell_size = max(float(extent.max()), 1.0)
+    dims = (np.floor(extent / cell_size).astype(np.int64) + 1).tolist()
+
+    cell_keys, cell_sums, cell_counts, face_keys = [], [], [], []
+    for chunk in iter_stl_chunks(file_path, chunk_triangles):
+        points = chunk.reshape(-1, 3)
+        cells = [np.minimum(np.floor((points[:, axis] - origin[axis]) / cell_size).astype(np.int64),
+                            dims[axis] - 1) for axis in range(3)]
+        key = (cells[0] * dims[1] + cells[1]) * dims[2] + cells[2]
+
+        # Sumy pozycji w komórkach tej porcji; średnie liczone po zebraniu wszystkich porcji
+        unique_key, inverse = np.unique(key, return_inverse=True)
+        inverse = inverse.ravel()
+        cell_keys.append(unique_key)
+        cell_counts.append(np.bincount(inverse))
+        cell_sums.append(np.column_stack([
+            np.bincount(inverse, weights=points[:, axis]) for axis in range(3)
+        ]))
+
+        triangle = np.sort(key.reshape(-1, 3), axis=1)
+        triangle = triangle[(triangle[:, 0] != triangle[:, 1]) & (triangle[:, 1] != triangle[:, 2])]
+        if len(triangle):
+            face_keys.append(triangle[_unique_rows(triangle)])
+
+    if not face_keys:
+        return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.uint32)
+
+    all_keys, inverse = np.unique(np.concatenate(cell_keys), return_inverse=True)
+    inverse = inverse.ravel()
+    counts = np.bincount(inverse, weights=np.concatenate(cell_counts))
+    sums = np.concatenate(cell_sums)
+    vertices = np.column_stack([
+        np.bincount(inverse, weights=sums[:, axis]) / counts for axis in range(3)
+    ]).astype(np.float32)
+
+    faces = np.concatenate(face_keys)
+    faces = faces[_unique_rows(faces)]
+    used, remap = np.unique(np.searchsorted(all_keys, faces), return_inverse=True)
+    vertices, faces = vertices[used], remap.reshape(-1, 3).astype(np.uint32)
+
+    # Szacunek z pola powierzchni bywa za niski dla mocno pofałdowanych powierzchni
+    return decimate_mesh(vertices, faces, max_triangles)
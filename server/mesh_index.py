@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Budowanie indeksowanej (zespawanej) siatki z trójkątów STL
+Wynik zapisywany jest obok pliku źródłowego jako nieskompresowany plik .npz,
+który można zmapować do pamięci zamiast ponownie parsować STL
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import zipfile
+import numpy as np
+
+from stl_mesh import read_stl
+from artifact_cache import artifact_key, converter_version, get_artifact, put_artifact
+
+# Domyślna tolerancja spawania wierzchołków - oczko siatki kwantyzacji (w jednostkach modelu, zwykle mm)
+DEFAULT_WELD_TOLERANCE = 1e-5
+
+# Rozszerzenie pliku pomocniczego zapisywanego obok przesłanego STL
+MESH_SIDECAR_SUFFIX = '.mesh.npz'
+
+# Wersja formatu pliku pomocniczego - zmiana unieważnia stare pliki
+MESH_SIDECAR_VERSION = 1
+
+# Tolerancja teselacji kształtów STEP (mm)
+STEP_TESSELLATION_TOLERANCE = 0.1
+
+# Rozmiar lokalnego nagłówka pliku w archiwum ZIP (bez nazwy i pola extra)
+_ZIP_LOCAL_HEADER_SIZE = 30
+
+
+def weld_vertices(triangles, tolerance=DEFAULT_WELD_TOLERANCE):
+    """
+    Łączy wierzchołki przez kwantyzację do siatki o oczku równym tolerancji:
+    scalane są punkty zaokrąglone do tego samego węzła. To nie jest spawanie
+    w promieniu tolerancji - dwa punkty bliższe niż tolerancja, ale po różnych
+    stronach granicy oczka, zostają osobno (STL powtarza wspólne wierzchołki
+    bit w bit, więc w praktyce scala to całą siatkę).
+    Zwraca (vertices (V,3) float32, faces (F,3) uint32); trójkąty zdegenerowane
+    przez spawanie są usuwane.
+    """
+    points = np.asarray(triangles, dtype=np.float32).reshape(-1, 3)
+    if len(points) == 0:
+        return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.uint32)
+
+    # Klucz wierzchołka: współrzędne zaokrąglone do siatki o oczku równym tolerancji
+    if tolerance > 0:
+        keys = np.floor(points / tolerance + 0.5).astype(np.int64)
+    else:
+        keys = points.copy()
+    keys = np.ascontiguousarray(keys).view(np.dtype((np.void, keys.dtype.itemsize * 3))).ravel()
+
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    vertices = points[first_index]
+    faces = inverse.reshape(-1, 3).astype(np.uint32)
+
+    degenerate = (faces[:, 0] == faces[:, 1]) | (faces[:, 1] == faces[:, 2]) | (faces[:, 0] == faces[:, 2])
+    if degenerate.any():
+        faces = faces[~degenerate]
+
+    return vertices, faces
+
+
+def sidecar_path_for(stl_path):
+    """Ścieżka pliku pomocniczego .npz dla danego pliku STL"""
+    return stl_path + MESH_SIDECAR_SUFFIX
+
+
+def _source_signature(stl_path, tolerance):
+    """Dane identyfikujące plik źródłowy, zapisywane w pliku pomocniczym"""
+    stat = os.stat(stl_path)
+    return np.array([MESH_SIDECAR_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64), \
+        np.array([tolerance], dtype=np.float64)
+
+
+def save_mesh_sidecar(sidecar_path, vertices, faces, signature=None, tolerance=DEFAULT_WELD_TOLERANCE):
+    """Zapisuje atomowo nieskompresowany plik .npz z siatką indeksowaną"""
+    arrays = {'vertices': vertices, 'faces': faces}
+    if signature is not None:
+        arrays['source'] = signature
+        arrays['tolerance'] = np.array([tolerance], dtype=np.float64)
+
+    directory = os.path.dirname(os.path.abspath(sidecar_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, sidecar_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_mesh_sidecar(sidecar_path, mmap=True):
+    """
+    Wczytuje plik .npz z siatką. Przy mmap=True tablice są mapowane
+    bezpośrednio z archiwum (wymaga nieskompresowanych wpisów).
+    """
+    if not mmap:
+        with np.load(sidecar_path) as data:
+            return {name: data[name] for name in data.files}
+
+    arrays = {}
+    with zipfile.ZipFile(sidecar_path) as archive, open(sidecar_path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Sidecar member {info.filename} is compressed")
+
+            # Lokalny nagłówek ZIP może mieć inne pole extra niż katalog centralny
+            f.seek(info.header_offset + 26)
+            name_length = int.from_bytes(f.read(2), 'little')
+            extra_length = int.from_bytes(f.read(2), 'little')
+            f.seek(info.header_offset + _ZIP_LOCAL_HEADER_SIZE + name_length + extra_length)
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+
+            name = info.filename[:-4] if info.filename.endswith('.npy') else info.filename
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(sidecar_path, dtype=dtype, mode='r', offset=f.tell(),
+                                         shape=shape, order='F' if fortran_order else 'C')
+
+    return arrays
+
+
+def _mesh_version():
+    """Wersja budowania siatki dla magazynu artefaktów"""
+    return converter_version('mesh_index.py', 'stl_mesh.py')
+
+
+def load_indexed_mesh(stl_path, tolerance=DEFAULT_WELD_TOLERANCE, use_cache=True):
+    """
+    Zwraca (vertices, faces) dla pliku STL. Jeśli istnieje aktualny plik
+    pomocniczy, siatka jest mapowana z niego; w przeciwnym razie STL jest
+    parsowany, spawany i plik pomocniczy jest zapisywany.
+    """
+    sidecar_path = sidecar_path_for(stl_path)
+    signature, tolerance_array = _source_signature(stl_path, tolerance)
+
+    if use_cache and os.path.exists(sidecar_path):
+        try:
+            cached = load_mesh_sidecar(sidecar_path)
+            if np.array_equal(cached.get('source'), signature) and \
+                    np.array_equal(cached.get('tolerance'), tolerance_array):
+                return cached['vertices'], cached['faces']
+        except Exception as e:
+            print(f"Ignoring unreadable mesh sidecar {sidecar_path}: {e}", file=sys.stderr)
+
+    # Ten sam plik przesłany ponownie (inna ścieżka) - siatka z magazynu artefaktów
+    artifact_key_value = None
+    if use_cache:
+        try:
+            artifact_key_value = artifact_key(stl_path, 'mesh_index.weld', _mesh_version(),
+                                              {'tolerance': tolerance})
+            cached = get_artifact(artifact_key_value, MESH_SIDECAR_SUFFIX)
+            if cached is not None:
+                arrays = load_mesh_sidecar(cached)
+                vertices, faces = np.asarray(arrays['vertices']), np.asarray(arrays['faces'])
+                save_mesh_sidecar(sidecar_path, vertices, faces, signature, tolerance)
+                return vertices, faces
+        except Exception as e:
+            print(f"Ignoring mesh artifact cache: {e}", file=sys.stderr)
+
+    triangles, _ = read_stl(stl_path)
+    vertices, faces = weld_vertices(triangles, tolerance)
+
+    if use_cache:
+        try:
+            save_mesh_sidecar(sidecar_path, vertices, faces, signature, tolerance)
+            if artifact_key_value is not None:
+                put_artifact(artifact_key_value, MESH_SIDECAR_SUFFIX, source_path=sidecar_path)
+        except OSError as e:
+            print(f"Could not write mesh sidecar {sidecar_path}: {e}", file=sys.stderr)
+
+    return vertices, faces
+
+
+def shape_mesh(shape, tolerance=STEP_TESSELLATION_TOLERANCE):
+    """Teselacja kształtu FreeCAD jako siatka indeksowana (vertices (V,3), faces (F,3))"""
+    points, triangles = shape.tessellate(tolerance)
+    vertices = np.array([(p.x, p.y, p.z) for p in points], dtype=np.float64).reshape(-1, 3)
+    return vertices, np.array(triangles, dtype=np.int64).reshape(-1, 3)
+
+
+def load_step_mesh(step_path, tolerance=STEP_TESSELLATION_TOLERANCE):
+    """Siatka indeksowana pliku STEP (wymaga FreeCAD, jak freecad-converter.py)"""
+    import Part
+
+    shape = Part.Shape()
+    shape.read(step_path)
+    return shape_mesh(shape, tolerance)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build indexed mesh sidecar for STL file')
+    parser.add_argument('input', help='Input STL file path')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_WELD_TOLERANCE,
+                        help='Vertex weld tolerance')
+    parser.add_argument('--force', action='store_true', help='Rebuild even if sidecar is up to date')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.force and os.path.exists(sidecar_path_for(args.input)):
+        os.remove(sidecar_path_for(args.input))
+
+    try:
+        vertices, faces = load_indexed_mesh(args.input, args.tolerance)
+    except Exception as e:
+        print(f"Error building indexed mesh: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Indexed mesh: {len(vertices)} vertices, {len(faces)} faces -> {sidecar_path_for(args.input)}")
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Minimalny prostopadłościan zorientowany (OBB) - wymiar surówki do wyceny CNC
+Wierzchołki siatki redukowane są do punktów skrajnych w wielu kierunkach
+(podzbiór wierzchołków otoczki wypukłej). Dla kierunków kandydujących - osie
+PCA, osie układu, normalne największych płaskich ścian i równomierna siatka
+na półsferze z lokalnym doszukaniem - liczony jest prostokąt o minimalnym polu
+na płaskiej otoczce (obracające się suwmiarki). Ostateczne wymiary liczone są
+dokładnie na wszystkich wierzchołkach. Działa dla STL oraz teselacji STEP.
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+from mesh_index import (load_indexed_mesh, load_step_mesh, shape_mesh, DEFAULT_WELD_TOLERANCE,
+                        STEP_TESSELLATION_TOLERANCE)
+
+# Liczba kierunków, w których wybierane są skrajne punkty (wierzchołki otoczki)
+EXTREME_DIRECTIONS = 128
+
+# Liczba kierunków "do góry" sprawdzanych na półsferze przed doszukaniem
+CANDIDATE_DIRECTIONS = 64
+
+# Liczba normalnych płaskich ścian (o największym polu) sprawdzanych jako kierunki
+FACE_NORMAL_CANDIDATES = 24
+
+# Rozdzielczość grupowania normalnych ścian (składowe zaokrąglane do 1/NORMAL_QUANTIZATION)
+NORMAL_QUANTIZATION = 1000
+
+# Liczba ścian w porcji przy grupowaniu normalnych i liczba grup zachowywanych z porcji
+NORMAL_CHUNK_FACES = 1 << 16
+NORMAL_BINS_PER_CHUNK = 64
+
+# Liczba najlepszych kierunków doszukiwanych lokalnie
+REFINE_CANDIDATES = 4
+
+# Kroki kątowe doszukiwania (radiany), od zgrubnego do dokładnego
+REFINE_STEPS = (0.08, 0.04, 0.02, 0.01, 0.005, 0.0025, 0.001)
+
+# Liczba wierzchołków lub ścian przetwarzanych naraz
+POINT_CHUNK = 1 << 14
+
+
+def fibonacci_directions(count, hemisphere=False):
+    """Prawie równomiernie rozłożone wektory jednostkowe na sferze (lub półsferze z>=0)"""
+    index = np.arange(count) + 0.5
+    z = 1 - index / count if hemisphere else 1 - 2 * index / count
+    radius = np.sqrt(np.maximum(0.0, 1 - z * z))
+    angle = np.pi * (3 - np.sqrt(5)) * index
+    return np.column_stack([radius * np.cos(angle), radius * np.sin(angle), z])
+
+
+def extreme_points(vertices, directions):
+    """
+    Wierzchołki skrajne w każdym z kierunków - podzbiór wierzchołków otoczki
+    wypukłej, na którym szukany jest kierunek pudełka. Rzutowanie w float32
+    (kierunki x punkty, redukcja wzdłuż ciągłej osi).
+    """
+    directions32 = directions.astype(np.float32)
+    best_max = np.full(len(directions), -np.inf)
+    best_min = np.full(len(directions), np.inf)
+    index_max = np.zeros(len(directions), dtype=np.int64)
+    index_min = np.zeros(len(directions), dtype=np.int64)
+    rows = np.arange(len(directions))
+
+    for start in range(0, len(vertices), POINT_CHUNK):
+        points = np.asarray(vertices[start:start + POINT_CHUNK], dtype=np.float32)
+        projection = directions32 @ points.T
+
+        top = projection.argmax(axis=1)
+        better = projection[rows, top] > best_max
+        best_max[better] = projection[rows, top][better]
+        index_max[better] = start + top[better]
+
+        bottom = projection.argmin(axis=1)
+        better = projection[rows, bottom] < best_min
+        best_min[better] = projection[rows, bottom][better]
+        index_min[better] = start + bottom[better]
+
+    return np.asarray(vertices[np.unique(np.concatenate([index_max, index_min]))], dtype=np.float64)
+
+
+def face_normal_directions(vertices, faces, count=FACE_NORMAL_CANDIDATES):
+    """
+    Normalne płaskich obszarów siatki o największym łącznym polu. Części CNC
+    zwykle leżą w surówce płaską ścianą, więc te kierunki dają dokładne OBB.
+    Z każdej porcji ścian zostaje tylko NORMAL_BINS_PER_CHUNK największych grup.
+    """
+    x, y, z = (np.ascontiguousarray(vertices[:, axis], dtype=np.float32) for axis in range(3))
+    span = 2 * NORMAL_QUANTIZATION + 1
+    keys, areas, sums = [], [], []
+
+    for start in range(0, len(faces), NORMAL_CHUNK_FACES):
+        corners = np.asarray(faces[start:start + NORMAL_CHUNK_FACES]).T
+        x0, x1, x2 = (x.take(index) for index in corners)
+        y0, y1, y2 = (y.take(index) for index in corners)
+        z0, z1, z2 = (z.take(index) for index in corners)
+        x1 -= x0; y1 -= y0; z1 -= z0
+        x2 -= x0; y2 -= y0; z2 -= z0
+
+        # Normalna n = e1 x e2, |n| to podwojone pole trójkąta
+        normal = np.empty((3, len(x0)), dtype=np.float32)
+        np.multiply(y1, z2, out=normal[0]); normal[0] -= z1 * y2
+        np.multiply(z1, x2, out=normal[1]); normal[1] -= x1 * z2
+        np.multiply(x1, y2, out=normal[2]); normal[2] -= y1 * x2
+        area = np.sqrt(np.einsum('ij,ij->j', normal, normal))
+        keep = area > 0
+        normal, area = normal[:, keep] / area[keep], area[keep]
+
+        # Kierunek bez zwrotu: n i -n to ta sama płaszczyzna
+        flip = (normal[2] < 0) | ((normal[2] == 0) & (normal[1] < 0))
+        normal[:, flip] *= -1
+
+        quantized = np.rint(normal * NORMAL_QUANTIZATION).astype(np.int64) + NORMAL_QUANTIZATION
+        key = (quantized[0] * span + quantized[1]) * span + quantized[2]
+        unique_key, inverse = np.unique(key, return_inverse=True)
+        inverse = inverse.ravel()
+        bin_area = np.bincount(inverse, weights=area)
+        bin_sum = np.vstack([np.bincount(inverse, weights=normal[axis] * area) for axis in range(3)])
+
+        top = np.argsort(-bin_area)[:NORMAL_BINS_PER_CHUNK]
+        keys.append(unique_key[top])
+        areas.append(bin_area[top])
+        sums.append(bin_sum[:, top])
+
+    if not keys:
+        return np.empty((0, 3))
+
+    all_keys, inverse = np.unique(np.concatenate(keys), return_inverse=True)
+    inverse = inverse.ravel()
+    total_area = np.bincount(inverse, weights=np.concatenate(areas))
+    stacked = np.hstack(sums)
+    total_normal = np.column_stack([np.bincount(inverse, weights=stacked[axis]) for axis in range(3)])
+
+    best = np.argsort(-total_area)[:count]
+    directions = total_normal[best]
+    return directions / np.linalg.norm(directions, axis=1)[:, None]
+
+
+def convex_hull_2d(points):
+    """Otoczka wypukła punktów 2D (łańcuch monotoniczny), wierzchołki przeciwnie do wskazówek zegara"""
+    points = np.unique(points, axis=0)
+    if len(points) < 3:
+        return points
+
+    def half(sequence):
+        chain = []
+        for p in sequence:
+            while len(chain) >= 2 and (chain[-1][0] - chain[-2][0]) * (p[1] - chain[-2][1]) - \
+                    (chain[-1][1] - chain[-2][1]) * (p[0] - chain[-2][0]) <= 0:
+                chain.pop()
+            chain.append(p)
+        return chain
+
+    ordered = points.tolist()
+    lower = half(ordered)
+    upper = half(reversed(ordered))
+    return np.array(lower[:-1] + upper[:-1])
+
+
+def min_area_rectangle(points):
+    """
+    Prostokąt o minimalnym polu zawierający punkty 2D. Jeden bok prostokąta
+    leży na krawędzi otoczki - sprawdzane są wszystkie krawędzie naraz.
+    Zwraca (pole, jednostkowy kierunek pierwszego boku).
+    """
+    hull = convex_hull_2d(points)
+    if len(hull) < 3:
+        return 0.0, np.array([1.0, 0.0])
+
+    edges = np.roll(hull, -1, axis=0) - hull
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    edges = edges[lengths > 0] / lengths[lengths > 0, None]
+    normals = np.column_stack([-edges[:, 1], edges[:, 0]])
+
+    along = hull @ edges.T
+    across = hull @ normals.T
+    areas = (along.max(axis=0) - along.min(axis=0)) * (across.max(axis=0) - across.min(axis=0))
+    best = int(areas.argmin())
+    return float(areas[best]), edges[best]
+
+
+def _plane_basis(direction):
+    """Dwa wektory jednostkowe prostopadłe do kierunku i do siebie"""
+    helper = np.array([1.0, 0.0, 0.0]) if abs(direction[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    first = np.cross(direction, helper)
+    first /= np.linalg.norm(first)
+    return first, np.cross(direction, first)
+
+
+def box_for_direction(points, direction):
+    """
+    Najmniejszy prostopadłościan z jedną osią wzdłuż direction.
+    Zwraca (objętość, osie 3x3 w wierszach).
+    """
+    direction = direction / np.linalg.norm(direction)
+    first, second = _plane_basis(direction)
+    flat = points @ np.column_stack([first, second])
+    area, edge = min_area_rectangle(flat)
+    height = points @ direction
+    axis_a = edge[0] * first + edge[1] * second
+    axis_b = np.cross(direction, axis_a)
+    return area * float(height.max() - height.min()), np.vstack([axis_a, axis_b, direction])
+
+
+def _refine_direction(points, direction, volume, axes):
+    """Lokalne doszukanie kierunku: małe obroty wokół dwóch osi prostopadłych"""
+    offsets = [(1, 0), (-1, 0), (0, 1), (0, -1), (0.7071, 0.7071), (-0.7071, 0.7071),
+               (0.7071, -0.7071), (-0.7071, -0.7071)]
+    for step in REFINE_STEPS:
+        improved = True
+        while improved:
+            improved = False
+            first, second = _plane_basis(direction)
+            for a, b in offsets:
+                candidate = direction + step * (a * first + b * second)
+                candidate_volume, candidate_axes = box_for_direction(points, candidate)
+                if candidate_volume < volume * (1 - 1e-12):
+                    direction = candidate / np.linalg.norm(candidate)
+                    volume, axes = candidate_volume, candidate_axes
+                    improved = True
+                    break
+    return volume, axes
+
+
+def box_extents(vertices, axes):
+    """Dokładne granice wszystkich wierzchołków w układzie osi (wiersze axes)"""
+    minimum = np.full(3, np.inf)
+    maximum = np.full(3, -np.inf)
+    for start in range(0, len(vertices), POINT_CHUNK):
+        projection = axes @ np.asarray(vertices[start:start + POINT_CHUNK], dtype=np.float64).T
+        np.minimum(minimum, projection.min(axis=1), out=minimum)
+        np.maximum(maximum, projection.max(axis=1), out=maximum)
+    return minimum, maximum
+
+
+def minimum_bounding_box(vertices, faces=None):
+    """
+    Minimalny prostopadłościan zorientowany dla wierzchołków (V,3); faces (F,3)
+    dodaje kierunki normalnych płaskich ścian. Zwraca słownik: axes (wiersze -
+    osie pudełka, od najdłuższego wymiaru), size, center, volume oraz AABB
+    (aabb_min, aabb_max).
+    """
+    vertices = np.asarray(vertices)
+    if len(vertices) == 0:
+        raise ValueError("Mesh contains no vertices")
+
+    hull_points = extreme_points(vertices, fibonacci_directions(EXTREME_DIRECTIONS))
+    aabb_min = np.array([vertices[:, axis].min() for axis in range(3)], dtype=np.float64)
+    aabb_max = np.array([vertices[:, axis].max() for axis in range(3)], dtype=np.float64)
+    hull_points -= (aabb_min + aabb_max) / 2
+
+    # Kandydaci: osie PCA otoczki, osie układu, normalne ścian i półsfera kierunków
+    _, eigenvectors = np.linalg.eigh(np.cov(hull_points.T))
+    candidates = [eigenvectors.T, np.eye(3), fibonacci_directions(CANDIDATE_DIRECTIONS, True)]
+    if faces is not None and len(faces):
+        candidates.append(face_normal_directions(vertices, np.asarray(faces)))
+    evaluated = sorted((box_for_direction(hull_points, direction) + (direction,)
+                        for direction in np.vstack(candidates)), key=lambda item: item[0])
+
+    volume, axes = evaluated[0][0], evaluated[0][1]
+    for candidate_volume, candidate_axes, direction in evaluated[:REFINE_CANDIDATES]:
+        refined_volume, refined_axes = _refine_direction(hull_points, direction, candidate_volume,
+                                                         candidate_axes)
+        if refined_volume < volume:
+            volume, axes = refined_volume, refined_axes
+
+    # AABB wygrywa, jeśli nie jest gorszy (model już wyrównany - osie bez szumu numerycznego)
+    minimum, maximum = box_extents(vertices, axes)
+    if (aabb_max - aabb_min).prod() <= (maximum - minimum).prod():
+        axes, minimum, maximum = np.eye(3), aabb_min, aabb_max
+
+    # Osie od najdłuższego wymiaru, układ prawoskrętny (zmiana znaku odwraca granice)
+    order = np.argsort(minimum - maximum)
+    axes, minimum, maximum = axes[order], minimum[order], maximum[order]
+    if np.dot(np.cross(axes[0], axes[1]), axes[2]) < 0:
+        axes[2] = -axes[2]
+        minimum[2], maximum[2] = -maximum[2], -minimum[2]
+    size = maximum - minimum
+
+    return {
+        'axes': axes,
+        'size': size,
+        'center': axes.T @ ((minimum + maximum) / 2),
+        'volume': float(size.prod()),
+        'aabb_min': aabb_min,
+        'aabb_max': aabb_max,
+    }
+
+
+def stl_bounding_box(file_path, tolerance=DEFAULT_WELD_TOLERANCE):
+    """OBB pliku STL (siatka indeksowana z pliku pomocniczego lub zbudowana)"""
+    vertices, faces = load_indexed_mesh(file_path, tolerance)
+    return minimum_bounding_box(vertices, faces)
+
+
+def shape_bounding_box(shape, tolerance=STEP_TESSELLATION_TOLERANCE):
+    """OBB kształtu FreeCAD (np. wczytanego przez freecad-converter.py)"""
+    return minimum_bounding_box(*shape_mesh(shape, tolerance))
+
+
+def step_bounding_box(file_path, tolerance=STEP_TESSELLATION_TOLERANCE):
+    """OBB pliku STEP (wymaga FreeCAD, jak freecad-converter.py)"""
+    return minimum_bounding_box(*load_step_mesh(file_path, tolerance))
+
+
+def box_info(box):
+    """Opis prostopadłościanu w JSON (wymiary jak w create_model_info)"""
+    size, center = box['size'], box['center']
+    aabb_size = box['aabb_max'] - box['aabb_min']
+    return {
+        "dimensions": {
+            "width": float(size[0]),
+            "height": float(size[1]),
+            "depth": float(size[2])
+        },
+        "center": {
+            "x": float(center[0]),
+            "y": float(center[1]),
+            "z": float(center[2])
+        },
+        "volume": box['volume'],
+        # Kolumny macierzy to osie pudełka w układzie modelu: p = rotation @ lokalny + center
+        "rotation": box['axes'].T.tolist(),
+        "aabb": {
+            "width": float(aabb_size[0]),
+            "height": float(aabb_size[1]),
+            "depth": float(aabb_size[2]),
+            "volume": float(aabb_size.prod())
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minimum oriented bounding box (stock size) of STL/STEP model')
+    parser.add_argument('input', help='Input STL or STEP file path')
+    parser.add_argument('--output', help='Write JSON to this file instead of stdout')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help='STEP tessellation tolerance or STL vertex weld tolerance')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if os.path.splitext(args.input)[1].lower() in ('.step', '.stp'):
+            box = step_bounding_box(args.input, args.tolerance or STEP_TESSELLATION_TOLERANCE)
+        else:
+            box = stl_bounding_box(args.input, args.tolerance or DEFAULT_WELD_TOLERANCE)
+        info = box_info(box)
+    except ImportError:
+        print("FreeCAD is required for STEP files", file=sys.stderr)
+        sys.exit(1)
+    except Exception as e:
+        print(f"Error computing bounding box: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(info, f, indent=2)
+        print(f"Bounding box saved to {args.output}", file=sys.stderr)
+    else:
+        print(json.dumps(info, indent=2))
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Programowy rasteryzator siatek trójkątów oparty na NumPy
+Rzutowanie, bufor głębokości, cieniowanie Lamberta i kontury bez OpenGL
+"""
+
+import numpy as np
+
+# Domyślny kolor modelu (jasnoniebieski, jak w rendererach Open3D/VTK)
+DEFAULT_MESH_COLOR = (0.7, 0.8, 1.0)
+DEFAULT_EDGE_COLOR = (0.15, 0.2, 0.35)
+
+# Domyślny widok izometryczny (jak view_init w matplotlib)
+DEFAULT_ELEVATION = 20.0
+DEFAULT_AZIMUTH = 45.0
+
+# Oświetlenie: światło otoczenia + rozproszone
+AMBIENT_LIGHT = 0.35
+DIFFUSE_LIGHT = 0.65
+
+# Margines wokół modelu jako ułamek rozmiaru obrazu
+DEFAULT_MARGIN = 0.05
+
+# Maksymalna łączna powierzchnia (w pikselach) trójkątów w jednej porcji rasteryzacji
+CANDIDATE_BUDGET = 1 << 21
+
+# Powyżej tej liczby trójkątów domyślnie bez nadpróbkowania - gęste siatki
+# mają trójkąty mniejsze od piksela, a czas rośnie z liczbą pikseli
+SUPERSAMPLE_MAX_FACES = 500_000
+
+# Próg przesłonięcia (ułamek głębokości modelu) rysowanego jako krawędź
+EDGE_DEPTH_THRESHOLD = 0.01
+
+# Minimalny kąt między sąsiednimi ścianami rysowany jako ostra krawędź (stopnie)
+EDGE_CREASE_ANGLE = 50.0
+
+
+def view_basis(elevation=DEFAULT_ELEVATION, azimuth=DEFAULT_AZIMUTH):
+    """Zwraca wektory (right, up, forward) kamery; forward wskazuje od modelu do kamery"""
+    elev, azim = np.radians(elevation), np.radians(azimuth)
+    forward = np.array([np.cos(elev) * np.cos(azim), np.cos(elev) * np.sin(azim), np.sin(elev)])
+    right = np.array([-np.sin(azim), np.cos(azim), 0.0])
+    up = np.cross(forward, right)
+    return right, up, forward
+
+
+def project_vertices(vertices, width, height, elevation=DEFAULT_ELEVATION,
+                     azimuth=DEFAULT_AZIMUTH, margin=DEFAULT_MARGIN):
+    """
+    Rzut ortograficzny wierzchołków dopasowany do obrazu.
+    Zwraca (V,3): x i y w pikselach (y w dół) oraz głębokość (większa = bliżej).
+    """
+    right, up, forward = view_basis(elevation, azimuth)
+    points = np.asarray(vertices, dtype=np.float64)
+    view = points @ np.column_stack([right, up, forward])
+
+    lo = view[:, :2].min(axis=0)
+    hi = view[:, :2].max(axis=0)
+    extent = np.maximum(hi - lo, 1e-12)
+    scale = min(width * (1 - 2 * margin) / extent[0], height * (1 - 2 * margin) / extent[1])
+    center = (lo + hi) / 2
+
+    screen = np.empty_like(view)
+    screen[:, 0] = width / 2 + (view[:, 0] - center[0]) * scale
+    screen[:, 1] = height / 2 - (view[:, 1] - center[1]) * scale
+    screen[:, 2] = view[:, 2]
+    return screen
+
+
+def _plane_coefficients(tri):
+    """
+    Współczynniki (a, b, c) funkcji liniowych a*x + b*y + c: trzech współrzędnych
+    barycentrycznych (T,3,3) oraz głębokości (T,3)
+    """
+    x0, y0, z0 = tri[:, 0, 0], tri[:, 0, 1], tri[:, 0, 2]
+    x1, y1, z1 = tri[:, 1, 0], tri[:, 1, 1], tri[:, 1, 2]
+    x2, y2, z2 = tri[:, 2, 0], tri[:, 2, 1], tri[:, 2, 2]
+
+    area = (x1 - x0) * (y2 - y0) - (x2 - x0) * (y1 - y0)
+    inv = 1.0 / area
+
+    w0 = np.stack([(y1 - y2) * inv, (x2 - x1) * inv, (x1 * y2 - x2 * y1) * inv], axis=1)
+    w1 = np.stack([(y2 - y0) * inv, (x0 - x2) * inv, (x2 * y0 - x0 * y2) * inv], axis=1)
+    w2 = -w0 - w1
+    w2[:, 2] += 1.0
+
+    depth = w0 * (z0 - z2)[:, None] + w1 * (z1 - z2)[:, None]
+    depth[:, 2] += z2
+    return np.stack([w0, w1, w2], axis=1), depth
+
+
+def _expand_ranges(starts, counts):
+    """Dla przedziałów [start, start+count) zwraca (indeks przedziału, wartość) każdego elementu"""
+    owner = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, starts[owner] + offsets
+
+
+def rasterize(screen_triangles, width, height):
+    """
+    Rasteryzuje trójkąty (N,3,3) w przestrzeni ekranu z buforem głębokości.
+    Zwraca (indeks trójkąta na piksel (H,W) lub -1, bufor głębokości (H,W)).
+
+    Każdy trójkąt rozbijany jest na wiersze, a dla każdego wiersza zakres
+    pokrytych pikseli liczony jest analitycznie z funkcji krawędzi, więc
+    testowane są tylko piksele faktycznie należące do trójkątów.
+    """
+    tri = np.asarray(screen_triangles, dtype=np.float64)
+    face_buffer = np.full(width * height, -1, dtype=np.int64)
+    depth_buffer = np.full(width * height, -np.inf)
+
+    # Zakres środków pikseli pokrywanych przez prostokąt otaczający trójkąt
+    xs, ys = tri[:, :, 0], tri[:, :, 1]
+    x_lo = np.minimum(np.minimum(xs[:, 0], xs[:, 1]), xs[:, 2])
+    x_hi = np.maximum(np.maximum(xs[:, 0], xs[:, 1]), xs[:, 2])
+    y_lo = np.minimum(np.minimum(ys[:, 0], ys[:, 1]), ys[:, 2])
+    y_hi = np.maximum(np.maximum(ys[:, 0], ys[:, 1]), ys[:, 2])
+    x_min = np.maximum(np.ceil(x_lo - 0.5), 0).astype(np.int64)
+    x_max = np.minimum(np.floor(x_hi - 0.5), width - 1).astype(np.int64)
+    y_min = np.maximum(np.ceil(y_lo - 0.5), 0).astype(np.int64)
+    y_max = np.minimum(np.floor(y_hi - 0.5), height - 1).astype(np.int64)
+
+    area = (tri[:, 1, 0] - tri[:, 0, 0]) * (tri[:, 2, 1] - tri[:, 0, 1]) - \
+        (tri[:, 2, 0] - tri[:, 0, 0]) * (tri[:, 1, 1] - tri[:, 0, 1])
+    visible = np.flatnonzero((x_max >= x_min) & (y_max >= y_min) & (np.abs(area) > 1e-12))
+    if len(visible) == 0:
+        return face_buffer.reshape(height, width), depth_buffer.reshape(height, width)
+
+    # Porcje trójkątów o ograniczonej łącznej powierzchni prostokątów otaczających
+    box_area = (x_max[visible] - x_min[visible] + 1) * (y_max[visible] - y_min[visible] + 1)
+    chunk_ids = np.cumsum(box_area) // CANDIDATE_BUDGET
+    bounds = np.flatnonzero(np.diff(chunk_ids)) + 1
+
+    for faces in np.split(visible, bounds):
+        edges, depth = _plane_coefficients(tri[faces])
+
+        # Wiersze pikseli każdego trójkąta
+        row_owner, row = _expand_ranges(y_min[faces], y_max[faces] - y_min[faces] + 1)
+        cy = row + 0.5
+
+        # Każda funkcja krawędzi a*x + (b*cy + c) >= 0 ogranicza x z jednej strony
+        a = edges[row_owner, :, 0]
+        rest = edges[row_owner, :, 1] * cy[:, None] + edges[row_owner, :, 2]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            limit = -rest / a
+        empty = (a == 0) & (rest < 0)
+        lower = np.where(a > 0, limit, np.where(empty, np.inf, -np.inf))
+        upper = np.where(a < 0, limit, np.where(empty, -np.inf, np.inf))
+        lower = np.maximum(np.maximum(lower[:, 0], lower[:, 1]), lower[:, 2])
+        upper = np.minimum(np.minimum(upper[:, 0], upper[:, 1]), upper[:, 2])
+
+        x_start = np.maximum(np.ceil(lower - 0.5), x_min[faces][row_owner])
+        x_end = np.minimum(np.floor(upper - 0.5), x_max[faces][row_owner])
+        counts = np.maximum(x_end - x_start + 1, 0).astype(np.int64)
+
+        span_owner, px = _expand_ranges(x_start.astype(np.int64), counts)
+        if len(px) == 0:
+            continue
+        local = row_owner[span_owner]
+        py = row[span_owner]
+
+        pixel = py * width + px
+        z = depth[local, 0] * (px + 0.5) + depth[local, 1] * (py + 0.5) + depth[local, 2]
+
+        # Najbliższy trójkąt dla każdego piksela w porcji, potem porównanie z buforem
+        order = np.lexsort((-z, pixel))
+        pixel, z, owner = pixel[order], z[order], faces[local[order]]
+        first = np.ones(len(pixel), dtype=bool)
+        first[1:] = pixel[1:] != pixel[:-1]
+        pixel, z, owner = pixel[first], z[first], owner[first]
+
+        closer = z > depth_buffer[pixel]
+        depth_buffer[pixel[closer]] = z[closer]
+        face_buffer[pixel[closer]] = owner[closer]
+
+    return face_buffer.reshape(height, width), depth_buffer.reshape(height, width)
+
+
+def _edge_mask(face_buffer, depth_buffer, pixel_normals, pixel_gradient):
+    """
+    Piksele konturu: granica z tłem, przesłonięcia (głębokość sąsiada niezgodna
+    z płaszczyzną trójkąta) i ostre krawędzie (duży kąt między normalnymi)
+    """
+    foreground = face_buffer >= 0
+    depth = np.where(foreground, depth_buffer, 0.0)
+    if foreground.any():
+        depth_range = depth_buffer[foreground].max() - depth_buffer[foreground].min()
+    else:
+        depth_range = 0.0
+    threshold = max(depth_range * EDGE_DEPTH_THRESHOLD, 1e-9)
+    crease_cos = np.cos(np.radians(EDGE_CREASE_ANGLE))
+
+    edges = np.zeros_like(foreground)
+    for axis in (0, 1):
+        near = [slice(None), slice(None)]
+        far = [slice(None), slice(None)]
+        near[axis], far[axis] = slice(0, -1), slice(1, None)
+        near, far = tuple(near), tuple(far)
+
+        fg_a, fg_b = foreground[near], foreground[far]
+        z_a, z_b = depth[near], depth[far]
+        # Gradient głębokości wzdłuż osi obrazu: x to kolumny (oś 1), y to wiersze (oś 0)
+        g_a = pixel_gradient[near][..., 1 - axis]
+        g_b = pixel_gradient[far][..., 1 - axis]
+
+        mismatch = np.minimum(np.abs(z_b - (z_a + g_a)), np.abs(z_a - (z_b - g_b)))
+        cosine = np.abs(np.einsum('...i,...i->...', pixel_normals[near], pixel_normals[far]))
+        both = fg_a & fg_b
+        boundary = (fg_a != fg_b) | (both & ((mismatch > threshold) | (cosine < crease_cos)))
+
+        # Krawędź rysowana po stronie bliższej kamery (albo modelu przy granicy z tłem)
+        mark_a = boundary & fg_a & (~fg_b | (z_a >= z_b))
+        mark_b = boundary & fg_b & ~mark_a
+        edges[near] |= mark_a
+        edges[far] |= mark_b
+    return edges
+
+
+def render_mesh(vertices, faces, width=300, height=300, elevation=DEFAULT_ELEVATION,
+                azimuth=DEFAULT_AZIMUTH, background=(1.0, 1.0, 1.0), color=DEFAULT_MESH_COLOR,
+                edges=True, edge_color=DEFAULT_EDGE_COLOR, supersample=None):
+    """
+    Renderuje siatkę (vertices (V,3), faces (F,3)) do tablicy RGB uint8 (H,W,3).
+    supersample > 1 renderuje w wyższej rozdzielczości i uśrednia piksele
+    (domyślnie 2, a dla bardzo gęstych siatek 1).
+    """
+    vertices = np.asarray(vertices)
+    faces = np.asarray(faces, dtype=np.int64)
+    if supersample is None:
+        supersample = 2 if len(faces) <= SUPERSAMPLE_MAX_FACES else 1
+    render_w, render_h = width * supersample, height * supersample
+
+    screen = project_vertices(vertices, render_w, render_h, elevation, azimuth)
+    face_buffer, depth_buffer = rasterize(screen[faces], render_w, render_h)
+
+    # Cieniowanie Lamberta z normalnych widocznych ścian
+    # (dwustronne - normalne STL bywają odwrócone)
+    foreground = face_buffer >= 0
+    shown, shown_index = np.unique(face_buffer[foreground], return_inverse=True)
+    world = np.asarray(vertices, dtype=np.float64)[faces[shown]]
+    normals = np.cross(world[:, 1] - world[:, 0], world[:, 2] - world[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+
+    right, up, forward = view_basis(elevation, azimuth)
+    light = forward + 0.6 * up - 0.3 * right
+    light /= np.linalg.norm(light)
+    intensity = AMBIENT_LIGHT + DIFFUSE_LIGHT * np.abs(normals @ light)
+
+    image = np.empty((render_h, render_w, 3))
+    image[:] = background
+    image[foreground] = intensity[shown_index, None] * np.asarray(color)
+
+    if edges:
+        # Normalne i gradient głębokości (z płaszczyzny trójkąta w pikselach) na piksel
+        _, plane = _plane_coefficients(screen[faces[shown]])
+        pixel_normals = np.zeros((render_h, render_w, 3))
+        pixel_normals[foreground] = normals[shown_index]
+        pixel_gradient = np.zeros((render_h, render_w, 2))
+        pixel_gradient[foreground] = plane[shown_index, :2]
+        image[_edge_mask(face_buffer, depth_buffer, pixel_normals, pixel_gradient)] = edge_color
+
+    if supersample > 1:
+        image = image.reshape(height, supersample, width, supersample, 3).mean(axis=(1, 3))
+
+    return np.clip(image * 255 + 0.5, 0, 255).astype(np.uint8)
+
+
+def parse_color(color):
+    """Zamienia kolor CSS (np. '#f8f9fa') na krotkę RGB w zakresie 0-1"""
+    from PIL import ImageColor
+    return tuple(channel / 255 for channel in ImageColor.getrgb(color)[:3])
+
+
+def save_png(pixels, output_path):
+    """Zapisuje tablicę RGB jako PNG (kodowanie w pamięci i jeden atomowy zapis)"""
+    from image_encode import save_image
+    save_image(pixels, output_path, 'PNG')
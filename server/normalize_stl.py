@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Normalizacja plików STL przy przyjęciu
+Konwertuje ASCII STL do kanonicznego binarnego STL (little-endian), zachowując
+oryginalną nazwę pliku w 80-bajtowym nagłówku
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from stl_mesh import is_ascii_stl, read_stl_ascii, write_stl_binary, STL_HEADER_SIZE
+
+
+def make_stl_header(original_name):
+    """Buduje 80-bajtowy nagłówek z oryginalną nazwą pliku"""
+    return original_name.encode('utf-8')[:STL_HEADER_SIZE]
+
+
+def normalize_stl(input_path, output_path=None, original_name=None):
+    """
+    Konwertuje ASCII STL do binarnego. Bez output_path plik jest zastępowany
+    atomowo w miejscu. Zwraca słownik z raportem konwersji.
+    """
+    output_path = output_path or input_path
+    original_name = original_name or os.path.basename(input_path)
+    bytes_before = os.path.getsize(input_path)
+
+    if not is_ascii_stl(input_path):
+        return {
+            "converted": False,
+            "format": "binary",
+            "bytes_before": bytes_before,
+            "bytes_after": bytes_before,
+            "bytes_saved": 0,
+        }
+
+    triangles, normals = read_stl_ascii(input_path)
+
+    # Zapis do pliku tymczasowego w katalogu docelowym i podmiana jednym rename
+    directory = os.path.dirname(os.path.abspath(output_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        write_stl_binary(tmp_path, triangles, normals, make_stl_header(original_name))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    bytes_after = os.path.getsize(output_path)
+    return {
+        "converted": True,
+        "format": "ascii",
+        "triangles": len(triangles),
+        "bytes_before": bytes_before,
+        "bytes_after": bytes_after,
+        "bytes_saved": bytes_before - bytes_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert ASCII STL to binary STL')
+    parser.add_argument('input', help='Input STL file path')
+    parser.add_argument('output', nargs='?', help='Output STL file path (default: replace input)')
+    parser.add_argument('--original-name', help='Original file name stored in the STL header')
+
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"Input file does not exist: {args.input}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        report = normalize_stl(args.input, args.output, args.original_name)
+    except Exception as e:
+        print(f"Error normalizing STL file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(report))
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
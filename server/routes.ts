@@ -27,7 +27,7 @@ import fs from 'fs'
 import path from 'path'
 import { nanoid } from 'nanoid'
 import os from 'os'
-import { exec } from 'child_process'
+import { exec, execFile } from 'child_process'
 import { fileURLToPath } from 'url'
 import { dirname } from 'path'
 import util from 'util'
@@ -124,8 +124,38 @@ async function hasAccessToModel (
   }
 }
 
+// Pliki pochodne zapisywane obok przesłanego STL: indeks siatki (mesh_index.py),
+// poziomy LOD <nazwa>.lod<N>.glb i ich manifest (generate_lods.py)
+const DERIVED_MODEL_SUFFIXES = ['.mesh.npz', '.lods.json']
+const DERIVED_LOD_PATTERN = /^\.lod\d+\.glb$/
+
+// Usuwa pliki pochodne modelu razem z plikiem źródłowym
+function removeDerivedModelFiles (modelPath: string): void {
+  const directory = path.dirname(modelPath)
+  const name = path.basename(modelPath)
+  let entries: string[]
+  try {
+    entries = fs.readdirSync(directory)
+  } catch (error) {
+    return
+  }
+  for (const entry of entries) {
+    if (!entry.startsWith(name)) continue
+    const suffix = entry.slice(name.length)
+    if (DERIVED_MODEL_SUFFIXES.includes(suffix) || DERIVED_LOD_PATTERN.test(suffix)) {
+      try {
+        fs.unlinkSync(path.join(directory, entry))
+        console.log(`Deleted derived model file: ${entry}`)
+      } catch (error) {
+        console.error(`Error deleting derived model file ${entry}:`, error)
+      }
+    }
+  }
+}
+
 // ES modules compatibility (replacement for __dirname)
 const execPromise = util.promisify(exec)
+const execFilePromise = util.promisify(execFile)
 
 // Funkcja do konwersji pliku DXF do SVG
 async function convertDxfToSvg (dxfFilePath: string): Promise<string | null> {
@@ -186,8 +216,8 @@ async function convertDxfToSvg (dxfFilePath: string): Promise<string | null> {
         // Odczytaj plik SVG
         const svgContent = fs.readFileSync(tempSvgPath, 'utf8')
 
-        // Usuń plik tymczasowy (ale pozostaw go na razie dla debugowania)
-        // try { fs.unlinkSync(tempSvgPath); } catch (e) { /* ignore */ }
+        // Usuń plik tymczasowy - wynik konwersji zostaje w magazynie artefaktów
+        try { fs.unlinkSync(tempSvgPath) } catch (e) { /* ignore */ }
 
         if (svgContent) {
           console.log(
@@ -232,7 +262,7 @@ async function convertDxfToSvg (dxfFilePath: string): Promise<string | null> {
 
           if (fs.existsSync(tempSvgPath)) {
             const svgContent = fs.readFileSync(tempSvgPath, 'utf8')
-            // try { fs.unlinkSync(tempSvgPath); } catch (e) { /* ignore */ }
+            try { fs.unlinkSync(tempSvgPath) } catch (e) { /* ignore */ }
 
             if (svgContent) {
               console.log(
@@ -255,7 +285,7 @@ async function convertDxfToSvg (dxfFilePath: string): Promise<string | null> {
 
               if (fs.existsSync(tempSvgPath)) {
                 const svgContent = fs.readFileSync(tempSvgPath, 'utf8')
-                // try { fs.unlinkSync(tempSvgPath); } catch (e) { /* ignore */ }
+                try { fs.unlinkSync(tempSvgPath) } catch (e) { /* ignore */ }
 
                 if (svgContent) {
                   console.log(
@@ -283,7 +313,7 @@ async function convertDxfToSvg (dxfFilePath: string): Promise<string | null> {
 
           if (fs.existsSync(tempSvgPath)) {
             const svgContent = fs.readFileSync(tempSvgPath, 'utf8')
-            // try { fs.unlinkSync(tempSvgPath); } catch (e) { /* ignore */ }
+            try { fs.unlinkSync(tempSvgPath) } catch (e) { /* ignore */ }
 
             if (svgContent) {
               console.log(
@@ -1880,7 +1910,7 @@ app.get('/api/models/:id/svg', async (req: Request, res: Response) => {
         }
 
         const file = req.file
-        const stats = fs.statSync(file.path)
+        let stats = fs.statSync(file.path)
 
         // Sprawdź, czy przekazano e-mail i autoShare w parametrach URL
         const userEmail = (req.query.email as string) || null
@@ -1971,6 +2001,40 @@ app.get('/api/models/:id/svg', async (req: Request, res: Response) => {
           isSTLBinary = true
         }
 
+        // Normalizuj ASCII STL do binarnego formatu przy przyjęciu pliku,
+        // aby miniaturki, podgląd i eksport zawsze czytały szybki format binarny
+        if (!isSTLBinary) {
+          try {
+            const normalizeScript = path.join(__dirname, 'normalize_stl.py')
+            const { stdout } = await execFilePromise('python3', [
+              normalizeScript,
+              file.path,
+              '--original-name',
+              file.originalname
+            ])
+            const report = JSON.parse(stdout)
+            isSTLBinary = true
+            stats = fs.statSync(file.path)
+            console.log(
+              `Normalized ASCII STL ${file.originalname} to binary: ` +
+                `${report.bytes_before} -> ${report.bytes_after} bytes (saved ${report.bytes_saved})`
+            )
+          } catch (normalizeError) {
+            console.error('Error normalizing ASCII STL, keeping original:', normalizeError)
+          }
+        }
+
+        // Łańcuch LOD (GLB + manifest .lods.json obok pliku) budowany przy przyjęciu
+        // pliku, w tle - odpowiedź na upload nie czeka na upraszczanie siatki
+        const lodScript = path.join(__dirname, 'generate_lods.py')
+        execFilePromise('python3', [lodScript, file.path])
+          .then(({ stdout }) => {
+            console.log(`Generated LODs for ${file.originalname}:\n${stdout.trim()}`)
+          })
+          .catch((lodError) => {
+            console.error(`Error generating LODs for ${file.originalname}:`, lodError)
+          })
+
         // Ustawianie shareEnabled na podstawie parametru autoShare
         const isOwner = req.isAuthenticated()
         const shareId = nanoid(10) // Zawsze generujemy shareId, ale włączamy udostępnianie tylko jeśli autoShare = true
@@ -2308,6 +2372,7 @@ app.get('/api/models/:id/svg', async (req: Request, res: Response) => {
 
       if (filePath && fs.existsSync(filePath)) {
         fs.unlinkSync(filePath)
+        removeDerivedModelFiles(filePath)
         console.log(`Deleted STEP file: ${filePath}`)
       }
 
@@ -2315,6 +2380,7 @@ app.get('/api/models/:id/svg', async (req: Request, res: Response) => {
       const stlFilePath = metadata?.stlFilePath
       if (stlFilePath && fs.existsSync(stlFilePath)) {
         fs.unlinkSync(stlFilePath)
+        removeDerivedModelFiles(stlFilePath)
         console.log(`Deleted STL file: ${stlFilePath}`)
       }
 
@@ -3599,11 +3665,13 @@ app.get('/api/models/:id/svg', async (req: Request, res: Response) => {
           // Usuń plik STL, jeśli istnieje
           if (metadata.stlFilePath && fs.existsSync(metadata.stlFilePath)) {
             fs.unlinkSync(metadata.stlFilePath)
+            removeDerivedModelFiles(metadata.stlFilePath)
           }
 
           // Usuń plik STEP, jeśli istnieje
           if (metadata.filePath && fs.existsSync(metadata.filePath)) {
             fs.unlinkSync(metadata.filePath)
+            removeDerivedModelFiles(metadata.filePath)
           }
 
           // Usuń plik DXF, jeśli istnieje
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Pomiar backendów SVG konwertera enhanced_dxf_converter
+Porównuje czas konwersji i rozmiar SVG backendów 'direct' i 'matplotlib'
+na próbce gabinet.dxf oraz na syntetycznych rysunkach z zadaną liczbą encji
+(linie, okręgi, łuki, polilinie z łukami, teksty i wstawienia bloku).
+
+Użycie: python3 server/scripts/benchmark_dxf_svg.py [--sizes 1000,10000] [--backends direct,matplotlib]
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+DEFAULT_SAMPLE = os.path.join(SERVER_DIR, '..', 'attached_assets', 'gabinet.dxf')
+
+# Domyślne liczby encji rysunków syntetycznych
+DEFAULT_SIZES = '1000,10000'
+
+# Liczba powtórzeń pomiaru - liczy się najlepszy wynik
+REPEATS = 3
+
+
+def synthetic_drawing(path, count):
+    """Zapisuje rysunek z count encjami rozłożonymi na siatce"""
+    import ezdxf
+
+    doc = ezdxf.new('R2010')
+    doc.header['$INSUNITS'] = 4
+    block = doc.blocks.new('BOLT')
+    block.add_circle((0, 0), 2)
+    block.add_line((-3, 0), (3, 0))
+    block.add_line((0, -3), (0, 3))
+
+    msp = doc.modelspace()
+    side = max(1, int(math.sqrt(count)))
+    for index in range(count):
+        x, y = (index % side) * 10.0, (index // side) * 10.0
+        kind = index % 6
+        if kind == 0:
+            msp.add_line((x, y), (x + 8, y + 5))
+        elif kind == 1:
+            msp.add_circle((x + 4, y + 4), 3)
+        elif kind == 2:
+            msp.add_arc((x + 4, y + 4), 3, 30, 240)
+        elif kind == 3:
+            msp.add_lwpolyline([(x, y, 0), (x + 6, y, 0.5), (x + 6, y + 6, 0), (x, y + 6, 0)],
+                               format='xyb', close=True)
+        elif kind == 4:
+            msp.add_text(f"T{index}", height=2).set_placement((x, y))
+        else:
+            msp.add_blockref('BOLT', (x + 4, y + 4), dxfattribs={'rotation': index % 90})
+    doc.saveas(path)
+
+
+def convert_time(path, backend):
+    """Najlepszy czas (ms) konwersji do pliku i rozmiar SVG (bajty) dla backendu"""
+    from enhanced_dxf_converter import write_svg_enhanced
+
+    svg_path = f"{path}.{backend}.svg"
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        converted = write_svg_enhanced(path, svg_path, backend)
+        elapsed = (time.perf_counter() - started) * 1000
+        if not converted:
+            raise RuntimeError(f"{backend} failed on {os.path.basename(path)}")
+        best = elapsed if best is None else min(best, elapsed)
+    return best, os.path.getsize(svg_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark DXF to SVG backends')
+    parser.add_argument('--sample', default=DEFAULT_SAMPLE, help='Real DXF drawing to include')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='Entity counts of synthetic drawings')
+    parser.add_argument('--backends', default='direct,matplotlib', help='Backends to compare')
+
+    args = parser.parse_args()
+
+    import logging
+    # Konwerter loguje każdą encję, a matplotlib brakujące czcionki - pomiar bez logów
+    logging.disable(logging.WARNING)
+
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        drawings = []
+        if os.path.exists(args.sample):
+            sample = os.path.join(work_dir, os.path.basename(args.sample))
+            shutil.copyfile(args.sample, sample)
+            drawings.append(sample)
+        else:
+            print(f"Sample DXF does not exist: {args.sample}", file=sys.stderr)
+
+        for size in sizes:
+            path = os.path.join(work_dir, f"synthetic_{size}.dxf")
+            synthetic_drawing(path, size)
+            drawings.append(path)
+
+        for path in drawings:
+            results = []
+            for backend in backends:
+                elapsed, size = convert_time(path, backend)
+                results.append(f"{backend} {elapsed:.0f} ms / {size / 1024:.0f} KiB")
+            print(f"{os.path.basename(path)}: " + ', '.join(results))
+
+    sys.exit(0)
+
+if __name__ == '__main__':
+    main()
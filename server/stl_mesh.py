@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Wspólny dekoder plików STL
+Wczytuje całą tablicę trójkątów binarnego STL jednym odczytem do tablic NumPy
+albo mapuje plik do pamięci i liczy statystyki porcjami o stałym rozmiarze
+"""
+
+import itertools
+import os
+import re
+import numpy as np
+
+# Układ binarnego STL: 80 bajtów nagłówka, uint32 liczby trójkątów,
+# a potem rekordy po 50 bajtów
+STL_HEADER_SIZE = 80
+STL_COUNT_SIZE = 4
+STL_DATA_OFFSET = STL_HEADER_SIZE + STL_COUNT_SIZE
+
+# Rekord trójkąta: normalna, 3 wierzchołki i 2 bajty atrybutów (little-endian)
+STL_FACET_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2'),
+])
+STL_RECORD_SIZE = STL_FACET_DTYPE.itemsize
+
+# Rozmiar porcji dla obliczeń strumieniowych (~12 MB rekordów na porcję)
+DEFAULT_CHUNK_TRIANGLES = 1 << 18
+
+# Powyżej tej liczby trójkątów renderery miniaturek nie wczytują całej siatki
+MAX_FULL_LOAD_TRIANGLES = 2_000_000
+
+# Rozmiar porcji tekstu przy strumieniowym parsowaniu ASCII STL
+DEFAULT_ASCII_CHUNK_BYTES = 16 << 20
+
+# Współrzędne z linii "vertex x y z" (słowo kluczowe na początku linii, dowolna
+# wielkość liter) - reszta pliku, w tym nazwa bryły, jest pomijana
+_VERTEX_LINE = re.compile(rb'^[ \t]*vertex[ \t]+(\S+)[ \t]+(\S+)[ \t]+(\S+)', re.I | re.M)
+
+
+class StlFormatError(ValueError):
+    """Plik STL ma niepoprawną strukturę"""
+
+
+def read_stl_triangle_count(file_path):
+    """Odczytuje liczbę trójkątów z nagłówka i sprawdza ją względem rozmiaru pliku"""
+    file_size = os.path.getsize(file_path)
+    if file_size < STL_DATA_OFFSET:
+        raise StlFormatError(f"File too small for binary STL: {file_size} bytes")
+
+    with open(file_path, 'rb') as f:
+        f.seek(STL_HEADER_SIZE)
+        triangle_count = int.from_bytes(f.read(STL_COUNT_SIZE), byteorder='little')
+
+    available = (file_size - STL_DATA_OFFSET) // STL_RECORD_SIZE
+    if triangle_count > available:
+        raise StlFormatError(
+            f"Header declares {triangle_count} triangles but file holds only {available}"
+        )
+
+    return triangle_count
+
+
+def open_stl_memmap(file_path):
+    """Mapuje tablicę rekordów binarnego STL do pamięci bez jej wczytywania"""
+    triangle_count = read_stl_triangle_count(file_path)
+    if triangle_count == 0:
+        return np.empty(0, dtype=STL_FACET_DTYPE)
+
+    return np.memmap(file_path, dtype=STL_FACET_DTYPE, mode='r',
+                     offset=STL_DATA_OFFSET, shape=(triangle_count,))
+
+
+def iter_stl_chunks(file_path, chunk_triangles=DEFAULT_CHUNK_TRIANGLES):
+    """Zwraca kolejne porcje trójkątów (n,3,3) float64 z pliku zmapowanego do pamięci"""
+    records = open_stl_memmap(file_path)
+    for start in range(0, len(records), chunk_triangles):
+        yield records['vertices'][start:start + chunk_triangles].astype(np.float64)
+
+
+def compute_stl_stats(file_path, chunk_triangles=DEFAULT_CHUNK_TRIANGLES):
+    """
+    Liczy granice, liczbę trójkątów, pole powierzchni i objętość ze znakiem
+    binarnego STL. Zużycie pamięci zależy tylko od rozmiaru porcji.
+    """
+    triangle_count = 0
+    min_vals = np.full(3, np.inf)
+    max_vals = np.full(3, -np.inf)
+    surface_area = 0.0
+    signed_volume = 0.0
+
+    for chunk in iter_stl_chunks(file_path, chunk_triangles):
+        v0, v1, v2 = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        cross = np.cross(v1 - v0, v2 - v0)
+
+        triangle_count += len(chunk)
+        points = chunk.reshape(-1, 3)
+        np.minimum(min_vals, points.min(axis=0), out=min_vals)
+        np.maximum(max_vals, points.max(axis=0), out=max_vals)
+        surface_area += 0.5 * np.linalg.norm(cross, axis=1).sum()
+        signed_volume += np.einsum('ij,ij->', v0, np.cross(v1, v2)) / 6.0
+
+    if triangle_count == 0:
+        min_vals = max_vals = np.zeros(3)
+
+    return {
+        'triangle_count': triangle_count,
+        'min': min_vals.tolist(),
+        'max': max_vals.tolist(),
+        'surface_area': float(surface_area),
+        'signed_volume': float(signed_volume),
+    }
+
+
+def read_stl_binary(file_path, max_triangles=None):
+    """
+    Wczytuje binarny plik STL.
+    Zwraca (trójkąty (N,3,3) float32, normalne (N,3) float32).
+    Przy podanym max_triangles większe pliki są równomiernie próbkowane
+    z mapy pamięci zamiast wczytywane w całości.
+    """
+    triangle_count = read_stl_triangle_count(file_path)
+
+    if max_triangles is not None and triangle_count > max_triangles:
+        step = -(-triangle_count // max_triangles)
+        records = open_stl_memmap(file_path)[::step]
+    else:
+        with open(file_path, 'rb') as f:
+            f.seek(STL_DATA_OFFSET)
+            records = np.fromfile(f, dtype=STL_FACET_DTYPE, count=triangle_count)
+
+        if len(records) != triangle_count:
+            raise StlFormatError(f"Expected {triangle_count} triangles, read {len(records)}")
+
+    triangles = np.ascontiguousarray(records['vertices'], dtype=np.float32)
+    normals = np.ascontiguousarray(records['normal'], dtype=np.float32)
+    return triangles, normals
+
+
+def is_ascii_stl(file_path):
+    """
+    Sprawdza czy plik STL jest w formacie ASCII. Wiele eksporterów zapisuje
+    "solid" także w nagłówku binarnym, więc decyduje zgodność rozmiaru pliku
+    z liczbą trójkątów oraz treść początku pliku.
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        head = f.read(1024)
+
+    if not head.lstrip().lower().startswith(b'solid'):
+        return False
+
+    if file_size >= STL_DATA_OFFSET:
+        triangle_count = int.from_bytes(head[STL_HEADER_SIZE:STL_DATA_OFFSET], byteorder='little')
+        if file_size == STL_DATA_OFFSET + triangle_count * STL_RECORD_SIZE:
+            return False
+
+    if b'\0' in head:
+        return False
+
+    lowered = head.lower()
+    return b'facet' in lowered or b'endsolid' in lowered or len(head) < 1024
+
+
+def read_stl_ascii(file_path, chunk_bytes=DEFAULT_ASCII_CHUNK_BYTES):
+    """
+    Strumieniowo parsuje ASCII STL porcjami tekstu, bez wczytywania linii.
+    Zwraca (trójkąty (N,3,3) float32, normalne (N,3) float32).
+    """
+    parts = []
+    tail = b''
+
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(chunk_bytes)
+            if block:
+                data = tail + block
+                cut = data.rfind(b'\n') + 1
+                if cut == 0:
+                    tail = data
+                    continue
+                data, tail = data[:cut], data[cut:]
+            else:
+                data, tail = tail, b''
+
+            # Zamiana liczb całej porcji naraz zamiast linia po linii
+            coords = list(itertools.chain.from_iterable(_VERTEX_LINE.findall(data)))
+            if coords:
+                parts.append(np.array(coords, dtype=np.float32))
+
+            if not block:
+                break
+
+    values = np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+    if len(values) % 9:
+        raise StlFormatError(f"ASCII STL has {len(values)} vertex coordinates, not a multiple of 9")
+
+    triangles = values.reshape(-1, 3, 3)
+    return triangles, compute_face_normals(triangles)
+
+
+def read_stl(file_path, max_triangles=None):
+    """Wczytuje plik STL w formacie ASCII lub binarnym"""
+    if is_ascii_stl(file_path):
+        return read_stl_ascii(file_path)
+    return read_stl_binary(file_path, max_triangles)
+
+
+def write_stl_binary(file_path, triangles, normals=None, header=b''):
+    """Zapisuje trójkąty (N,3,3) jako kanoniczny binarny STL (little-endian)"""
+    triangles = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
+    if normals is None:
+        normals = compute_face_normals(triangles)
+
+    records = np.zeros(len(triangles), dtype=STL_FACET_DTYPE)
+    records['normal'] = normals
+    records['vertices'] = triangles
+
+    with open(file_path, 'wb') as f:
+        f.write(header[:STL_HEADER_SIZE].ljust(STL_HEADER_SIZE, b'\0'))
+        f.write(len(records).to_bytes(STL_COUNT_SIZE, byteorder='little'))
+        records.tofile(f)
+
+
+def compute_face_normals(triangles):
+    """Oblicza jednostkowe normalne ścian (N,3) dla trójkątów (N,3,3)"""
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    np.divide(normals, lengths, out=normals, where=lengths > 0)
+    return normals
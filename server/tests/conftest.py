@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduły serwera importowane są płasko (jak w skryptach uruchamianych z server/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,28 @@
+import os
+import time
+
+import artifact_cache
+
+
+def test_default_cache_dir_independent_of_cwd(tmp_path, monkeypatch):
+    monkeypatch.delenv('ARTIFACT_CACHE_DIR', raising=False)
+    monkeypatch.chdir(tmp_path)
+    expected = os.path.join(os.path.dirname(artifact_cache.SERVER_DIR), 'uploads', 'artifact-cache')
+    assert artifact_cache.cache_dir() == expected
+
+
+def test_prune_to_limit_keeps_newest_and_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setenv('ARTIFACT_CACHE_DIR', str(tmp_path))
+    monkeypatch.setenv('ARTIFACT_CACHE_MAX_BYTES', '150')
+    now = time.time()
+    for index, name in enumerate(('old.svg', 'mid.svg', 'new.svg')):
+        path = tmp_path / name
+        path.write_bytes(b'x' * 100)
+        os.utime(path, (now - 100 + index, now - 100 + index))
+    (tmp_path / 'writing.tmp').write_bytes(b'x' * 100)
+
+    removed, total = artifact_cache.prune_to_limit()
+
+    assert removed == 2
+    assert total == 100
+    assert sorted(os.listdir(tmp_path)) == ['new.svg', 'writing.tmp']
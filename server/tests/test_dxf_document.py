@@ -0,0 +1,101 @@
+import ezdxf
+import pytest
+from ezdxf import bbox
+
+import dxf_matplotlib_converter
+import enhanced_dxf_converter
+from dxf_document import DxfDocument
+
+
+def document_bounds(doc, tmp_path):
+    path = str(tmp_path / 'drawing.dxf')
+    doc.saveas(path)
+    return DxfDocument(path, enhanced_dxf_converter.get_entity_points).bounds
+
+
+def reference_bounds(msp):
+    extents = bbox.extents(msp, fast=False)
+    return (extents.extmin.x, extents.extmin.y, extents.extmax.x, extents.extmax.y)
+
+
+def test_rotated_circle_insert_is_exact(tmp_path):
+    doc = ezdxf.new('R2010')
+    block = doc.blocks.new('C')
+    block.add_circle((10, 10), 1)
+    msp = doc.modelspace()
+    msp.add_blockref('C', (0, 0), dxfattribs={'rotation': 45})
+
+    bounds = document_bounds(doc, tmp_path)
+
+    assert bounds[2] - bounds[0] == pytest.approx(2)
+    assert bounds[3] - bounds[1] == pytest.approx(2)
+    assert bounds == pytest.approx(reference_bounds(msp), abs=1e-3)
+
+
+def test_rotated_scaled_arcs_match_ezdxf_bbox(tmp_path):
+    doc = ezdxf.new('R2010')
+    inner = doc.blocks.new('A', base_point=(0.5, 0))
+    inner.add_arc((1, 0), 2, 10, 100)
+    inner.add_circle((4, 1), 0.5)
+    outer = doc.blocks.new('B')
+    outer.add_blockref('A', (3, 0), dxfattribs={'rotation': 50, 'yscale': -2})
+    msp = doc.modelspace()
+    msp.add_blockref('B', (0, 0), dxfattribs={'rotation': 30, 'xscale': 1.5, 'yscale': 1.5})
+    msp.add_blockref('A', (20, 5), dxfattribs={'rotation': 120, 'xscale': 2, 'yscale': 0.5})
+
+    assert document_bounds(doc, tmp_path) == pytest.approx(reference_bounds(msp), abs=1e-3)
+
+
+@pytest.mark.parametrize('converter', [enhanced_dxf_converter, dxf_matplotlib_converter])
+def test_entity_at_origin_counts_towards_bounds(tmp_path, converter):
+    doc = ezdxf.new('R2010')
+    doc.modelspace().add_line((0, 0), (100, 50))
+    path = str(tmp_path / 'origin.dxf')
+    doc.saveas(path)
+
+    assert converter.open_document(path).bounds == pytest.approx((0, 0, 100, 50))
+
+
+def test_block_vertex_at_origin_is_kept(tmp_path):
+    doc = ezdxf.new('R2010')
+    block = doc.blocks.new('L')
+    block.add_line((0, 0), (10, 5))
+    doc.modelspace().add_blockref('L', (20, 20))
+
+    assert document_bounds(doc, tmp_path) == pytest.approx((20, 20, 30, 25))
+
+
+@pytest.mark.parametrize('bulge', [1e-12, -1e-15])
+def test_float_noise_bulge_is_a_straight_segment(tmp_path, bulge):
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    msp.add_lwpolyline([(0, 0, bulge), (10, 0, 0), (10, 5, 0)], format='xyb')
+
+    assert document_bounds(doc, tmp_path) == pytest.approx((0, 0, 10, 5))
+
+
+def test_arc_with_equal_angles_is_a_full_circle(tmp_path):
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    msp.add_arc((5, 5), 2, 30, 30)
+    block = doc.blocks.new('O')
+    block.add_arc((0, 0), 1, 90, 450)
+    msp.add_blockref('O', (20, 0), dxfattribs={'rotation': 30})
+
+    assert document_bounds(doc, tmp_path) == pytest.approx((3, -1, 21, 7))
+
+
+@pytest.mark.parametrize('converter', [enhanced_dxf_converter, dxf_matplotlib_converter])
+def test_tilted_ocs_entities_use_wcs_extents(tmp_path, converter):
+    doc = ezdxf.new('R2010')
+    msp = doc.modelspace()
+    msp.add_line((0, 0), (1, 1))
+    msp.add_arc((0, 0, 50), 20, 0, 270, dxfattribs={'extrusion': (0, 0.6, 0.8)})
+    msp.add_lwpolyline([(0, 0, 1), (10, 0, 0)], format='xyb', dxfattribs={'extrusion': (0.6, 0, 0.8)})
+    path = str(tmp_path / 'tilted.dxf')
+    doc.saveas(path)
+
+    bounds = converter.open_document(path).bounds
+
+    assert bounds == pytest.approx(reference_bounds(msp), abs=1e-3)
+    assert bounds[3] > 40
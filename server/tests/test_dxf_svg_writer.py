@@ -0,0 +1,148 @@
+import io
+import re
+import xml.etree.ElementTree as ET
+
+import ezdxf
+import pytest
+
+import dxf_svg_writer
+import enhanced_dxf_converter
+from dxf_svg_writer import DxfSvgWriter, svg_output
+
+
+def modelspace():
+    doc = ezdxf.new('R2010')
+    return doc, doc.modelspace()
+
+
+def test_failing_entity_is_skipped():
+    doc, msp = modelspace()
+    line = msp.add_line((0, 0), (10, 0))
+    hatch = msp.add_hatch()
+    hatch.paths.add_polyline_path([(0, 0), (1, 0), (1, 1)])
+    writer = DxfSvgWriter()
+    writer._emit_hatch = lambda entity, depth: iter([1 / 0])
+
+    assert writer.entity_elements(hatch) == []
+    assert writer.entity_elements(line) == ['<line x1="0" y1="0" x2="10" y2="0"/>']
+
+
+def test_failing_insert_does_not_leave_dangling_block(monkeypatch):
+    doc, msp = modelspace()
+    block = doc.blocks.new('B')
+    block.add_line((0, 0), (1, 0))
+    insert = msp.add_blockref('B', (5, 5))
+    writer = DxfSvgWriter()
+
+    calls = []
+
+    def broken_matrix(insert):
+        # Skala wstawienia jest jeszcze poprawna, macierz dla <use> już nie
+        calls.append(insert)
+        if len(calls) > 1:
+            raise ValueError('broken insert')
+        return (1, 0, 0, 1, 5, 5)
+
+    monkeypatch.setattr(dxf_svg_writer, 'insert_matrix', broken_matrix)
+    assert writer.entity_elements(insert) == []
+    # Odrzucona definicja bloku nie jest uznana za zapisaną
+    assert writer.block_ids == {}
+
+    monkeypatch.undo()
+    elements = writer.entity_elements(insert)
+    assert elements[0].startswith('<defs><g id="block-1" ')
+    assert elements[-1].startswith('<use xlink:href="#block-1"')
+
+
+def test_stream_output_is_written_only_on_success():
+    output = io.StringIO()
+    with pytest.raises(RuntimeError):
+        with svg_output(output) as stream:
+            stream.write('<svg>')
+            raise RuntimeError('render failed')
+    assert output.getvalue() == ''
+
+
+def test_error_svg_on_stream_is_valid_xml(tmp_path, monkeypatch):
+    doc, msp = modelspace()
+    msp.add_line((0, 0), (10, 5))
+    path = str(tmp_path / 'drawing.dxf')
+    doc.saveas(path)
+
+    def failing_render(document, min_x, min_y, max_x, max_y, metadata, stream, explode=False):
+        stream.write('<svg><g>')
+        raise RuntimeError('render failed')
+
+    monkeypatch.setitem(enhanced_dxf_converter.SVG_BACKENDS, 'direct', failing_render)
+    output = io.StringIO()
+    assert enhanced_dxf_converter.write_svg_enhanced(path, output) is False
+    root = ET.fromstring(output.getvalue())
+    assert 'render failed' in ''.join(root.itertext())
+
+
+@pytest.mark.parametrize('add_entity', [
+    lambda msp, attribs: msp.add_arc((50, 0), 5, 0, 90, dxfattribs=attribs),
+    lambda msp, attribs: msp.add_circle((50, 0), 5, dxfattribs=attribs),
+    lambda msp, attribs: msp.add_lwpolyline([(20, 0, 1), (30, 0, 0)], format='xyb', dxfattribs=attribs),
+])
+def test_mirrored_ocs_is_drawn_in_wcs(add_entity):
+    from ezdxf import bbox
+    from ezdxf.path import make_path
+
+    doc, msp = modelspace()
+    entity = add_entity(msp, {'extrusion': (0, 0, -1)})
+    element, = DxfSvgWriter().entity_elements(entity)
+
+    # Ścieżka zaczyna się w punkcie WCS, a nie w lustrzanym punkcie OCS
+    start = make_path(entity).start
+    assert element.startswith(f'<path d="M{start.x:g} {start.y:g}')
+    assert bbox.extents([entity]).extmax.x < 0
+
+
+def stroke_values(element, name):
+    match = re.search(rf'{name}="([^"]*)"', element)
+    return [float(value) for value in match.group(1).split()] if match else None
+
+
+def test_scaled_insert_strokes_match_explode():
+    doc, msp = modelspace()
+    doc.layers.add('HIDDEN', linetype='DASHED')
+    block = doc.blocks.new('SMALL')
+    block.add_line((0, 0), (100, 0), dxfattribs={'layer': 'HIDDEN'})
+    msp.add_blockref('SMALL', (0, 0), dxfattribs={'xscale': 0.01, 'yscale': 0.01, 'rotation': 30})
+    layer_linetypes = {'HIDDEN': 'DASHED'}
+    line_width = 0.5
+
+    exploded = [e for entity in msp
+                for e in DxfSvgWriter(layer_linetypes, line_width, explode=True).entity_elements(entity)]
+    instanced = [e for entity in msp
+                 for e in DxfSvgWriter(layer_linetypes, line_width).entity_elements(entity)]
+
+    # Po rozbiciu linia dziedziczy grubość z nagłówka i ma kreskowanie w jednostkach rysunku
+    exploded_dashes = stroke_values(exploded[0], 'stroke-dasharray')
+    assert stroke_values(exploded[0], 'stroke-width') is None
+
+    # <use> skaluje definicję 0.01 razy - grubość i kreski w definicji są 100 razy większe
+    definition, line, end, use = instanced
+    scale = 0.01
+    assert stroke_values(definition, 'stroke-width')[0] * scale == pytest.approx(line_width)
+    assert [d * scale for d in stroke_values(line, 'stroke-dasharray')] == pytest.approx(exploded_dashes)
+    assert use.startswith('<use ')
+
+
+def test_nested_definition_sets_own_stroke_width():
+    doc, msp = modelspace()
+    inner = doc.blocks.new('INNER')
+    inner.add_line((0, 0), (1, 0))
+    outer = doc.blocks.new('OUTER')
+    outer.add_blockref('INNER', (0, 0), dxfattribs={'xscale': 0.5, 'yscale': 0.5})
+    msp.add_blockref('OUTER', (0, 0), dxfattribs={'xscale': 2, 'yscale': 2})
+    elements = DxfSvgWriter(line_width=0.3).entity_elements(next(iter(msp)))
+
+    # INNER ma łączną skalę 1, ale jego treść dziedziczy styl z <use> w definicji OUTER
+    widths = [stroke_values(e, 'stroke-width') for e in elements if e.startswith('<defs>')]
+    assert widths == [[0.3], [0.15]]
+
+
+def test_float_noise_bulge_is_drawn_as_line():
+    assert dxf_svg_writer.polyline_path([(0, 0, 1e-12), (10, 0, 0)], False) == 'M0 0L10 0'
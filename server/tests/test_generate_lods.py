@@ -0,0 +1,45 @@
+import os
+
+import generate_lods
+
+FACET = """facet normal 0 0 1
+  outer loop
+    vertex 0 0 0
+    vertex 1 0 0
+    vertex 0 1 0
+  endloop
+endfacet
+"""
+
+
+def write_stl(tmp_path):
+    path = tmp_path / 'part.stl'
+    path.write_text(f"solid part\n{FACET}endsolid part\n")
+    return str(path)
+
+
+def test_levels_and_manifest_are_written_next_to_input(tmp_path):
+    path = write_stl(tmp_path)
+
+    manifest = generate_lods.generate_lods(path)
+
+    assert manifest is not None
+    assert os.path.exists(path + generate_lods.LOD_MANIFEST_SUFFIX)
+    for level in manifest['levels']:
+        assert os.path.exists(tmp_path / level['file'])
+
+
+def test_input_removed_during_generation_leaves_no_levels(tmp_path, monkeypatch):
+    path = write_stl(tmp_path)
+    mesh_to_glb = generate_lods.mesh_to_glb
+
+    def remove_input(*args):
+        # Model usunięty, gdy poziomy są jeszcze zapisywane w tle
+        if os.path.exists(path):
+            os.remove(path)
+        return mesh_to_glb(*args)
+
+    monkeypatch.setattr(generate_lods, 'mesh_to_glb', remove_input)
+
+    assert generate_lods.generate_lods(path) is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(('.glb', '.lods.json', '.mesh.npz'))]
@@ -0,0 +1,41 @@
+import json
+
+import numpy as np
+import pytest
+
+from image_encode import save_image_set
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+
+
+def pixels():
+    return np.full((40, 60, 3), 128, dtype=np.uint8)
+
+
+def is_webp(data):
+    return data[:4] == b'RIFF' and data[8:12] == b'WEBP'
+
+
+def test_webp_primary_path_holds_webp(tmp_path):
+    output = tmp_path / 'thumb.webp'
+    manifest = save_image_set(pixels(), str(output), [(30, 20)], primary_size=(60, 40))
+
+    assert is_webp(output.read_bytes())
+    # Format zapasowy ma własny plik .png, na który wskazuje src
+    assert manifest['src'] == 'thumb_60x40.png'
+    assert (tmp_path / manifest['src']).read_bytes().startswith(PNG_MAGIC)
+    assert json.loads((tmp_path / 'thumb.srcset.json').read_text())['type'] == 'image/png'
+
+
+def test_png_primary_path_holds_png(tmp_path):
+    output = tmp_path / 'thumb.png'
+    manifest = save_image_set(pixels(), str(output), [(30, 20)], fmt='webp', primary_size=(60, 40))
+
+    assert output.read_bytes().startswith(PNG_MAGIC)
+    assert manifest['src'] == 'thumb.png'
+    assert is_webp((tmp_path / 'thumb_30x20.webp').read_bytes())
+
+
+def test_mismatched_extension_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        save_image_set(pixels(), str(tmp_path / 'thumb.jpg'), [(30, 20)], fmt='png')
@@ -0,0 +1,90 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budżet czasu (ms) importu modułu i wywołania metadanych z magazynu artefaktów
+BUDGET_MS = 200
+
+# Moduły importowane przez tryby metadanych - żaden nie może ładować bibliotek z HEAVY_MODULES
+LIGHT_MODULES = ('enhanced_dxf_converter', 'dxf_matplotlib_converter', 'dxf_document', 'dxf_extents',
+                 'dxf_svg_writer', 'artifact_cache')
+
+HEAVY_MODULES = ('matplotlib', 'ezdxf', 'numpy')
+
+# Wywołania metadanych mierzone przy trafieniu w magazynie artefaktów
+METADATA_COMMANDS = (
+    ('enhanced_dxf_converter.py', 'info'),
+    ('enhanced_dxf_converter.py', 'json'),
+    ('dxf_matplotlib_converter.py', 'info'),
+    ('dxf_matplotlib_converter.py', 'json'),
+)
+
+SAMPLE = os.path.join(SERVER_DIR, '..', 'attached_assets', 'gabinet.dxf')
+
+# Liczba powtórzeń pomiaru - liczy się najlepszy wynik (mniej szumu od obciążenia maszyny)
+REPEATS = 3
+
+
+def import_profile(module):
+    """Zwraca (czas importu modułu w ms, zbiór zaimportowanych modułów najwyższego poziomu)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SERVER_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+    elapsed_us = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        imported.add(name.strip().split('.')[0])
+        if name.strip() == module:
+            elapsed_us = int(cumulative)
+
+    return elapsed_us / 1000.0, imported
+
+
+def command_time(script, mode, sample, cache_dir):
+    """Najlepszy czas (ms) wywołania skryptu w danym trybie"""
+    env = dict(os.environ, ARTIFACT_CACHE_DIR=cache_dir)
+    best = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, script, sample, mode], cwd=SERVER_DIR, env=env,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        elapsed = (time.perf_counter() - started) * 1000
+        assert result.returncode == 0, f"{script} {mode} exited with code {result.returncode}"
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+@pytest.mark.parametrize('module', LIGHT_MODULES)
+def test_light_module_import(module):
+    profiles = [import_profile(module) for _ in range(REPEATS)]
+    heavy = sorted(profiles[0][1].intersection(HEAVY_MODULES))
+
+    assert not heavy, f"import {module} loads {', '.join(heavy)}"
+    assert min(elapsed for elapsed, _ in profiles) <= BUDGET_MS
+
+
+@pytest.mark.skipif(not os.path.exists(SAMPLE), reason='sample DXF is missing')
+@pytest.mark.parametrize('script, mode', METADATA_COMMANDS)
+def test_cached_metadata_call(tmp_path, script, mode):
+    # Kopia próbki - tryb json zapisuje wynik obok pliku DXF
+    sample = str(tmp_path / os.path.basename(SAMPLE))
+    shutil.copyfile(SAMPLE, sample)
+    cache_dir = str(tmp_path / 'artifact-cache')
+
+    # Pierwsze wywołanie zapisuje artefakt, mierzone są kolejne
+    command_time(script, mode, sample, cache_dir)
+
+    assert command_time(script, mode, sample, cache_dir) <= BUDGET_MS
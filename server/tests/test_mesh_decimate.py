@@ -0,0 +1,54 @@
+import numpy as np
+
+import mesh_decimate
+from mesh_decimate import decimate_mesh
+
+
+def strip_mesh(length):
+    """Pas kwadratów 1x1 wzdłuż osi x - kolejność trójkątów idzie od x = 0 do x = length"""
+    xs = np.arange(length + 1, dtype=np.float32)
+    vertices = np.concatenate([np.column_stack([xs, np.zeros_like(xs), np.zeros_like(xs)]),
+                               np.column_stack([xs, np.ones_like(xs), np.zeros_like(xs)])])
+    top = np.arange(length) + length + 1
+    bottom = np.arange(length)
+    faces = np.concatenate([np.column_stack([bottom, bottom + 1, top]),
+                            np.column_stack([bottom + 1, top + 1, top])])
+    return vertices, faces.astype(np.uint32)
+
+
+def test_budget_fallback_covers_whole_mesh(monkeypatch):
+    vertices, faces = strip_mesh(1000)
+    # Bez przebiegów dopasowujących zostaje tylko ostateczne zgrubienie siatki klastrów
+    monkeypatch.setattr(mesh_decimate, 'MAX_DECIMATION_PASSES', 0)
+
+    new_vertices, new_faces = decimate_mesh(vertices, faces, 100)
+
+    assert 0 < len(new_faces) <= 100
+    used = new_vertices[np.unique(new_faces)]
+    assert used[:, 0].min() < 50 and used[:, 0].max() > 950
+
+
+def test_flat_mesh_is_sampled_across_whole_file():
+    xs = np.arange(3000, dtype=np.float32)
+    vertices = np.column_stack([xs, np.zeros_like(xs), np.zeros_like(xs)])
+    faces = np.arange(3000, dtype=np.uint32).reshape(-1, 3)
+
+    _, new_faces = decimate_mesh(vertices, faces, 10)
+
+    assert len(new_faces) == 10
+    assert new_faces[0, 0] == 0 and new_faces[-1, 2] == 2999
+
+
+def test_budget_fallback_coarsens_clusters(monkeypatch):
+    xs, ys = np.meshgrid(np.arange(101, dtype=np.float32), np.arange(101, dtype=np.float32))
+    vertices = np.column_stack([xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=np.float32)])
+    corner = (np.arange(100)[:, None] * 101 + np.arange(100)[None, :]).ravel()
+    faces = np.concatenate([np.column_stack([corner, corner + 1, corner + 101]),
+                            np.column_stack([corner + 1, corner + 102, corner + 101])]).astype(np.uint32)
+    monkeypatch.setattr(mesh_decimate, 'MAX_DECIMATION_PASSES', 0)
+
+    new_vertices, new_faces = decimate_mesh(vertices, faces, 500)
+
+    assert 0 < len(new_faces) <= 500
+    assert new_vertices[:, 0].min() < 10 and new_vertices[:, 0].max() > 90
+    assert new_vertices[:, 1].min() < 10 and new_vertices[:, 1].max() > 90
@@ -0,0 +1,40 @@
+import numpy as np
+
+from stl_mesh import read_stl, read_stl_ascii
+
+FACET = """facet normal 0 0 1
+  outer loop
+    vertex 0 0 0
+    vertex 1 0 0
+    vertex 0 1 0
+  endloop
+endfacet
+"""
+
+
+def write_ascii(tmp_path, text):
+    path = tmp_path / 'part.stl'
+    path.write_bytes(text.encode('ascii'))
+    return str(path)
+
+
+def test_solid_name_containing_vertex(tmp_path):
+    path = write_ascii(tmp_path, f"solid Vertex_test\n{FACET}endsolid Vertex_test\n")
+    triangles, _ = read_stl(path)
+    assert triangles.shape == (1, 3, 3)
+    np.testing.assert_array_equal(triangles[0], [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+
+def test_mixed_case_keywords(tmp_path):
+    text = FACET.replace('vertex', 'VerteX').replace('facet', 'Facet')
+    path = write_ascii(tmp_path, f"solid part\n{text}endsolid part\n")
+    triangles, _ = read_stl_ascii(path)
+    assert triangles.shape == (1, 3, 3)
+    np.testing.assert_array_equal(triangles[0], [[0, 0, 0], [1, 0, 0], [0, 1, 0]])
+
+
+def test_crlf_line_endings_across_chunks(tmp_path):
+    text = "solid part\r\n" + (FACET * 50).replace('\n', '\r\n') + "endsolid part\r\n"
+    path = write_ascii(tmp_path, text)
+    triangles, _ = read_stl_ascii(path, chunk_bytes=64)
+    assert triangles.shape == (50, 3, 3)